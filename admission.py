@@ -0,0 +1,279 @@
+# Admission control for concurrent stages: a stage starts only while the estimated peak memory of everything
+# running fits the memory budget, and the number of concurrent stages follows the measured throughput.
+# Estimates come from the input's point count, its extent and the grid step, scaled by what earlier runs measured.
+
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import batch
+
+DEF_MODEL_PATH = os.path.join(Path.home(), ".lastools_gui", "admission.json")
+DEF_MEMORY_FRACTION = 0.8  # of physical memory, the default budget
+RASTER_CELL_BYTES = 4  # .bil cells are 32 bit floats
+
+# Measurements move the learned scale of a tool this far towards what they imply
+LEARNING_RATE = 0.3
+MIN_SCALE, MAX_SCALE = 0.05, 20.0
+
+# Concurrency tuning: the limit moves one worker per window, in the direction that raised points/sec
+TUNE_WINDOW_SECONDS = 5.0
+TUNE_MIN_STAGES = 2
+TUNE_TOLERANCE = 0.05  # smaller throughput changes count as no change
+
+
+@dataclass
+class ToolModel:
+    """
+    prior cost of one tool, peak = base + points * bytes_per_point + cells * bytes_per_cell,
+    both estimates are multiplied by the scale that fitted the measured runs
+    """
+    base_bytes: float
+    bytes_per_point: float
+    bytes_per_cell: float
+    seconds: float
+    seconds_per_point: float
+    seconds_per_cell: float
+    memory_scale: float = 1.0
+    time_scale: float = 1.0
+    runs: int = 0
+
+
+# LAStools keeps every point of a tile in memory, the grid cells of lasground's step and blast2dem's raster come on top
+DEF_TOOL_MODELS = {
+    "lasground": ToolModel(40e6, 60.0, 16.0, 0.2, 1.0e-6, 1.0e-7),
+    "blast2dem": ToolModel(40e6, 40.0, 8.0, 0.2, 0.8e-6, 0.5e-7),
+    "lasground|blast2dem": ToolModel(80e6, 100.0, 24.0, 0.3, 1.6e-6, 1.5e-7),
+    "hillshade": ToolModel(30e6, 0.0, 12.0, 0.1, 0.0, 0.5e-7),
+}
+DEF_TOOL_MODEL = ToolModel(50e6, 60.0, 12.0, 0.2, 1.0e-6, 1.0e-7)
+
+
+@dataclass
+class Estimate:
+    tool: str
+    points: int
+    cells: int
+    peak_bytes: float
+    seconds: float
+
+
+def total_memory():
+    """:returns physical memory in bytes, None if it cannot be read"""
+    if os.name == "nt":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        return status.ullTotalPhys if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)) else None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_memory_budget():
+    """:returns DEF_MEMORY_FRACTION of physical memory, None (no budget) if it is unknown"""
+    memory = total_memory()
+    return memory * DEF_MEMORY_FRACTION if memory else None
+
+
+def stage_size(stage, input_path: str):
+    """:returns points and grid cells the stage works on, from a LAS header or the size of a raster"""
+    if input_path.lower().endswith(batch.LAS_EXTENSIONS):
+        points = batch.read_point_count(input_path)
+        bounds = batch.read_bounds(input_path)
+        step = getattr(stage, "step", None)
+        if bounds is None or not step:
+            return points, 0
+        min_x, min_y, max_x, max_y = bounds
+        return points, int((max_x - min_x) / step + 1) * int((max_y - min_y) / step + 1)
+    try:
+        return 0, os.path.getsize(input_path) // RASTER_CELL_BYTES
+    except OSError:
+        return 0, 0
+
+
+class ResourceModel():
+    """Peak memory and runtime estimates of every tool, refined by measurements and kept in <path>"""
+
+    def __init__(self, path: str = DEF_MODEL_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.tools = {tool: ToolModel(**vars(model)) for tool, model in DEF_TOOL_MODELS.items()}
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                learned = json.load(file)
+            for tool, scales in learned.items():
+                model = self.tool(tool)
+                model.memory_scale, model.time_scale, model.runs = \
+                    scales["memory_scale"], scales["time_scale"], scales["runs"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # nothing learned yet, or from an incompatible version
+
+    def tool(self, tool: str):
+        if tool not in self.tools:
+            self.tools[tool] = ToolModel(**vars(DEF_TOOL_MODEL))
+        return self.tools[tool]
+
+    def estimate(self, tool: str, points: int, cells: int):
+        with self.lock:
+            model = self.tool(tool)
+            peak = model.base_bytes + points * model.bytes_per_point + cells * model.bytes_per_cell
+            seconds = model.seconds + points * model.seconds_per_point + cells * model.seconds_per_cell
+            return Estimate(tool, points, cells, model.memory_scale * peak, model.time_scale * seconds)
+
+    def learn(self, estimate: Estimate, peak_bytes: float = None, seconds: float = None):
+        """moves the scales of the tool of <estimate> towards the ones that would have predicted the measurements"""
+        def moved(scale, estimated, measured):
+            if not estimated or not measured:
+                return scale
+            # the scale that would have made this estimate exact
+            target = min(max(scale * measured / estimated, MIN_SCALE), MAX_SCALE)
+            return scale + LEARNING_RATE * (target - scale)
+
+        with self.lock:
+            model = self.tool(estimate.tool)
+            model.memory_scale = moved(model.memory_scale, estimate.peak_bytes, peak_bytes)
+            model.time_scale = moved(model.time_scale, estimate.seconds, seconds)
+            model.runs += 1
+            learned = {
+                tool: {"memory_scale": model.memory_scale, "time_scale": model.time_scale, "runs": model.runs}
+                for tool, model in self.tools.items() if model.runs
+            }
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    json.dump(learned, file, indent=1)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass  # estimates still improve for this session
+
+
+class AdmissionController():
+    """
+    Decides when stages may start, shared by every Pipeline that should draw on one memory budget.
+    A stage is admitted while fewer than <limit> stages run and its estimated peak memory fits next to theirs;
+    with nothing running the next stage always starts, however large it is.
+    """
+
+    def __init__(self, memory_budget: float = None, max_workers: int = None, model: ResourceModel = None):
+        """
+        :param memory_budget: bytes, None for DEF_MEMORY_FRACTION of physical memory
+        :param max_workers: most concurrent stages the limit can grow to, defaults to one per core
+        """
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.max_workers = max(1, int(max_workers or batch.default_worker_count()))
+        self.model = model or ResourceModel()
+        self.lock = threading.Lock()
+        self.limit = self.max_workers
+        self.running = {}  # stage -> Estimate
+        self.reserved = 0.0
+        self.measuring = {}  # (stage name, input path) -> Estimate, until its telemetry arrives
+        # throughput of the current and the previous tuning window
+        self.direction = -1
+        self.last_rate = None
+        self.window_start = time.monotonic()
+        self.window_points = 0
+        self.window_stages = 0
+        self.window_saturated = False
+
+    def configure(self, memory_budget: float = None, max_workers: int = None):
+        """changes the budget and the most concurrent stages, e.g. for the next batch on a shared controller"""
+        with self.lock:
+            self.memory_budget = memory_budget or default_memory_budget()
+            self.max_workers = max(1, int(max_workers or batch.default_worker_count()))
+            self.limit = min(self.limit, self.max_workers)
+
+    def estimate(self, stage):
+        """:returns Estimate of <stage>, computed once"""
+        estimate = getattr(stage, "estimate", None)
+        if estimate is None:
+            input_path = stage.inputs[0] if stage.inputs else ""
+            estimate = self.model.estimate(stage.name.split()[0], *stage_size(stage, input_path))
+            stage.estimate = estimate
+        return estimate
+
+    def admit(self, stages):
+        """
+        :param stages: ready stages, most urgent first
+        :returns the first of <stages> that may start now, reserved until release(), None if none may
+        """
+        estimates = [self.estimate(stage) for stage in stages]
+        with self.lock:
+            if len(self.running) >= self.limit:
+                return None
+            for stage, estimate in zip(stages, estimates):
+                if not self.running or self.memory_budget is None or \
+                        self.reserved + estimate.peak_bytes <= self.memory_budget:
+                    self.running[stage] = estimate
+                    self.reserved += estimate.peak_bytes
+                    self.window_saturated |= len(self.running) >= self.limit
+                    if stage.inputs:
+                        self.measuring[(stage.name, stage.inputs[0])] = estimate
+                    return stage
+        return None
+
+    def release(self, stage):
+        """frees what <stage> reserved, and retunes the limit once a window of runs has finished"""
+        with self.lock:
+            estimate = self.running.pop(stage, None)
+            if estimate is None:
+                return
+            if stage.inputs:
+                # stages without telemetry, e.g. skipped ones, are not waited for
+                self.measuring.pop((stage.name, stage.inputs[0]), None)
+            self.reserved -= estimate.peak_bytes
+            self.window_points += estimate.points
+            self.window_stages += 1
+            elapsed = time.monotonic() - self.window_start
+            if self.window_stages >= TUNE_MIN_STAGES and elapsed >= TUNE_WINDOW_SECONDS:
+                # a window that never used every worker says nothing about the limit
+                if self.window_saturated:
+                    self.tune(self.window_points / elapsed)
+                self.window_start = time.monotonic()
+                self.window_points = 0
+                self.window_stages = 0
+                self.window_saturated = False
+
+    def tune(self, rate: float):
+        """hill climbing on points/sec, one worker per window, must hold the lock"""
+        if self.last_rate is not None:
+            if rate < self.last_rate * (1 - TUNE_TOLERANCE):
+                self.direction = -self.direction
+            elif rate <= self.last_rate * (1 + TUNE_TOLERANCE) and self.direction > 0:
+                # another worker did not pay off
+                self.direction = -1
+        self.last_rate = rate
+        limit = self.limit + self.direction
+        if not 1 <= limit <= self.max_workers:
+            self.direction = -self.direction
+            limit = self.limit + self.direction
+        self.limit = min(max(limit, 1), self.max_workers)
+
+    def observe(self, metrics):
+        """
+        learns from the telemetry.StageMetrics of a finished stage, e.g. as a RunTelemetry on_record callback
+        """
+        with self.lock:
+            estimate = self.measuring.pop((metrics.stage, os.path.normpath(metrics.input_path or ".")), None)
+        if estimate is None or metrics.cached or metrics.returncode != 0:
+            return
+        self.model.learn(estimate, metrics.peak_rss_bytes, metrics.wall_seconds)
+
+    def summary(self):
+        budget = f"{self.memory_budget / 1024 ** 3:.1f} GB" if self.memory_budget else "unlimited"
+        return f"admission: {self.limit}/{self.max_workers} workers, memory budget {budget}"
@@ -0,0 +1,210 @@
+# Batch processing of LAS/LAZ deliveries
+
+import os
+import sys
+import glob
+import struct
+import threading
+import time
+
+import pipeline
+import progress
+
+LAS_EXTENSIONS = (".las", ".laz")
+
+# Batch file states
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def default_worker_count():
+    """about one child process per core"""
+    return os.cpu_count() or 1
+
+
+def find_las_files(source: str):
+    """
+    :param source: folder or glob pattern e.g. C:/tiles/*.laz
+    :returns sorted list of LAS/LAZ file paths
+    """
+    pattern = os.path.join(source, "*") if os.path.isdir(source) else source
+    return sorted(
+        path for path in glob.glob(pattern)
+        if os.path.isfile(path) and path.lower().endswith(LAS_EXTENSIONS)
+    )
+
+
+def read_point_count(file_path: str):
+    """
+    reads the number of point records from a LAS/LAZ public header
+    :returns int, 0 if the header cannot be read
+    """
+    try:
+        with open(file_path, "rb") as file:
+            header = file.read(255)
+    except OSError:
+        return 0
+    if len(header) < 227 or header[:4] != b"LASF":
+        return 0
+    count = struct.unpack_from("<I", header, 107)[0]
+    # LAS 1.4 moved the count to a 64 bit field, the legacy field may be 0
+    if header[25] >= 4 and len(header) >= 255:
+        count = struct.unpack_from("<Q", header, 247)[0] or count
+    return count
+
+
+def read_bounds(file_path: str):
+    """
+    reads the extent from a LAS/LAZ public header
+    :returns min x, min y, max x, max y, None if the header cannot be read
+    """
+    try:
+        with open(file_path, "rb") as file:
+            header = file.read(227)
+    except OSError:
+        return None
+    if len(header) < 227 or header[:4] != b"LASF":
+        return None
+    max_x, min_x, max_y, min_y = struct.unpack_from("<4d", header, 179)
+    return min_x, min_y, max_x, max_y
+
+
+class BatchStats():
+    """aggregate throughput of a batch run"""
+
+    def __init__(self, total_files):
+        self.total_files = total_files
+        self.files_done = 0
+        self.files_failed = 0
+        self.points_done = 0
+        self.done_paths = []
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record(self, points, success, path: str = None):
+        with self.lock:
+            if success:
+                self.files_done += 1
+                self.points_done += points
+                if path is not None:
+                    self.done_paths.append(path)
+            else:
+                self.files_failed += 1
+
+    def elapsed(self):
+        return max(time.monotonic() - self.start_time, 1e-6)
+
+    def files_per_min(self):
+        return self.files_done * 60.0 / self.elapsed()
+
+    def points_per_sec(self):
+        return self.points_done / self.elapsed()
+
+    def summary(self):
+        return (
+            f"{self.files_done}/{self.total_files} done, {self.files_failed} failed | "
+            f"{self.files_per_min():.1f} files/min | {self.points_per_sec():,.0f} points/sec"
+        )
+
+
+class BatchRunner():
+    """
+    Runs the stages of every input file on one Pipeline with at most <max_workers> stages in flight.
+    Each worker thread drives its own child process, so this is a pool of concurrent LAStools processes,
+    and different files can be in different stages at once.
+    """
+
+    def __init__(self, build_stages, max_workers=None, on_status=None, on_progress=None, admission=None,
+                 job_progress=None, output=sys.stdout.write):
+        """
+        :param build_stages: callable(path) -> list of pipeline.Stage for that file
+        :param max_workers: concurrent stages, defaults to one per core
+        :param on_status: optional callable(path, status, points, seconds)
+        :param on_progress: optional callable(BatchStats), called after each file
+        :param admission: optional admission.AdmissionController, then <max_workers> is only the upper bound
+        :param job_progress: optional progress.JobProgress, every stage is weighted by the points of its file
+        :param output: callable(str) for errors of the batch, e.g. the StageRunner's output
+        """
+        self.build_stages = build_stages
+        self.max_workers = max(1, int(max_workers or default_worker_count()))
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.admission = admission
+        self.job_progress = job_progress
+        self.output = output
+
+    def notify(self, path, status, points, seconds):
+        if self.on_status:
+            self.on_status(path, status, points, seconds)
+
+    def run(self, files):
+        """
+        blocks until every file is processed
+        :returns BatchStats
+        """
+        stats = BatchStats(len(files))
+        groups = {}
+        stages = []
+        writers = {}  # output path -> the file whose stages write it
+        for path in files:
+            file_stages = self.build_stages(path)
+            outputs = [output for stage in file_stages for output in stage.outputs]
+            clash = next((writers[output] for output in outputs if output in writers), None)
+            if clash is not None:
+                # e.g. a.las and a.laz both make grd_a.laz, the file first in order keeps the names
+                self.output(f"Error. {os.path.basename(path)} has the output names of {os.path.basename(clash)}, "
+                            f"it is not processed\n")
+                stats.record(read_point_count(path), False, path)
+                self.notify(path, STATUS_FAILED, 0, 0.0)
+                if self.on_progress:
+                    self.on_progress(stats)
+                continue
+            writers.update((output, path) for output in outputs)
+            for stage in file_stages:
+                stage.group = path
+            groups[path] = {
+                "stages": file_stages,
+                "points": read_point_count(path),
+                "start": None,
+                "finished": False,
+            }
+            stages.extend(file_stages)
+            self.notify(path, STATUS_QUEUED, 0, 0.0)
+            if self.job_progress is not None:
+                for stage in file_stages:
+                    weight = groups[path]["points"]
+                    if not (stage.inputs and stage.inputs[0].lower().endswith(LAS_EXTENSIONS)):
+                        weight *= progress.RASTER_STAGE_WEIGHT
+                    self.job_progress.add_stage(stage.name, stage.inputs[0] if stage.inputs else path, weight)
+
+        def stage_status(stage):
+            if self.job_progress is not None:
+                input_path = stage.inputs[0] if stage.inputs else stage.group
+                if stage.status == pipeline.STAGE_RUNNING:
+                    self.job_progress.start_stage(stage.name, input_path)
+                elif stage.status != pipeline.STAGE_PENDING:
+                    self.job_progress.finish_stage(stage.name, input_path)
+            group = groups[stage.group]
+            if group["finished"]:
+                return
+            if stage.status == pipeline.STAGE_RUNNING:
+                if group["start"] is None:
+                    group["start"] = time.monotonic()
+                self.notify(stage.group, f"{STATUS_RUNNING}: {stage.name}", group["points"], 0.0)
+                return
+
+            finished = [s.status in (pipeline.STAGE_DONE, pipeline.STAGE_FAILED, pipeline.STAGE_SKIPPED) for s in group["stages"]]
+            failed = stage.status == pipeline.STAGE_FAILED
+            if failed or all(finished):
+                group["finished"] = True
+                seconds = time.monotonic() - (group["start"] or time.monotonic())
+                stats.record(group["points"], not failed, stage.group)
+                self.notify(stage.group, STATUS_FAILED if failed else STATUS_DONE, group["points"], seconds)
+                if self.on_progress:
+                    self.on_progress(stats)
+
+        pipeline.Pipeline(stages, max_workers=self.max_workers, on_status=stage_status, admission=self.admission,
+                          output=self.output).run()
+        return stats
@@ -0,0 +1,241 @@
+# Benchmarks of the wrapper's own overhead: command building, log streaming, scheduling, caching
+# and the full ground -> DEM -> hillshade chain at 1/10/100 files against the fake LAStools in bin/.
+#
+#   python benchmarks/bench.py --save baseline.json
+#   python benchmarks/bench.py --compare baseline.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCHMARKS, os.path.dirname(BENCHMARKS)]
+
+import batch
+import cache
+import lastools_core as core
+import pipeline
+import synthetic
+
+FAKE_LASTOOLS_PATH = os.path.join(BENCHMARKS, "bin")
+DEF_FILE_COUNTS = [1, 10, 100]
+DEF_POINTS = 100_000
+DEF_TOLERANCE = 0.15  # slower than the baseline by more than this counts as a regression
+DEF_REPEAT = 3  # micro benchmarks keep the best of this many runs
+
+
+class OutputSink():
+    """stands in for the console, counts what it is given"""
+
+    def __init__(self):
+        self.chars = 0
+
+    def __call__(self, message: str):
+        self.chars += len(message)
+
+
+def best_of(repeat: int, action):
+    """:returns the fastest of <repeat> timings of <action>()"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+### Micro benchmarks
+
+def bench_command_building(repeat: int):
+    ground, dem, shade = core.GroundParams(step=3, spike=0.5, offset=0.05), core.DemParams(), core.HillshadeParams()
+
+    def build():
+        for index in range(10_000):
+            path = f"tile_{index}.las"
+            core.ground_command(FAKE_LASTOOLS_PATH, path, "grd_" + path, ground)
+            core.blast2dem_command(FAKE_LASTOOLS_PATH, "grd_" + path, "dem.bil", dem)
+            core.hillshade_command(FAKE_LASTOOLS_PATH, "dem.bil", "hill.png", shade)
+
+    return best_of(repeat, build)
+
+
+def bench_log_streaming(repeat: int, megabytes: int = 32):
+    """a child writing <megabytes> of -v style lines as fast as it can"""
+    script = (
+        "import sys\n"
+        "line = b'lasground: processed 123456 of 1000000 points (12.3%)\\n'\n"
+        f"sys.stdout.buffer.write(line * ({megabytes} * 1024 * 1024 // len(line)))\n"
+    )
+    return best_of(repeat, lambda: core.run_command([sys.executable, "-c", script], OutputSink()))
+
+
+def bench_scheduling(repeat: int, folder: str, files: int = 1_000):
+    """three no-op stages per file, only the pipeline's own bookkeeping is measured"""
+    def touch(path):
+        open(path, "wb").close()
+        return True
+
+    def run():
+        stages = []
+        for index in range(files):
+            paths = [os.path.join(folder, f"{index}_{stage}") for stage in range(3)]
+            stages.append(pipeline.Stage("a", lambda path=paths[0]: touch(path), outputs=[paths[0]]))
+            stages.append(pipeline.Stage("b", lambda path=paths[1]: touch(path), [paths[0]], [paths[1]]))
+            stages.append(pipeline.Stage("c", lambda path=paths[2]: touch(path), [paths[1]], [paths[2]]))
+        pipeline.Pipeline(stages).run()
+
+    return best_of(repeat, run)
+
+
+def bench_cache(repeat: int, folder: str, outputs: int = 200):
+    """stores <outputs> small results, then times key + restore for each of them"""
+    result_cache = cache.ResultCache(os.path.join(folder, "cache"))
+    paths = []
+    for index in range(outputs):
+        input_path = os.path.join(folder, f"in_{index}.las")
+        output_path = os.path.join(folder, f"out_{index}.las")
+        with open(input_path, "wb") as file:
+            file.write(os.urandom(4096))
+        with open(output_path, "wb") as file:
+            file.write(os.urandom(4096))
+        result_cache.store(result_cache.key("lasground", input_path, "-step 5", output_path), output_path)
+        paths.append((input_path, output_path))
+
+    def hits():
+        for input_path, output_path in paths:
+            result_cache.restore(result_cache.key("lasground", input_path, "-step 5", output_path), output_path)
+
+    return best_of(repeat, hits)
+
+
+### Chain benchmark
+
+def make_inputs(folder: str, count: int, points: int, shape: str):
+    """writes one synthetic file and copies it, so every file count shares the same data"""
+    os.makedirs(folder, exist_ok=True)
+    first = synthetic.write_las(os.path.join(folder, "tile_0000.las"), points, shape)
+    files = [first]
+    for index in range(1, count):
+        path = os.path.join(folder, f"tile_{index:04d}.las")
+        shutil.copyfile(first, path)
+        files.append(path)
+    return files
+
+
+def bench_chain(folder: str, count: int, points: int, shape: str, workers: int):
+    """
+    times ground -> DEM -> hillshade for <count> files through BatchRunner
+    :returns seconds, failed file count
+    """
+    files = make_inputs(os.path.join(folder, f"in_{count}"), count, points, shape)
+    out_folder = os.path.join(folder, f"out_{count}")
+    os.makedirs(out_folder, exist_ok=True)
+    runner = core.StageRunner(FAKE_LASTOOLS_PATH, OutputSink())
+    ground, dem, shade = core.GroundParams(), core.DemParams(step=1.0), core.HillshadeParams()
+
+    start = time.perf_counter()
+    stats = batch.BatchRunner(
+        lambda path: runner.chain_stages(path, out_folder, ground, dem, shade),
+        max_workers=workers,
+    ).run(files)
+    return time.perf_counter() - start, stats.files_failed
+
+
+def run_benchmarks(file_counts, points: int, shape: str, workers: int, repeat: int):
+    """:returns dict of benchmark name -> seconds"""
+    results = {}
+    folder = tempfile.mkdtemp(prefix="lastools_bench_")
+    try:
+        print("command building ...")
+        results["command_building_10k"] = bench_command_building(repeat)
+        print("log streaming ...")
+        results["log_streaming_32mb"] = bench_log_streaming(repeat)
+        print("scheduling ...")
+        os.makedirs(os.path.join(folder, "schedule"))
+        results["scheduling_1k_files"] = bench_scheduling(repeat, os.path.join(folder, "schedule"))
+        print("cache ...")
+        results["cache_200_hits"] = bench_cache(repeat, folder)
+        for count in file_counts:
+            print(f"chain, {count} files of {points:,} points ...")
+            seconds, failed = bench_chain(folder, count, points, shape, workers)
+            if failed:
+                print(f"  {failed} files failed, results are not comparable")
+            results[f"chain_{count}_files"] = seconds
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+### Baselines
+
+def save_results(path: str, results: dict, settings: dict):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": settings,
+            "results": results,
+        }, file, indent=1)
+
+
+def compare_results(path: str, results: dict, tolerance: float):
+    """
+    prints every benchmark against the baseline in <path>
+    :returns names of the benchmarks that regressed
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    print(f"\nbaseline {path} ({baseline.get('created', '?')}, {baseline.get('platform', '?')})")
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:24} {seconds:9.3f} s   (not in baseline)")
+            continue
+        ratio = seconds / base
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:24} {seconds:9.3f} s   baseline {base:9.3f} s   x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LAStools wrapper against fake LAStools")
+    parser.add_argument("--files", type=int, nargs="+", default=DEF_FILE_COUNTS, help="file counts for the chain")
+    parser.add_argument("--points", type=int, default=DEF_POINTS, help="points per synthetic file")
+    parser.add_argument("--shape", choices=sorted(synthetic.SHAPES), default="hills", help="synthetic terrain")
+    parser.add_argument("--workers", type=int, default=batch.default_worker_count(), help="concurrent stages")
+    parser.add_argument("--repeat", type=int, default=DEF_REPEAT, help="runs per micro benchmark, best is kept")
+    parser.add_argument("--save", metavar="JSON", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=DEF_TOLERANCE, help="allowed slowdown, 0.15 = 15%%")
+    args = parser.parse_args(argv)
+
+    settings = {"files": args.files, "points": args.points, "shape": args.shape, "workers": args.workers}
+    results = run_benchmarks(args.files, args.points, args.shape, args.workers, args.repeat)
+
+    print()
+    for name, seconds in results.items():
+        print(f"{name:24} {seconds:9.3f} s")
+    if args.save:
+        save_results(args.save, results, settings)
+        print(f"\nsaved baseline {args.save}")
+    if args.compare:
+        regressions = compare_results(args.compare, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
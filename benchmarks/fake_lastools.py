@@ -0,0 +1,142 @@
+# Stand-ins for lasground64/blast2dem64 so the chain can be benchmarked without LAStools.
+# They write outputs of the right format and emit -v style output at a controlled rate:
+#   FAKE_LASTOOLS_POINTS_PER_SEC  simulated processing speed (default 5,000,000)
+#   FAKE_LASTOOLS_LOG_LINES       progress lines written per run (default 200)
+#   FAKE_LASTOOLS_UNLICENSED      point count above which the unlicensed notice is written (default never)
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+
+import hillshade
+import lasreader
+import raster
+
+DEF_POINTS_PER_SEC = 5_000_000
+DEF_LOG_LINES = 200
+NODATA = -9999.0
+
+
+def option(args, name: str, default=None, count: int = 1):
+    """:returns the value(s) after -<name>, <default> if it is not given"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    values = args[index + 1:index + 1 + count]
+    return values[0] if count == 1 else values
+
+
+def emit_progress(tool: str, points: int, log=sys.stdout):
+    """writes -v progress lines to <log> spread over the simulated run time"""
+    unlicensed = os.environ.get("FAKE_LASTOOLS_UNLICENSED")
+    if unlicensed and points > int(unlicensed):
+        log.write(f"WARNING: unlicensed. over {int(unlicensed):,} points. adding a little white noise to xy.\n")
+    rate = float(os.environ.get("FAKE_LASTOOLS_POINTS_PER_SEC", DEF_POINTS_PER_SEC))
+    lines = max(1, int(os.environ.get("FAKE_LASTOOLS_LOG_LINES", DEF_LOG_LINES)))
+    seconds = points / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+    for line in range(1, lines + 1):
+        done = points * line // lines
+        log.write(f"{tool}: processed {done} of {points} points ({100.0 * line / lines:.1f}%)\n")
+        log.flush()
+        delay = start + seconds * line / lines - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return time.perf_counter() - start
+
+
+def lasground(args):
+    input_path, output_path = option(args, "-i"), option(args, "-o")
+    # with -stdout the points go to stdout and the log to stderr, like LAStools
+    log = sys.stderr if "-stdout" in args else sys.stdout
+    las_file = lasreader.LasFile(input_path)
+    step = option(args, "-step", "5")
+    log.write(f"reading {las_file.point_count} points from '{os.path.basename(input_path)}'\n")
+    log.write(f"lasground: step {step}, bulge {option(args, '-bulge', 'auto')}, spike {option(args, '-spike', 'off')}\n")
+    seconds = emit_progress("lasground", las_file.point_count, log)
+    if "-stdout" in args:
+        with open(input_path, "rb") as file:
+            shutil.copyfileobj(file, sys.stdout.buffer)
+        sys.stdout.flush()
+        output_path = "stdout"
+    else:
+        shutil.copyfile(input_path, output_path)
+    log.write(f"done with '{os.path.basename(output_path)}'. took {seconds:.2f} sec.\n")
+
+
+def blast2dem(args):
+    input_path, output_path = option(args, "-i"), option(args, "-o")
+    if "-hillshade" in args:
+        source = raster.BilRaster(input_path)
+        print(f"hillshading {source.ncols} by {source.nrows} grid")
+        seconds = emit_progress("blast2dem", source.ncols * source.nrows)
+        hillshade.render(input_path, [(output_path, hillshade.Light(270, 45))])
+        print(f"done with '{os.path.basename(output_path)}'. took {seconds:.2f} sec.")
+        return
+
+    if "-stdin" in args:
+        # lasreader memory maps its input, so the piped points are spooled to a file first
+        with tempfile.NamedTemporaryFile(suffix=".las", delete=False) as file:
+            shutil.copyfileobj(sys.stdin.buffer, file)
+            input_path = file.name
+        try:
+            rasterize(args, lasreader.LasFile(input_path), output_path)
+        finally:
+            os.remove(input_path)
+    else:
+        rasterize(args, lasreader.LasFile(input_path), output_path)
+
+
+def rasterize(args, las_file: lasreader.LasFile, output_path: str):
+    header = las_file.header
+    step = float(option(args, "-step", "1"))
+    ll = option(args, "-ll", count=2)
+    if ll:
+        ncols, nrows = int(option(args, "-ncols")), int(option(args, "-nrows"))
+        min_x, min_y = float(ll[0]), float(ll[1])
+    else:
+        min_x, min_y = header.mins[0], header.mins[1]
+        ncols = max(1, int((header.maxs[0] - min_x) / step) + 1)
+        nrows = max(1, int((header.maxs[1] - min_y) / step) + 1)
+    print(f"reading {las_file.point_count} points, rasterizing {ncols} by {nrows} with step {step:g}")
+    seconds = emit_progress("blast2dem", las_file.point_count)
+
+    # mean height per cell stands in for the TIN
+    total = np.zeros(nrows * ncols)
+    count = np.zeros(nrows * ncols)
+    for x, y, z in las_file.iter_xyz():
+        col = ((x - min_x) / step).astype(np.int64)
+        row = (nrows - 1 - ((y - min_y) / step).astype(np.int64))
+        inside = (col >= 0) & (col < ncols) & (row >= 0) & (row < nrows)
+        cells = row[inside] * ncols + col[inside]
+        total += np.bincount(cells, weights=z[inside], minlength=nrows * ncols)
+        count += np.bincount(cells, minlength=nrows * ncols)
+    elevation = np.where(count > 0, total / np.maximum(count, 1), NODATA).reshape(nrows, ncols)
+
+    georef = {
+        "ulxmap": min_x + step / 2,
+        "ulymap": min_y + (nrows - 0.5) * step,
+        "xdim": step,
+        "ydim": step,
+    }
+    bil = raster.create_bil(output_path, nrows, ncols, np.float32, georef, NODATA)
+    bil[:] = elevation
+    bil.flush()
+    del bil
+    print(f"done with '{os.path.basename(output_path)}'. took {seconds:.2f} sec.")
+
+
+TOOLS = {"lasground": lasground, "blast2dem": blast2dem}
+
+
+def main(tool: str):
+    args = sys.argv[1:]
+    try:
+        TOOLS[tool](args)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
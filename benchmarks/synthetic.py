@@ -0,0 +1,99 @@
+# Synthetic LAS 1.2 point clouds for benchmarks
+
+import math
+import struct
+
+import numpy as np
+
+import lasreader
+
+POINT_FORMAT = 1
+RECORD_LENGTH = 28
+HEADER_SIZE = 227
+SCALE = 0.01
+ORIGIN = (500000.0, 4000000.0)
+DEF_DENSITY = 10.0  # points per square metre
+DEF_VEGETATION = 0.3  # share of points above the ground
+CHUNK_POINTS = 1_000_000
+
+
+def flat(x, y, side):
+    return np.full_like(x, 100.0)
+
+
+def slope(x, y, side):
+    return 100.0 + 0.15 * x + 0.05 * y
+
+
+def hills(x, y, side):
+    wave = 2 * math.pi / max(side, 1.0)
+    return 100.0 + 25.0 * np.sin(3 * wave * x) * np.cos(2 * wave * y) + 0.02 * x
+
+
+def urban(x, y, side):
+    # flat ground with 20 m blocks of 8-30 m buildings on half the lots
+    z = 100.0 + 0.01 * x
+    lot_x, lot_y = (x // 20).astype(np.int64), (y // 20).astype(np.int64)
+    built = (lot_x * 7919 + lot_y * 104729) % 2 == 0
+    height = 8.0 + (lot_x * 31 + lot_y * 17) % 23
+    return np.where(built, z + height, z)
+
+
+SHAPES = {"flat": flat, "slope": slope, "hills": hills, "urban": urban}
+
+
+def header_bytes(point_count: int, mins, maxs):
+    header = bytearray(HEADER_SIZE)
+    header[0:4] = b"LASF"
+    header[24], header[25] = 1, 2
+    header[26:58] = b"py-lastools-gui benchmark".ljust(32, b"\0")
+    header[58:90] = b"synthetic.py".ljust(32, b"\0")
+    struct.pack_into("<HHHIIBHI", header, 90, 1, 2025, HEADER_SIZE, HEADER_SIZE, 0, POINT_FORMAT, RECORD_LENGTH,
+                     point_count)
+    struct.pack_into("<5I", header, 111, point_count, 0, 0, 0, 0)
+    struct.pack_into("<3d", header, 131, SCALE, SCALE, SCALE)
+    struct.pack_into("<3d", header, 155, ORIGIN[0], ORIGIN[1], 0.0)
+    struct.pack_into("<6d", header, 179, maxs[0], mins[0], maxs[1], mins[1], maxs[2], mins[2])
+    return bytes(header)
+
+
+def write_las(path: str, point_count: int, shape: str = "hills", density: float = DEF_DENSITY, seed: int = 0,
+              vegetation: float = DEF_VEGETATION):
+    """
+    Writes <point_count> unclassified points over a square sized for <density>.
+    Ground follows <shape>, a <vegetation> share of points sits above it.
+    """
+    rng = np.random.default_rng(seed)
+    terrain = SHAPES[shape]
+    side = math.sqrt(point_count / density)
+    dtype = lasreader.point_dtype(POINT_FORMAT, RECORD_LENGTH)
+    mins = [math.inf] * 3
+    maxs = [-math.inf] * 3
+
+    with open(path, "wb") as file:
+        file.write(header_bytes(point_count, [0.0] * 3, [0.0] * 3))
+        for start in range(0, point_count, CHUNK_POINTS):
+            count = min(CHUNK_POINTS, point_count - start)
+            x = rng.random(count) * side
+            y = rng.random(count) * side
+            z = terrain(x, y, side) + rng.normal(0.0, 0.05, count)
+            above = rng.random(count) < vegetation
+            z[above] += rng.exponential(6.0, int(above.sum()))
+
+            records = np.zeros(count, dtype=dtype)
+            records["X"] = np.round(x / SCALE)
+            records["Y"] = np.round(y / SCALE)
+            records["Z"] = np.round(z / SCALE)
+            records["intensity"] = rng.integers(0, 4096, count)
+            records["return_byte"] = 0b001001  # return 1 of 1
+            records["classification_byte"] = 1
+            records["gps_time"] = start + np.arange(count) * 1e-5
+            file.write(records.tobytes())
+
+            for axis, values in enumerate((x + ORIGIN[0], y + ORIGIN[1], z)):
+                mins[axis] = min(mins[axis], float(values.min()))
+                maxs[axis] = max(maxs[axis], float(values.max()))
+
+        file.seek(0)
+        file.write(header_bytes(point_count, mins, maxs))
+    return path
@@ -0,0 +1,286 @@
+# Persistent on-disk cache of LAStools stage outputs
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+DEF_CACHE_DIR = os.path.join(Path.home(), ".lastools_gui", "cache")
+DEF_CACHE_MAX_BYTES = 20 * 1024 ** 3  # 20 GB
+HASH_BLOCK_SIZE = 1024 * 1024
+INDEX_FILE = "index.json"
+INDEX_LOCK_FILE = "index.lock"
+TEMP_PREFIX = "tmp-"  # entries being stored, renamed to their key once complete
+
+# side files LAStools writes next to an output, by the output's suffix
+SIDE_SUFFIXES = {
+    ".bil": (".hdr", ".prj", ".blw"),
+    ".flt": (".hdr", ".prj"),
+    ".asc": (".prj",),
+    ".tif": (".tfw", ".prj", ".kml"),
+    ".png": (".pgw", ".prj", ".kml"),
+    ".jpg": (".jgw", ".prj", ".kml"),
+}
+
+
+def side_suffixes(output_path: str):
+    """:returns suffixes the output itself and its side files can have, the output's first"""
+    suffix = Path(output_path).suffix.lower()
+    return (Path(output_path).suffix,) + SIDE_SUFFIXES.get(suffix, ())
+
+
+def side_path(output_path: str, suffix: str):
+    """:returns the file with the stem of <output_path> and the whole <suffix>, e.g. x.bil, .hdr -> x.hdr"""
+    output = Path(output_path)
+    return str(output.with_name(output.name[:len(output.name) - len(output.suffix)] + suffix))
+
+
+def companion_files(output_path: str):
+    """:returns (suffix, path) of <output_path> and its existing side files, the output itself first"""
+    if not os.path.isfile(output_path):
+        return []
+    files = [(suffix, side_path(output_path, suffix)) for suffix in side_suffixes(output_path)]
+    return [(suffix, path) for suffix, path in files if os.path.isfile(path)]
+
+
+def copy_replace(source: str, target: str):
+    """copies <source> to a temporary name next to <target>, then renames it, so <target> is never partial"""
+    tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # copy2 keeps the mtime, so downstream cache keys stay stable
+        shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def locked_file(path: str):
+    """holds an exclusive lock on <path> across processes, waiting until it is free"""
+    with open(path, "a+b") as file:
+        if os.name == "nt":
+            import msvcrt
+            file.seek(0)
+            while True:
+                # LK_LOCK gives up after ten attempts with an OSError
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def derived_path(input_path: str, folder: str, suffix: str, **settings):
+    """
+    :returns path in <folder> of a file made from <input_path> with <settings>, named <stem>_<digest><suffix>,
+    the name changes whenever the input's path, size or mtime or the settings do
+    """
+    stat = os.stat(input_path)
+    description = dict(settings, input=os.path.abspath(input_path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    digest = hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(folder, f"{Path(input_path).stem}_{digest}{suffix}")
+
+
+def prune_files(paths, keep: int, parts=lambda path: [path]):
+    """
+    removes all but the <keep> most recently modified of <paths>
+    :param parts: callable(Path) -> the files and then the folders to remove with it, missing ones are skipped
+    """
+    paths = sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in paths[keep:]:
+        for part in parts(path):
+            try:
+                part.rmdir() if part.is_dir() else part.unlink()
+            except OSError:
+                pass
+
+
+class ResultCache():
+    """
+    Content-addressed store of stage outputs.
+    Entries are keyed by the input file identity, the tool name and its argument string,
+    and the least recently used entries are evicted once the cache grows past <max_bytes>.
+    Files are copied without holding the lock, which only guards the index.
+    The GUI, headless and watch jobs may share a cache folder, so every change to the index reloads it
+    under a file lock and writes it back merged.
+    """
+
+    def __init__(self, cache_dir=DEF_CACHE_DIR, max_bytes=DEF_CACHE_MAX_BYTES, hash_content=False):
+        """
+        :param hash_content: also hash the input bytes, slower but survives copies and touched mtimes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self.lock = threading.Lock()
+        self.content_hashes = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = {}
+        with self.updating_index():
+            pass
+
+    ### Index
+
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def load_index(self):
+        try:
+            with open(self.index_path(), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @contextmanager
+    def updating_index(self):
+        """
+        holds the lock and the index file lock, reloads the index to pick up other processes' changes
+        and saves it once the block completes
+        """
+        with self.lock, locked_file(os.path.join(self.cache_dir, INDEX_LOCK_FILE)):
+            self.index = self.load_index()
+            yield self.index
+            self.save_index()
+
+    def save_index(self):
+        tmp_path = self.index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.index, file)
+        os.replace(tmp_path, self.index_path())
+
+    def total_bytes(self):
+        return sum(entry["size"] for entry in self.index.values())
+
+    ### Keys
+
+    def file_identity(self, file_path: str):
+        """size and mtime of <file_path>, plus a sha256 of its contents if hash_content is set"""
+        stat = os.stat(file_path)
+        identity = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if self.hash_content:
+            memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+            if memo_key not in self.content_hashes:
+                digest = hashlib.sha256()
+                with open(file_path, "rb") as file:
+                    for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                        digest.update(block)
+                self.content_hashes[memo_key] = digest.hexdigest()
+            identity["sha256"] = self.content_hashes[memo_key]
+        else:
+            identity["path"] = os.path.abspath(file_path)
+        return identity
+
+    def key(self, tool: str, input_path: str, las_args: str, output_path: str):
+        """
+        :returns hex digest identifying a stage run, None if the input does not exist
+        """
+        if not os.path.isfile(input_path):
+            return None
+        description = {
+            "tool": tool,
+            "input": self.file_identity(input_path),
+            "args": " ".join(las_args.split()),
+            # the output format follows the extension, e.g. -o x.laz vs -o x.las
+            "output_suffix": Path(output_path).suffix.lower(),
+        }
+        encoded = json.dumps(description, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    ### Lookup / store
+
+    def restore(self, key: str, output_path: str):
+        """
+        copies a cached result to <output_path> and its side files
+        :returns True on a cache hit
+        """
+        if key is None:
+            return False
+        with self.updating_index():
+            entry = self.index.get(key)
+            if entry is None:
+                return False
+            # used now, so it is the last to be evicted while it is copied
+            entry["last_used"] = time.time()
+            suffixes = list(entry["suffixes"])
+        entry_dir = os.path.join(self.cache_dir, key)
+        try:
+            if any(suffix not in side_suffixes(output_path) for suffix in suffixes):
+                raise OSError("stored by a version that kept other side files")
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            for suffix in suffixes:
+                copy_replace(os.path.join(entry_dir, f"result{suffix}"), side_path(output_path, suffix))
+        except OSError:
+            # a damaged or evicted entry is dropped and the stage runs again
+            with self.updating_index():
+                self.remove_entry(key)
+            return False
+        return True
+
+    def store(self, key: str, output_path: str):
+        """copies <output_path> and its side files into the cache, then evicts down to max_bytes"""
+        if key is None:
+            return
+        files = companion_files(output_path)
+        if not files:
+            return
+        size = sum(os.path.getsize(path) for _, path in files)
+        if size > self.max_bytes:
+            return
+        tmp_dir = tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=self.cache_dir)
+        try:
+            for suffix, path in files:
+                shutil.copy2(path, os.path.join(tmp_dir, f"result{suffix}"))
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        with self.updating_index():
+            self.remove_entry(key)
+            os.replace(tmp_dir, os.path.join(self.cache_dir, key))
+            self.index[key] = {"suffixes": [suffix for suffix, _ in files], "size": size, "last_used": time.time()}
+            self.evict()
+
+    def remove_entry(self, key: str):
+        self.index.pop(key, None)
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def evict(self):
+        """drops least recently used entries until the cache fits in max_bytes"""
+        total = self.total_bytes()
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["size"]
+            self.remove_entry(key)
+
+    def clear(self):
+        with self.updating_index():
+            for key in list(self.index):
+                self.remove_entry(key)
+            # entries dropped from the index by writers that predate the file lock
+            for path in Path(self.cache_dir).iterdir():
+                if path.is_dir() and not path.name.startswith(TEMP_PREFIX):
+                    shutil.rmtree(path, ignore_errors=True)
+            # left behind by stores that were interrupted
+            for path in Path(self.cache_dir).glob(f"{TEMP_PREFIX}*"):
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,582 @@
+# Distributed stages: worker agents run lasground, blast2dem and hillshade for a coordinator over TCP.
+# Messages are newline-delimited JSON. The coordinator keeps a queue of tasks per agent, an agent with free
+# slots and an empty queue steals from the back of the longest one, and the tasks of an agent that is lost
+# (closed connection or no heartbeat) are retried on the others.
+# A coordinator proves it knows the agent's token before the agent runs anything, and an agent only writes
+# below its --map targets and never passes extra arguments on to LAStools.
+#
+#   python py-lastools-gui.py --agent 0.0.0.0:7450 --token SECRET --lastools /opt/lastools/bin --map D:/share=/mnt/share
+
+import os
+import hmac
+import json
+import time
+import socket
+import hashlib
+import secrets
+import itertools
+import threading
+from collections import deque
+from dataclasses import asdict, fields, replace
+
+import batch
+import lastools_core as core
+import telemetry
+
+PROTOCOL_VERSION = 2
+DEF_AGENT_HOST = "127.0.0.1"  # an agent serves other machines only when told to listen on their interface
+DEF_AGENT_PORT = 7450
+HEARTBEAT_SECONDS = 2.0
+HEARTBEAT_TIMEOUT = 10.0  # an agent silent for this long is considered lost
+CONNECT_TIMEOUT = 5.0
+MAX_TASK_ATTEMPTS = 3  # agents a task may be lost on before it fails
+CANCEL_POLL_SECONDS = 0.2
+
+REMOTE_TOOLS = ("lasground", "blast2dem", "lasground|blast2dem", "hillshade")
+
+
+def parse_address(address: str, default_host: str = DEF_AGENT_HOST):
+    """:returns (host, port) of "host:port", "host" or "port" """
+    host, _, port = str(address).rpartition(":")
+    if not host and not port.isdigit():
+        host, port = port, ""
+    return host or default_host, int(port or DEF_AGENT_PORT)
+
+
+def auth_digest(token: str, nonce: str):
+    """:returns the proof that a coordinator knows <token>, for the <nonce> an agent sent it"""
+    return hmac.new(token.encode("utf-8"), nonce.encode("ascii"), hashlib.sha256).hexdigest()
+
+
+class Connection():
+    """newline-delimited JSON messages over a socket, send is safe to call from several threads"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.lock = threading.Lock()
+
+    def send(self, message: dict):
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self.lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        """:returns the next message, None once the connection is closed or broken"""
+        try:
+            line = self.reader.readline()
+            return json.loads(line) if line else None
+        except (OSError, ValueError):
+            return None
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+### Agent
+
+class PathMap():
+    """
+    Shared storage prefixes as the coordinator names them -> as this agent mounts them, e.g. D:/share=/mnt/share.
+    / and \\ are treated alike, drive letter prefixes ignore case.
+    """
+
+    def __init__(self, pairs=()):
+        pairs = [(source.replace("\\", "/").rstrip("/"), target.rstrip("/\\")) for source, target in pairs]
+        # longest prefix first, so a nested share wins over its parent
+        self.pairs = sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+    @staticmethod
+    def parse(items):
+        """:param items: "FROM=TO" strings, :raises ValueError on an item without ="""
+        pairs = []
+        for item in items or ():
+            source, separator, target = item.partition("=")
+            if not separator or not source or not target:
+                raise ValueError(f"expected FROM=TO, got {item}")
+            pairs.append((source, target))
+        return PathMap(pairs)
+
+    def local(self, path: str):
+        """:returns <path> as this agent sees it, unchanged if no prefix matches"""
+        normalized = path.replace("\\", "/")
+        for source, target in self.pairs:
+            drive = len(source) >= 2 and source[1] == ":"
+            head = normalized[:len(source)]
+            if (head.lower() == source.lower() if drive else head == source) and \
+                    normalized[len(source):len(source) + 1] in ("", "/"):
+                return os.path.normpath(target + normalized[len(source):])
+        return path
+
+    def contains(self, path: str):
+        """:returns True if <path>, as this agent sees it, lies below one of the targets"""
+        path = os.path.normcase(os.path.realpath(path))
+        for _, target in self.pairs:
+            root = os.path.normcase(os.path.realpath(target))
+            try:
+                if os.path.commonpath([path, root]) == root:
+                    return True
+            except ValueError:
+                continue  # another drive
+        return False
+
+
+def check_task(task: dict, path_map: PathMap):
+    """
+    :raises ValueError if the "run" message <task>, with its paths already mapped, passes arguments on to LAStools
+    or writes outside the shared storage of <path_map>
+    """
+    params = task["params"]
+    nested = [params.get(key) for key in ("ground", "dem", "hillshade")]
+    if params.get("extra_args") or any(isinstance(value, dict) and value.get("extra_args") for value in nested):
+        raise ValueError("agents do not run extra LAStools arguments")
+    if not path_map.contains(task["output"]):
+        raise ValueError(f"{task['output']} is not below a --map target of the agent")
+
+
+def run_task(runner: core.StageRunner, task: dict):
+    """runs the stage described by a "run" message with <runner>, :returns True on success"""
+    tool, params = task["tool"], task["params"]
+    if tool == "lasground":
+        return runner.run_las_ground(task["input"], task["output"], core.GroundParams(**params["ground"]))
+    if tool == "blast2dem":
+        return runner.run_blast2dem(task["input"], task["output"], core.DemParams(**params["dem"]),
+                                    params.get("extra_args", ()))
+    if tool == "lasground|blast2dem":
+        return runner.run_piped_dem(task["input"], task["output"], core.GroundParams(**params["ground"]),
+                                    core.DemParams(**params["dem"]))
+    if tool == "hillshade":
+        return runner.run_hillshade(task["input"], task["output"], core.HillshadeParams(**params["hillshade"]))
+    raise ValueError(f"unknown tool {tool}")
+
+
+class Agent():
+    """
+    Runs the stages a coordinator sends, at most <slots> at once over all connections.
+    Output is streamed back as it is written, and the child processes of a connection are killed if it drops.
+    """
+
+    def __init__(self, lastools_path: str, token: str, slots: int = None, path_map: PathMap = None,
+                 name: str = None):
+        """:param token: shared secret a coordinator must prove it knows before anything runs"""
+        self.lastools_path = lastools_path
+        self.token = token
+        self.slots = max(1, int(slots or batch.default_worker_count()))
+        self.path_map = path_map or PathMap()
+        self.name = name or socket.gethostname()
+        self.semaphore = threading.BoundedSemaphore(self.slots)
+        self.server = None
+
+    def listen(self, host: str = DEF_AGENT_HOST, port: int = DEF_AGENT_PORT):
+        """binds the server socket, port 0 picks a free one, :returns the bound port"""
+        self.server = socket.create_server((host, port))
+        port = self.server.getsockname()[1]
+        self.name = f"{self.name}:{port}"
+        return port
+
+    def serve_forever(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return  # closed
+            threading.Thread(target=self.handle, args=(sock,), daemon=True).start()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+    def handle(self, sock: socket.socket):
+        connection = Connection(sock)
+        trackers = {}  # task id -> core.ProcessTracker
+        closed = threading.Event()
+        if not self.authenticate(connection):
+            connection.close()
+            return
+        threading.Thread(target=self.heartbeat, args=(connection, trackers, closed), daemon=True).start()
+        try:
+            while True:
+                message = connection.receive()
+                if message is None:
+                    break
+                if message.get("type") == "run":
+                    tracker = core.ProcessTracker()
+                    trackers[message["id"]] = tracker
+                    threading.Thread(
+                        target=self.run, args=(connection, message, tracker, trackers), daemon=True
+                    ).start()
+                elif message.get("type") == "cancel" and message.get("id") in trackers:
+                    trackers[message["id"]].cancel()
+        finally:
+            closed.set()
+            # the coordinator is gone and retries elsewhere, nobody wants these results
+            for tracker in list(trackers.values()):
+                tracker.cancel()
+            connection.close()
+
+    def authenticate(self, connection: Connection):
+        """
+        sends the hello with a fresh nonce and checks the coordinator's answer to it
+        :returns True if the coordinator knows the token
+        """
+        nonce = secrets.token_hex(32)
+        connection.sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            connection.send({"type": "hello", "version": PROTOCOL_VERSION, "name": self.name, "slots": self.slots,
+                             "nonce": nonce})
+            message = connection.receive()
+            digest = message.get("digest") if message and message.get("type") == "auth" else None
+            if not isinstance(digest, str) or not hmac.compare_digest(digest, auth_digest(self.token, nonce)):
+                core.write_stdout(f"rejected a coordinator at {connection.sock.getpeername()}: wrong token\n")
+                connection.send({"type": "error", "text": "wrong token"})
+                return False
+            connection.sock.settimeout(None)
+            connection.send({"type": "welcome"})
+        except OSError:
+            return False
+        return True
+
+    def heartbeat(self, connection: Connection, trackers: dict, closed: threading.Event):
+        while not closed.wait(HEARTBEAT_SECONDS):
+            try:
+                connection.send({"type": "heartbeat", "running": len(trackers)})
+            except OSError:
+                return
+
+    def run(self, connection: Connection, task: dict, tracker: core.ProcessTracker, trackers: dict):
+        def output(message):
+            try:
+                connection.send({"type": "log", "id": task["id"], "text": message})
+            except OSError:
+                pass
+
+        with self.semaphore:
+            start = time.perf_counter()
+            recorder = telemetry.RunTelemetry(self.name)
+            runner = core.StageRunner(self.lastools_path, output, tracker=tracker, recorder=recorder)
+            local_task = dict(task, input=self.path_map.local(str(task.get("input"))),
+                              output=self.path_map.local(str(task.get("output"))))
+            try:
+                check_task(local_task, self.path_map)
+                success = run_task(runner, local_task)
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                output(f"Error. {task.get('tool')} failed on {self.name}: {e}\n")
+                success = False
+            seconds = time.perf_counter() - start
+        trackers.pop(task["id"], None)
+        core.write_stdout(f"{task['tool']}: {local_task['input']} {'done' if success else 'failed'} "
+                          f"in {seconds:.1f} s\n")
+        try:
+            connection.send({
+                "type": "done", "id": task["id"], "success": success,
+                "metrics": [metrics.row() for metrics in recorder.stages],
+            })
+        except OSError:
+            pass
+
+
+def serve(lastools_path: str, address: str, token: str, slots: int = None, path_map: PathMap = None):
+    """headless agent entry point, runs until interrupted, :returns process exit code"""
+    path_map = path_map or PathMap()
+    if not token:
+        print("An agent needs a --token, coordinators give the same one as their agent_token")
+        return 1
+    if not path_map.pairs:
+        print("An agent needs at least one --map, it writes only below the targets")
+        return 1
+    host, port = parse_address(address)
+    agent = Agent(lastools_path, token, slots, path_map)
+    try:
+        port = agent.listen(host, port)
+    except OSError as e:
+        print(f"Cannot listen on {host}:{port}: {e}")
+        return 1
+    print(f"agent {agent.name}: {agent.slots} slots, LAStools in {lastools_path}")
+    for source, target in agent.path_map.pairs:
+        print(f"  {source} -> {target}")
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.close()
+    return 0
+
+
+### Coordinator
+
+class RemoteTask():
+    """one stage sent to an agent, waited on by the stage thread that submitted it"""
+
+    def __init__(self, task_id: int, tool: str, input_path: str, output_path: str, params: dict, output):
+        self.message = {"type": "run", "id": task_id, "tool": tool, "input": input_path, "output": output_path,
+                        "params": params}
+        self.output = output
+        self.attempts = 0
+        self.success = False
+        self.metrics = []
+        self.done = threading.Event()
+
+    @property
+    def id(self):
+        return self.message["id"]
+
+
+class AgentLink():
+    """coordinator end of the connection to one agent"""
+
+    def __init__(self, address: str, token: str):
+        sock = socket.create_connection(parse_address(address), timeout=CONNECT_TIMEOUT)
+        self.connection = Connection(sock)
+        hello = self.connection.receive()
+        if not hello or hello.get("type") != "hello" or hello.get("version") != PROTOCOL_VERSION:
+            self.connection.close()
+            raise ConnectionError(f"{address} is not a protocol {PROTOCOL_VERSION} agent")
+        self.connection.send({"type": "auth", "digest": auth_digest(token or "", str(hello.get("nonce", "")))})
+        if (self.connection.receive() or {}).get("type") != "welcome":
+            self.connection.close()
+            raise ConnectionError(f"{address} refused the agent token")
+        sock.settimeout(None)
+        self.name = hello["name"]
+        self.slots = int(hello["slots"])
+        self.queue = deque()
+        self.running = {}  # task id -> RemoteTask
+        self.last_seen = time.monotonic()
+        self.alive = True
+
+    def load(self):
+        return (len(self.queue) + len(self.running)) / self.slots
+
+
+class Cluster():
+    """
+    Agents a run is spread over. Every stage waits in the queue of the least loaded agent,
+    agents with free slots take from their own queue first and steal from the longest other queue after.
+    """
+
+    def __init__(self, addresses, token: str, output=core.write_stdout):
+        """
+        :param token: the token the agents were started with
+        :raises ConnectionError if no agent can be reached
+        """
+        self.output = output
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.closed = threading.Event()
+        self.agents = []
+        for address in addresses:
+            try:
+                agent = AgentLink(address, token)
+            except (OSError, ConnectionError) as e:
+                output(f"agent {address}: cannot connect, {e}\n")
+                continue
+            output(f"agent {agent.name}: {agent.slots} slots\n")
+            self.agents.append(agent)
+        if not self.agents:
+            raise ConnectionError(f"none of the agents {', '.join(map(str, addresses))} could be reached")
+        for agent in self.agents:
+            threading.Thread(target=self.receive, args=(agent,), daemon=True).start()
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    @property
+    def slots(self):
+        """concurrent stages over all live agents"""
+        return sum(agent.slots for agent in self.agents if agent.alive)
+
+    def live_agents(self):
+        return [agent for agent in self.agents if agent.alive]
+
+    def run(self, tool: str, input_path: str, output_path: str, params: dict, output=None, is_cancelled=None):
+        """
+        runs one stage on an agent and waits for it
+        :param output: callable(str) for the stage's log, defaults to the cluster's
+        :param is_cancelled: optional callable, polled while waiting, True cancels the stage
+        :returns success, list of telemetry.StageMetrics rows recorded by the agent
+        """
+        task = RemoteTask(next(self.ids), tool, input_path, output_path, params, output or self.output)
+        with self.lock:
+            self.enqueue(task)
+            self.dispatch()
+        while not task.done.wait(CANCEL_POLL_SECONDS):
+            if is_cancelled is not None and is_cancelled():
+                self.cancel(task)
+        return task.success, task.metrics
+
+    def enqueue(self, task: RemoteTask):
+        """puts <task> in the queue of the least loaded live agent, fails it if there is none (lock held)"""
+        agents = self.live_agents()
+        if not agents:
+            task.output(f"Error. no agent left to run {task.message['tool']} on {task.message['input']}\n")
+            self.finish(task, False)
+            return
+        min(agents, key=AgentLink.load).queue.append(task)
+
+    def steal(self, thief: AgentLink):
+        """:returns the task at the back of the longest queue of another live agent, None if all are empty"""
+        victims = [agent for agent in self.live_agents() if agent is not thief and agent.queue]
+        if not victims:
+            return None
+        return max(victims, key=lambda agent: len(agent.queue)).queue.pop()
+
+    def dispatch(self):
+        """fills the free slots of every live agent, own queue first, then by stealing (lock held)"""
+        for take in (lambda agent: agent.queue.popleft() if agent.queue else None, self.steal):
+            for agent in self.live_agents():
+                while agent.alive and len(agent.running) < agent.slots:
+                    task = take(agent)
+                    if task is None:
+                        break
+                    self.start(agent, task)
+
+    def start(self, agent: AgentLink, task: RemoteTask):
+        task.attempts += 1
+        agent.running[task.id] = task
+        message = task.message
+        task.output(f"\n{message['tool']} on {agent.name}: {message['input']}\n")
+        try:
+            agent.connection.send(message)
+        except OSError as e:
+            self.lose(agent, str(e))
+
+    def finish(self, task: RemoteTask, success: bool, metrics=()):
+        task.success = success
+        task.metrics = list(metrics)
+        task.done.set()
+
+    def lose(self, agent: AgentLink, reason: str):
+        """drops <agent> and moves its queued and running tasks to the others (lock held)"""
+        if not agent.alive:
+            return
+        agent.alive = False
+        agent.connection.close()
+        orphans = list(agent.running.values()) + list(agent.queue)
+        agent.running.clear()
+        agent.queue.clear()
+        if not self.closed.is_set():
+            self.output(f"\nagent {agent.name} lost ({reason}), {len(orphans)} stages moved to other agents\n")
+        for task in orphans:
+            if task.attempts >= MAX_TASK_ATTEMPTS:
+                task.output(f"Error. {task.message['tool']} on {task.message['input']} was lost "
+                            f"{task.attempts} times, giving up\n")
+                self.finish(task, False)
+            else:
+                self.enqueue(task)
+
+    def receive(self, agent: AgentLink):
+        """reader thread of one agent"""
+        while True:
+            message = agent.connection.receive()
+            if message is None:
+                with self.lock:
+                    self.lose(agent, "connection closed")
+                    self.dispatch()
+                return
+            agent.last_seen = time.monotonic()
+            kind = message.get("type")
+            if kind == "log":
+                task = agent.running.get(message.get("id"))
+                if task is not None:
+                    task.output(message.get("text", ""))
+            elif kind == "done":
+                with self.lock:
+                    task = agent.running.pop(message.get("id"), None)
+                    if task is not None:
+                        self.finish(task, bool(message.get("success")), message.get("metrics", ()))
+                    self.dispatch()
+
+    def watch(self):
+        """drops agents that stopped sending heartbeats"""
+        while not self.closed.wait(HEARTBEAT_SECONDS):
+            with self.lock:
+                now = time.monotonic()
+                for agent in self.live_agents():
+                    if now - agent.last_seen > HEARTBEAT_TIMEOUT:
+                        self.lose(agent, f"no heartbeat for {now - agent.last_seen:.0f} s")
+                self.dispatch()
+
+    def cancel(self, task: RemoteTask):
+        """drops <task> if it is still queued, asks its agent to kill it if it is running"""
+        with self.lock:
+            for agent in self.agents:
+                if task in agent.queue:
+                    agent.queue.remove(task)
+                    self.finish(task, False)
+                    return
+                if task.id in agent.running:
+                    try:
+                        agent.connection.send({"type": "cancel", "id": task.id})
+                    except OSError:
+                        pass
+                    return
+
+    def close(self):
+        self.closed.set()
+        with self.lock:
+            for agent in self.agents:
+                agent.connection.close()
+
+
+def metrics_from_row(run: str, row: dict):
+    """:returns telemetry.StageMetrics from a row sent by an agent, recorded under <run>"""
+    names = {field.name for field in fields(telemetry.StageMetrics)}
+    metrics = telemetry.StageMetrics(**{name: value for name, value in row.items() if name in names})
+    metrics.run = run
+    return metrics
+
+
+class ClusterStageRunner(core.StageRunner):
+    """
+    StageRunner whose lasground, blast2dem and hillshade stages run on the agents of a Cluster,
+    without the result cache, every stage runs
+    """
+
+    def __init__(self, cluster: Cluster, output=core.write_stdout, tracker=None, recorder=None):
+        super().__init__(None, output, tracker=tracker, recorder=recorder)
+        self.cluster = cluster
+
+    def with_output(self, output, tracker=None, recorder=None, job_progress=None):
+        # agents stream their log back without per-run progress
+        return ClusterStageRunner(self.cluster, output, tracker, recorder)
+
+    def run_remote(self, tool: str, input_path: str, output_path: str, params: dict):
+        if self.is_cancelled(tool):
+            return False
+        success, rows = self.cluster.run(
+            tool, input_path, output_path, params, self.output,
+            lambda: self.tracker is not None and self.tracker.cancelled,
+        )
+        if self.recorder is not None:
+            for row in rows:
+                self.recorder.record(metrics_from_row(self.recorder.run, row))
+        if self.is_cancelled(tool):
+            return False
+        return success
+
+    def run_las_ground(self, input_path: str, output_path: str, params: core.GroundParams, workers=None):
+        return self.run_remote("lasground", input_path, output_path, {"ground": asdict(params)})
+
+    def run_blast2dem(self, input_path: str, output_path: str, params: core.DemParams, extra_args=()):
+        return self.run_remote("blast2dem", input_path, output_path,
+                               {"dem": asdict(params), "extra_args": list(extra_args)})
+
+    def run_piped_dem(self, input_path: str, output_path: str, ground: core.GroundParams, dem: core.DemParams):
+        return self.run_remote("lasground|blast2dem", input_path, output_path,
+                               {"ground": asdict(ground), "dem": asdict(dem)})
+
+    def run_hillshade(self, input_path: str, output_path: str, params: core.HillshadeParams):
+        return self.run_remote("hillshade", input_path, output_path, {"hillshade": asdict(params)})
+
+    def chain_stages(self, input_path: str, out_folder: str, ground: core.GroundParams, dem: core.DemParams,
+                     shade: core.HillshadeParams, intermediates: core.IntermediateParams = None):
+        # stages of one file may run on different agents, so nothing can go to a scratch folder
+        intermediates = intermediates or core.IntermediateParams()
+        intermediates = replace(
+            intermediates,
+            keep_elevation=True,
+            keep_ground=intermediates.keep_ground or ground.engine == core.GROUND_ENGINE_NUMPY,
+        )
+        return super().chain_stages(input_path, out_folder, ground, dem, shade, intermediates)
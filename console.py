@@ -0,0 +1,129 @@
+# Bounded output buffer for the console and rotating per-job log files
+
+import os
+import re
+import glob
+import time
+import itertools
+import threading
+from collections import deque
+from pathlib import Path
+
+import cache
+
+CONSOLE_MAX_LINES = 10_000
+MAX_LINE_CHARS = 1_000  # longer lines are cut in the console, the log file keeps them whole
+
+DEF_LOG_DIR = os.path.join(Path.home(), ".lastools_gui", "logs")
+LOG_MAX_BYTES = 10 * 1024 ** 2  # per log file before it rotates
+LOG_BACKUPS = 3  # rotated files kept per job, e.g. job.log.1 .. job.log.3
+LOG_KEEP_JOBS = 200  # newest job logs kept in the log folder
+
+
+class LineBuffer():
+    """
+    Ring buffer holding the last <max_lines> lines of output.
+    Lines are numbered from the start of the session, so a view can keep its place while old lines drop out.
+    """
+
+    def __init__(self, max_lines: int = CONSOLE_MAX_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.partial = ""  # text after the last newline
+        self.dropped = 0  # lines pushed out of the front of the buffer
+
+    def append(self, text: str):
+        parts = (self.partial + text).split("\n")
+        self.partial = parts.pop()[:MAX_LINE_CHARS]
+        for line in parts:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(line[:MAX_LINE_CHARS])
+
+    def first(self):
+        """:returns number of the oldest line still held"""
+        return self.dropped
+
+    def end(self):
+        """:returns number one past the newest line, the unterminated line counts"""
+        return self.dropped + len(self.lines) + (1 if self.partial else 0)
+
+    def window(self, start: int, count: int):
+        """:returns up to <count> lines starting at line number <start>"""
+        start = max(start - self.dropped, 0)
+        lines = list(itertools.islice(self.lines, start, start + count))
+        if self.partial and len(lines) < count and start + len(lines) >= len(self.lines):
+            lines.append(self.partial)
+        return lines
+
+    def clear(self):
+        self.dropped += len(self.lines) + (1 if self.partial else 0)
+        self.lines.clear()
+        self.partial = ""
+
+
+class LogFile():
+    """
+    Appends text to <path>, rotating it to <path>.1, <path>.2 ... once it reaches <max_bytes>.
+    Safe to write from several threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "ab")
+        self.size = self.file.tell()
+
+    def write(self, text: str):
+        data = text.encode("utf-8", errors="replace")
+        with self.lock:
+            if self.file is None:
+                return
+            if self.size and self.size + len(data) > self.max_bytes:
+                self.rotate()
+            self.file.write(data)
+            self.file.flush()
+            self.size += len(data)
+
+    def rotate(self):
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, "wb")
+        self.size = 0
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def job_log_path(name: str, log_dir: str = DEF_LOG_DIR):
+    """:returns new log path for job <name>, e.g. 20250214-093012_lasground_a.log"""
+    safe_name = re.sub(r"[^\w.-]+", "_", name).strip("_") or "job"
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(log_dir, f"{stamp}_{safe_name}.log")
+    count = 1
+    while os.path.exists(path):
+        count += 1
+        path = os.path.join(log_dir, f"{stamp}_{safe_name}_{count}.log")
+    return path
+
+
+def open_job_log(name: str, log_dir: str = DEF_LOG_DIR):
+    """:returns LogFile for a new job, old job logs beyond LOG_KEEP_JOBS are removed"""
+    prune_logs(log_dir)
+    return LogFile(job_log_path(name, log_dir))
+
+
+def prune_logs(log_dir: str = DEF_LOG_DIR, keep: int = LOG_KEEP_JOBS):
+    if not os.path.isdir(log_dir):
+        return
+    # rotated logs and anything else written next to the log, e.g. telemetry
+    cache.prune_files(Path(log_dir).glob("*.log"), keep, lambda log: log.parent.glob(f"{glob.escape(log.stem)}.*"))
@@ -0,0 +1,345 @@
+# In-process ground classification: a progressive morphological filter over a grid of the memmapped points,
+# run tile by tile in worker processes, for machines without lasground64
+
+import os
+import math
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import lasreader
+import tiling
+
+GROUND_CLASS = 2
+NON_GROUND_CLASS = 1
+
+ENGINE_TILE_POINTS = 2_000_000  # smaller than tiling.TARGET_TILE_POINTS so every core gets tiles
+DEF_SUBSTEPS = 8  # grid cells per ground step when -sub is not given
+INITIAL_THRESHOLD = 0.3  # metres a cell may rise above the opened surface at the smallest window
+NOISE_TOLERANCE = 0.1  # metres points may scatter above the minimum surface and still be ground
+DEF_DOWN_SPIKE = 1.0  # metres below the ground surface that are still ground when no spike is set
+DOWN_SPIKE_FACTOR = 10  # lasground removes down-spikes ten times deeper than up-spikes
+MAX_FILL_ITERATIONS = 1000
+
+
+def default_bulge(step: float):
+    """lasground's default, one tenth of the step for steps above 5 m and one fifth otherwise"""
+    return step / 10 if step > 5 else step / 5
+
+
+### Grid operations, NaN marks empty cells
+
+def grid_minimum(x, y, z, x0: float, y0: float, cell: float, ncols: int, nrows: int):
+    """:returns (nrows, ncols) lowest z per cell, row 0 at <y0>"""
+    col = np.clip(((x - x0) / cell).astype(np.int64), 0, ncols - 1)
+    row = np.clip(((y - y0) / cell).astype(np.int64), 0, nrows - 1)
+    surface = np.full(nrows * ncols, np.inf)
+    np.minimum.at(surface, row * ncols + col, z)
+    surface[np.isinf(surface)] = np.nan
+    return surface.reshape(nrows, ncols)
+
+
+def windows(surface, size: int):
+    """:returns (nrows, ncols, size, size) view of the <size> neighbourhood of every cell, edges replicated"""
+    half = size // 2
+    return sliding_window_view(np.pad(surface, half, mode="edge"), (size, size))
+
+
+def fill_nodata(surface):
+    """fills empty cells with the mean of their filled neighbours, growing inwards from the edges of each gap"""
+    surface = surface.copy()
+    for _ in range(MAX_FILL_ITERATIONS):
+        empty = np.isnan(surface)
+        if not empty.any():
+            break
+        if empty.all():
+            surface[:] = 0.0
+            break
+        neighbours = windows(surface, 3)[empty]
+        counts = np.sum(~np.isnan(neighbours), axis=(1, 2))
+        sums = np.nansum(neighbours, axis=(1, 2))
+        values = np.full(len(counts), np.nan)
+        filled = counts > 0
+        values[filled] = sums[filled] / counts[filled]
+        surface[empty] = values
+    surface[np.isnan(surface)] = np.nanmin(surface)
+    return surface
+
+
+def sliding(surface, size: int, reduce):
+    """separable <size> x <size> minimum or maximum filter, <reduce> is np.min or np.max"""
+    half = size // 2
+    rows = reduce(sliding_window_view(np.pad(surface, ((half, half), (0, 0)), mode="edge"), size, axis=0), axis=-1)
+    return reduce(sliding_window_view(np.pad(rows, ((0, 0), (half, half)), mode="edge"), size, axis=1), axis=-1)
+
+
+def opening(surface, size: int):
+    """erosion then dilation, removes objects narrower than <size> cells"""
+    return sliding(sliding(surface, size, np.min), size, np.max)
+
+
+def window_sizes(max_size: int):
+    """odd window sizes in cells, 3, 5, 9, 17 ... growing exponentially up to <max_size>"""
+    sizes = []
+    k = 1
+    while 2 ** k + 1 < max_size:
+        sizes.append(2 ** k + 1)
+        k += 1
+    return sizes + [max_size]
+
+
+def progressive_opening(surface, cell: float, step: float, bulge: float):
+    """
+    Zhang et al. progressive morphological filter. Each opening removes objects narrower than its window,
+    cells rising more than the threshold above it are non-ground. The threshold grows with the window,
+    by <bulge> at the full <step>.
+    :returns ground surface: the minimum where it is ground, the opened surface where it is not
+    """
+    max_size = max(3, int(round(step / cell)) | 1)
+    ground = surface.copy()
+    opened = surface
+    for size in window_sizes(max_size):
+        opened_next = opening(opened, size)
+        threshold = INITIAL_THRESHOLD + bulge * min(size * cell / step, 1.0)
+        non_ground = opened - opened_next > threshold
+        # a cell flagged again by a wider window takes the lower estimate of that window
+        ground[non_ground] = opened_next[non_ground]
+        opened = opened_next
+    return ground
+
+
+def remove_spikes(surface, spike: float):
+    """replaces cells more than <spike> above, or DOWN_SPIKE_FACTOR times that below, their 3x3 median"""
+    median = np.median(windows(surface, 3).reshape(*surface.shape, 9), axis=-1)
+    spikes = (surface - median > spike) | (median - surface > DOWN_SPIKE_FACTOR * spike)
+    return np.where(spikes, median, surface)
+
+
+def smooth_rough_patches(surface, stddev: float):
+    """
+    fits a plane to every 3x3 patch and replaces cells whose patch deviates from it by more than <stddev>
+    metres (standard deviation) with the plane, the in-process stand-in for lasground's planar patch check
+    """
+    patches = windows(surface, 3)
+    offsets = np.array([-1.0, 0.0, 1.0])
+    mean = patches.mean(axis=(2, 3))
+    gy = np.einsum("ijkl,k->ij", patches, offsets) / 6
+    gx = np.einsum("ijkl,l->ij", patches, offsets) / 6
+    plane = mean[..., None, None] + gy[..., None, None] * offsets[:, None] + gx[..., None, None] * offsets[None, :]
+    deviation = np.sqrt(np.mean((patches - plane) ** 2, axis=(2, 3)))
+    return np.where(deviation > stddev, mean, surface)
+
+
+def sample(surface, x, y, x0: float, y0: float, cell: float):
+    """:returns bilinear interpolation of <surface>, whose values sit at the cell centres, at the points"""
+    nrows, ncols = surface.shape
+    fx = np.clip((x - x0) / cell - 0.5, 0, ncols - 1)
+    fy = np.clip((y - y0) / cell - 0.5, 0, nrows - 1)
+    col = np.minimum(fx.astype(np.int64), max(ncols - 2, 0))
+    row = np.minimum(fy.astype(np.int64), max(nrows - 2, 0))
+    tx = np.clip(fx - col, 0, 1)
+    ty = np.clip(fy - row, 0, 1)
+    col1 = np.minimum(col + 1, ncols - 1)
+    row1 = np.minimum(row + 1, nrows - 1)
+    top = surface[row, col] * (1 - tx) + surface[row, col1] * tx
+    bottom = surface[row1, col] * (1 - tx) + surface[row1, col1] * tx
+    return top * (1 - ty) + bottom * ty
+
+
+### Classification
+
+def last_returns(las_file: lasreader.LasFile, records):
+    """:returns True for last (or single) returns, earlier returns are never ground like in lasground"""
+    return_byte = np.asarray(records["return_byte"])
+    if las_file.point_format >= 6:
+        number, count = return_byte & 0x0F, return_byte >> 4
+    else:
+        number, count = return_byte & 0x07, (return_byte >> 3) & 0x07
+    return (number >= count) | (count == 0)
+
+
+def classify_points(x, y, z, last, settings: dict):
+    """
+    :param last: True for points that may be ground
+    :param settings: step, bulge, offset, spike, stddev and sub as in ground_settings
+    :returns boolean ground mask
+    """
+    if len(z) == 0:
+        return np.zeros(0, dtype=bool)
+    step = settings["step"]
+    x0, y0 = float(x.min()), float(y.min())
+    area = max((float(x.max()) - x0) * (float(y.max()) - y0), 1e-9)
+    spacing = math.sqrt(area / len(z))
+    # fine enough to resolve the step, coarse enough that most cells hold a last return
+    cell = max(step / settings["sub"], 2 * spacing)
+    ncols = int((float(x.max()) - x0) / cell) + 1
+    nrows = int((float(y.max()) - y0) / cell) + 1
+
+    surface = fill_nodata(grid_minimum(x[last], y[last], z[last], x0, y0, cell, ncols, nrows))
+    surface = progressive_opening(surface, cell, step, settings["bulge"])
+    if settings["spike"]:
+        surface = remove_spikes(surface, settings["spike"])
+    if settings["stddev"]:
+        surface = smooth_rough_patches(surface, settings["stddev"])
+
+    # on slopes the cell minimum sits at the downhill edge, so allow one cell of rise
+    gy, gx = np.gradient(surface, cell) if min(surface.shape) > 1 else (np.zeros_like(surface),) * 2
+    slope = np.hypot(gx, gy)
+    col = np.clip(((x - x0) / cell).astype(np.int64), 0, ncols - 1)
+    row = np.clip(((y - y0) / cell).astype(np.int64), 0, nrows - 1)
+    tolerance = settings["offset"] + NOISE_TOLERANCE + slope[row, col] * cell
+    down = DOWN_SPIKE_FACTOR * settings["spike"] if settings["spike"] else DEF_DOWN_SPIKE
+    height = z - sample(surface, x, y, x0, y0, cell)
+    return last & (height <= tolerance) & (height >= -down)
+
+
+def ground_settings(params):
+    """
+    :param params: lastools_core.GroundParams or anything with step, offset, bulge, spike, stddev and sub
+    :returns plain dict for the worker processes, stddev converted from lasground's centimetres to metres
+    """
+    step = float(params.step)
+    return {
+        "step": step,
+        "offset": float(params.offset) if params.offset is not None else 0.05,
+        "bulge": float(params.bulge) if params.bulge is not None else default_bulge(step),
+        "spike": float(params.spike) if params.spike else None,
+        "stddev": float(params.stddev) / 100 if params.stddev else None,
+        "sub": float(params.sub) if params.sub else DEF_SUBSTEPS,
+    }
+
+
+### Tiles over a point index
+
+def build_index(las_file: lasreader.LasFile, tiles, ncols: int, index_path: str,
+                chunk_size: int = lasreader.CHUNK_POINTS):
+    """
+    counting sort of the point numbers by core tile into a memmap at <index_path>
+    :returns offsets, the points of tile t are index[offsets[t]:offsets[t + 1]]
+    """
+    grid = (tiles[0].x0, tiles[0].y0, tiles[0].size, ncols, len(tiles) // ncols)
+    return las_file.sort_by_cell(grid, index_path, chunk_size=chunk_size)
+
+
+def classify_tile(job: dict):
+    """
+    worker process: classifies the buffered points of one tile and writes the classes of its core points
+    :returns core point count, ground point count
+    """
+    las_file = lasreader.LasFile(job["input_path"])
+    index = np.load(job["index_path"], mmap_mode="r")
+    offsets = job["offsets"]
+    core = np.asarray(index[offsets[job["tile"]]:offsets[job["tile"] + 1]])
+    if len(core) == 0:
+        return 0, 0
+    neighbours = [np.asarray(index[offsets[t]:offsets[t + 1]]) for t in job["neighbours"]]
+    points = las_file.points()
+
+    # buffer points come from the neighbouring tiles, sorted so the memmap is read front to back
+    candidates = np.sort(np.concatenate(neighbours)) if neighbours else np.zeros(0, dtype=np.int64)
+    x, y, _ = las_file.scaled_xyz(points[candidates])
+    x0, y0, x1, y1 = job["buffered_box"]
+    buffer = candidates[(x >= x0) & (x < x1) & (y >= y0) & (y < y1)]
+    core = np.sort(core)
+    selected = np.concatenate([core, buffer])
+    records = points[selected]
+    x, y, z = las_file.scaled_xyz(records)
+    ground = classify_points(x, y, z, last_returns(las_file, records), job["settings"])[:len(core)]
+
+    output = np.memmap(job["output_path"], dtype=las_file.dtype(), mode="r+",
+                       offset=las_file.header.offset_to_point_data, shape=(len(points),))
+    classes = np.where(ground, GROUND_CLASS, NON_GROUND_CLASS).astype(np.uint8)
+    if las_file.point_format >= 6:
+        output["classification"][core] = classes
+    else:
+        # keep the synthetic, key-point and withheld flags
+        flags = np.asarray(output["classification_byte"][core]) & 0xE0
+        output["classification_byte"][core] = flags | classes
+    output.flush()
+    del output
+    return len(core), int(ground.sum())
+
+
+def classify_file(input_path: str, output_path: str, params, workers: int = None, is_cancelled=None):
+    """
+    copies <input_path> to <output_path> and sets every point to ground (2) or non-ground (1),
+    tiles are classified in up to <workers> processes
+    :param params: lastools_core.GroundParams or anything with its attributes
+    :param is_cancelled: optional callable() -> bool, checked between tiles
+    :returns point count, ground point count, None, None if cancelled
+    the partly classified copy is removed if cancelled or failed
+    :raises ValueError for LAZ input or output
+    """
+    las_file = lasreader.LasFile(input_path)
+    if las_file.is_compressed:
+        raise ValueError(f"{os.path.basename(input_path)} is LAZ compressed, decompress it with laszip first")
+    if output_path.lower().endswith(".laz"):
+        raise ValueError("the NumPy ground engine writes LAS, choose a .las output")
+    settings = ground_settings(params)
+    header = las_file.header
+
+    area = max((header.maxs[0] - header.mins[0]) * (header.maxs[1] - header.mins[1]), 1e-9)
+    size = math.sqrt(ENGINE_TILE_POINTS * area / max(header.point_count, 1))
+    size = max(size, tiling.MIN_TILE_STEPS * settings["step"])
+    buffer = tiling.DEF_BUFFER_STEPS * settings["step"]
+    tiles = tiling.plan_tiles(header.mins, header.maxs, size, buffer)
+    ncols = max(tile.col for tile in tiles) + 1
+
+    shutil.copyfile(input_path, output_path)
+    folder = tempfile.mkdtemp(prefix="groundfilter_", dir=os.path.dirname(os.path.abspath(output_path)))
+    complete = False
+    try:
+        index_path = os.path.join(folder, "index.npy")
+        offsets = [int(offset) for offset in build_index(las_file, tiles, ncols, index_path)]
+        jobs = []
+        for number, tile in enumerate(tiles):
+            neighbours = [
+                other.row * ncols + other.col for other in tiles
+                if other is not tile and abs(other.col - tile.col) <= 1 and abs(other.row - tile.row) <= 1
+            ]
+            jobs.append({
+                "input_path": input_path,
+                "output_path": output_path,
+                "index_path": index_path,
+                "offsets": offsets,
+                "tile": number,
+                "neighbours": neighbours,
+                "buffered_box": (tile.x0 - buffer, tile.y0 - buffer, tile.x1 + buffer, tile.y1 + buffer),
+                "settings": settings,
+            })
+
+        points = ground = 0
+        workers = max(1, min(int(workers or os.cpu_count() or 1), len(jobs)))
+        if workers == 1:
+            for job in jobs:
+                if is_cancelled and is_cancelled():
+                    return None, None
+                tile_points, tile_ground = classify_tile(job)
+                points += tile_points
+                ground += tile_ground
+            complete = True
+            return points, ground
+
+        # forking the multi-threaded GUI can copy a held lock into the workers, spawn starts them clean
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(classify_tile, job) for job in jobs]
+            for future in futures:
+                if is_cancelled and is_cancelled():
+                    executor.shutdown(cancel_futures=True)
+                    return None, None
+                tile_points, tile_ground = future.result()
+                points += tile_points
+                ground += tile_ground
+        complete = True
+        return points, ground
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        if not complete:
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
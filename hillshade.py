@@ -0,0 +1,129 @@
+# In-process hillshading of blast2dem elevation rasters
+
+import math
+from pathlib import Path
+
+import numpy as np
+
+import raster
+
+
+class Light():
+    """
+    Light source, the same vector blast2dem gets through -light x y z.
+    r_factor scales the brightness.
+    """
+
+    def __init__(self, azimuth: float, altitude: float, r_factor: float = 1.0):
+        self.azimuth = float(azimuth)
+        self.altitude = float(altitude)
+        self.r_factor = float(r_factor)
+
+    def vector(self):
+        # matches sph2cart in lastools_core.py
+        elevation = math.radians(self.altitude)
+        azimuth = math.radians(self.azimuth)
+        return (
+            self.r_factor * math.cos(elevation) * math.cos(azimuth),
+            self.r_factor * math.cos(elevation) * math.sin(azimuth),
+            self.r_factor * math.sin(elevation),
+        )
+
+
+def block_normals(elevation, xdim: float, ydim: float):
+    """
+    Horn's 3x3 gradient on a block that carries one halo row above and below.
+    :param elevation: float array of shape (rows + 2, ncols), NaN for nodata
+    :returns unit surface normals (nx, ny, nz) for the inner rows, NaN where a neighbour is nodata
+    """
+    # replicate the first/last column so the output keeps the full width
+    z = np.pad(elevation, ((0, 0), (1, 1)), mode="edge")
+    a, b, c = z[:-2, :-2], z[:-2, 1:-1], z[:-2, 2:]
+    d, f = z[1:-1, :-2], z[1:-1, 2:]
+    g, h, i = z[2:, :-2], z[2:, 1:-1], z[2:, 2:]
+
+    dz_dx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8.0 * xdim)
+    # rows run north to south, so the northward gradient is top minus bottom
+    dz_dy = ((a + 2 * b + c) - (g + 2 * h + i)) / (8.0 * ydim)
+
+    norm = np.sqrt(dz_dx * dz_dx + dz_dy * dz_dy + 1.0)
+    return -dz_dx / norm, -dz_dy / norm, 1.0 / norm
+
+
+def shade(normals, light: Light):
+    """:returns uint8 hillshade, 0 for nodata"""
+    nx, ny, nz = normals
+    lx, ly, lz = light.vector()
+    intensity = nx * lx + ny * ly + nz * lz
+    intensity = np.nan_to_num(intensity, nan=0.0)
+    return np.clip(intensity * 255.0, 0, 255).astype(np.uint8)
+
+
+class HillshadeOutput():
+    """PNG or BIL (uint8) writer for one light"""
+
+    def __init__(self, path: str, light: Light, source: raster.BilRaster):
+        self.path = path
+        self.light = light
+        self.row = 0
+        if Path(path).suffix.lower() == ".png":
+            self.png = raster.PngWriter(path, source.nrows, source.ncols)
+            self.bil = None
+        else:
+            self.png = None
+            self.bil = raster.create_bil(path, source.nrows, source.ncols, np.uint8, source.georef())
+
+    def write(self, rows):
+        if self.png is not None:
+            self.png.write_rows(rows)
+        else:
+            self.bil[self.row:self.row + rows.shape[0]] = rows
+        self.row += rows.shape[0]
+
+    def close(self):
+        if self.png is not None:
+            self.png.close()
+        else:
+            self.bil.flush()
+            del self.bil
+
+
+def shade_block(source: raster.BilRaster, writers, start: int, stop: int):
+    """
+    shades rows [start, stop) of <source> into every HillshadeOutput of <writers>, which must be at row <start>
+    the rows around the block must be final already, they are its halo
+    """
+    # one halo row on each side, replicated at the raster edges
+    block = source.read_rows(start - 1, stop + 1)
+    if start == 0:
+        block = np.vstack([block[:1], block])
+    if stop == source.nrows:
+        block = np.vstack([block, block[-1:]])
+
+    normals = block_normals(block, source.xdim, source.ydim)
+    for writer in writers:
+        writer.write(shade(normals, writer.light))
+
+
+def render(input_path: str, outputs, block_rows: int = None):
+    """
+    Shades a blast2dem .bil/.hdr elevation raster for one or more lights in a single pass over the data.
+    :param outputs: list of (output_path, Light), .png paths get a PNG, anything else a uint8 BIL
+    :param block_rows: rows per block, defaults to raster.BLOCK_CELLS worth
+    """
+    source = raster.BilRaster(input_path)
+    block_rows = block_rows or raster.block_rows(source.ncols)
+    writers = [HillshadeOutput(path, light, source) for path, light in outputs]
+    try:
+        for start in range(0, source.nrows, block_rows):
+            shade_block(source, writers, start, min(start + block_rows, source.nrows))
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+def output_name(hillshade_path: str, light: Light):
+    """name for an additional light e.g. dem_hillshade_x_az315_alt45.png"""
+    path = Path(hillshade_path)
+    return str(path.with_name(f"{path.stem}_az{light.azimuth:g}_alt{light.altitude:g}{path.suffix}"))
+
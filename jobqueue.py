@@ -0,0 +1,155 @@
+# Queue of GUI jobs with a global concurrency limit, cancellation and re-prioritisation
+
+import time
+import itertools
+import threading
+
+import lastools_core as core
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+DEF_MAX_RUNNING_JOBS = 2
+KEEP_FINISHED_JOBS = 100  # older finished jobs are forgotten
+
+_job_ids = itertools.count(1)
+
+
+class QueuedJob():
+    """
+    One Run/Run Tiled/Run Batch click.
+    :param action: callable(QueuedJob) returning True on success, runs on its own thread
+    :param on_cancel: optional callable(QueuedJob), called instead of <action> if the job is cancelled while queued
+    """
+
+    def __init__(self, name: str, action=None, on_cancel=None):
+        self.id = next(_job_ids)
+        self.name = name
+        self.action = action
+        self.on_cancel = on_cancel
+        self.status = JOB_QUEUED
+        self.tracker = core.ProcessTracker()
+        self.progress = None  # progress.JobProgress once the job has a runner
+        self.error = ""
+        self.started = None
+        self.finished = None
+
+    def seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def __repr__(self):
+        return f"QueuedJob({self.id}, {self.name!r}, {self.status})"
+
+
+class JobQueue():
+    """
+    Starts queued jobs in order while fewer than <max_running> are running.
+    A job failing or raising only marks that job failed.
+    """
+
+    def __init__(self, max_running: int = DEF_MAX_RUNNING_JOBS, on_change=None):
+        """
+        :param on_change: optional callable(QueuedJob), called from any thread when a job changes state or position
+        """
+        self.max_running = max(1, max_running)
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.jobs = []  # every job, in submission order
+        self.queued = []  # jobs waiting to start, next one first
+        self.running = 0
+
+    def notify(self, job: QueuedJob):
+        if self.on_change:
+            self.on_change(job)
+
+    def submit(self, job: QueuedJob):
+        with self.lock:
+            self.jobs.append(job)
+            self.queued.append(job)
+        self.notify(job)
+        self.dispatch()
+        return job
+
+    def dispatch(self):
+        started = []
+        with self.lock:
+            while self.queued and self.running < self.max_running:
+                job = self.queued.pop(0)
+                job.status = JOB_RUNNING
+                job.started = time.perf_counter()
+                self.running += 1
+                started.append(job)
+        for job in started:
+            self.notify(job)
+            threading.Thread(target=self.run_job, args=(job,), daemon=True).start()
+
+    def run_job(self, job: QueuedJob):
+        try:
+            success = job.action(job)
+        except Exception as e:  # a broken job must not take the queue down with it
+            job.error = str(e)
+            success = False
+        with self.lock:
+            self.running -= 1
+            job.finished = time.perf_counter()
+            if job.tracker.cancelled:
+                job.status = JOB_CANCELLED
+            else:
+                job.status = JOB_DONE if success else JOB_FAILED
+            self.forget_finished()
+        self.notify(job)
+        self.dispatch()
+
+    def cancel(self, job: QueuedJob):
+        """removes a queued job, or kills the child processes of a running one"""
+        with self.lock:
+            if job in self.queued:
+                self.queued.remove(job)
+                job.status = JOB_CANCELLED
+                job.tracker.cancelled = True
+                self.forget_finished()
+            elif job.status != JOB_RUNNING:
+                return
+        if job.status == JOB_CANCELLED:
+            if job.on_cancel is not None:
+                job.on_cancel(job)
+            self.notify(job)
+        else:
+            job.tracker.cancel()
+
+    def forget_finished(self):
+        """drops the oldest finished jobs beyond KEEP_FINISHED_JOBS, call with the lock held"""
+        finished = [job for job in self.jobs if job.status not in (JOB_QUEUED, JOB_RUNNING)]
+        for job in finished[:-KEEP_FINISHED_JOBS]:
+            self.jobs.remove(job)
+
+    def move(self, job: QueuedJob, offset: int):
+        """moves a queued job <offset> places towards the front (negative) or back (positive) of the queue"""
+        with self.lock:
+            if job not in self.queued:
+                return
+            index = self.queued.index(job)
+            self.queued.pop(index)
+            self.queued.insert(min(max(index + offset, 0), len(self.queued)), job)
+        self.notify(job)
+
+    def set_max_running(self, max_running: int):
+        with self.lock:
+            self.max_running = max(1, max_running)
+        self.dispatch()
+
+    def ordered(self):
+        """:returns running jobs, then queued jobs in start order, then finished jobs newest first"""
+        with self.lock:
+            running = [job for job in self.jobs if job.status == JOB_RUNNING]
+            finished = [job for job in reversed(self.jobs) if job.status not in (JOB_QUEUED, JOB_RUNNING)]
+            return running + list(self.queued) + finished
+
+    def get(self, job_id: int):
+        with self.lock:
+            return next((job for job in self.jobs if job.id == job_id), None)
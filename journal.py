@@ -0,0 +1,278 @@
+# SQLite journal of jobs and stage runs, so an interrupted run can be resumed.
+# Every job and stage transition is committed as it happens; on resume a stage whose output is still the one
+# the journal recorded (same input, arguments, size and checksum) is skipped.
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+DEF_JOURNAL_PATH = os.path.join(Path.home(), ".lastools_gui", "journal.sqlite")
+JOURNAL_KEEP_JOBS = 500  # older jobs and their stages are deleted
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Windows process queries
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+STILL_ACTIVE = 259  # exit code of a process that has not exited
+
+# Job and stage states
+JOURNAL_RUNNING = "running"
+JOURNAL_DONE = "done"
+JOURNAL_FAILED = "failed"
+JOURNAL_CANCELLED = "cancelled"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    id INTEGER PRIMARY KEY,
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    tool TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    input_size INTEGER,
+    input_mtime_ns INTEGER,
+    args TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    output_size INTEGER,
+    output_sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS stages_output ON stages(output_path, status);
+CREATE TABLE IF NOT EXISTS ingested (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    status TEXT NOT NULL,
+    finished REAL NOT NULL
+);
+"""
+
+
+def open_journal(output, path: str = DEF_JOURNAL_PATH):
+    """
+    :param output: callable(str) told why the journal cannot be opened
+    :returns Journal, None if it cannot be opened
+    """
+    try:
+        return Journal(path)
+    except (OSError, sqlite3.Error) as e:
+        output(f"Cannot open job journal {path}, runs are not journaled: {e}\n")
+        return None
+
+
+def file_sha256(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_stat(path: str):
+    """:returns size and mtime_ns of <path>, None, None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def process_alive(pid: int):
+    """:returns True if <pid> is a running process on this host"""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill would terminate it, the process is opened and asked for its exit code instead
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+        kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # a process of another user exists but cannot be opened
+            return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+        try:
+            exit_code = wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return True
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Journal():
+    """
+    Jobs and their stage runs in one SQLite file, safe to use from several threads.
+    A job still marked running whose process is gone was interrupted and can be resumed.
+    """
+
+    def __init__(self, path: str = DEF_JOURNAL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        # WAL keeps readers and the committing stage threads out of each other's way
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def execute(self, sql: str, parameters=()):
+        """:returns the rows of <sql>, fetched while the shared connection is still locked"""
+        with self.lock:
+            return self.db.execute(sql, parameters).fetchall()
+
+    def fetch_one(self, sql: str, parameters=()):
+        """:returns the first row of <sql>, None if there is none"""
+        rows = self.execute(sql, parameters)
+        return rows[0] if rows else None
+
+    def insert(self, sql: str, parameters=()):
+        """:returns the id of the row <sql> inserted"""
+        with self.lock:
+            return self.db.execute(sql, parameters).lastrowid
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    ### Jobs
+
+    def start_job(self, name: str, spec: dict, resume_id: int = None):
+        """
+        :param spec: JSON-able description the job can be rebuilt from on resume
+        :param resume_id: id of an interrupted job this process takes over instead of adding one
+        :returns job id
+        """
+        if resume_id is not None:
+            self.execute("UPDATE jobs SET status = ?, host = ?, pid = ?, finished = NULL WHERE id = ?",
+                         (JOURNAL_RUNNING, socket.gethostname(), os.getpid(), resume_id))
+            return resume_id
+        job_id = self.insert(
+            "INSERT INTO jobs (name, spec, status, host, pid, started) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, json.dumps(spec, sort_keys=True), JOURNAL_RUNNING, socket.gethostname(), os.getpid(), time.time()),
+        )
+        self.execute("DELETE FROM jobs WHERE id <= ?", (job_id - JOURNAL_KEEP_JOBS,))
+        return job_id
+
+    def finish_job(self, job_id: int, status: str):
+        self.execute("UPDATE jobs SET status = ?, finished = ? WHERE id = ?", (status, time.time(), job_id))
+
+    def job_spec(self, job_id: int):
+        row = self.fetch_one("SELECT spec FROM jobs WHERE id = ?", (job_id,))
+        return json.loads(row["spec"]) if row else None
+
+    def interrupted_jobs(self, name: str = None, spec: dict = None):
+        """
+        :param name, spec: optional filters, <spec> must match exactly
+        :returns job rows still marked running by a process of this host that is gone, newest first
+        """
+        rows = self.execute(
+            "SELECT * FROM jobs WHERE status = ? AND host = ? ORDER BY id DESC", (JOURNAL_RUNNING, socket.gethostname())
+        )
+        wanted = json.dumps(spec, sort_keys=True) if spec is not None else None
+        return [
+            row for row in rows
+            if not process_alive(row["pid"])
+            and (name is None or row["name"] == name)
+            and (wanted is None or row["spec"] == wanted)
+        ]
+
+    def discard_job(self, job_id: int):
+        """marks an interrupted job as one that will not be resumed"""
+        self.finish_job(job_id, JOURNAL_CANCELLED)
+
+    def stage_counts(self, job_id: int):
+        """:returns dict of stage status -> count for <job_id>"""
+        rows = self.execute("SELECT status, COUNT(*) AS count FROM stages WHERE job_id = ? GROUP BY status",
+                            (job_id,))
+        return {row["status"]: row["count"] for row in rows}
+
+    ### Stages
+
+    def start_stage(self, job_id: int, tool: str, input_path: str, args: str, output_path: str):
+        """:returns stage id"""
+        input_size, input_mtime_ns = file_stat(input_path)
+        return self.insert(
+            "INSERT INTO stages (job_id, tool, input_path, input_size, input_mtime_ns, args, output_path, status, "
+            "started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, tool, os.path.abspath(input_path), input_size, input_mtime_ns, args,
+             os.path.abspath(output_path), JOURNAL_RUNNING, time.time()),
+        )
+
+    def finish_stage(self, stage_id: int, success: bool, output_path: str):
+        """records the outcome of a stage, with the size and checksum of its output if it succeeded"""
+        size = digest = None
+        if success:
+            try:
+                size, digest = os.path.getsize(output_path), file_sha256(output_path)
+            except OSError:
+                success = False  # reported success without an output, not something to skip on resume
+        self.execute(
+            "UPDATE stages SET status = ?, finished = ?, output_size = ?, output_sha256 = ? WHERE id = ?",
+            (JOURNAL_DONE if success else JOURNAL_FAILED, time.time(), size, digest, stage_id),
+        )
+
+    def is_complete(self, tool: str, input_path: str, args: str, output_path: str):
+        """
+        :returns True if the last successful run of <tool> writing <output_path> had the same input and arguments,
+        and the output still has the size and checksum recorded then
+        """
+        row = self.fetch_one(
+            "SELECT * FROM stages WHERE output_path = ? AND status = ? ORDER BY id DESC LIMIT 1",
+            (os.path.abspath(output_path), JOURNAL_DONE),
+        )
+        if row is None or row["tool"] != tool or row["args"] != args:
+            return False
+        if row["input_path"] != os.path.abspath(input_path) or \
+                (row["input_size"], row["input_mtime_ns"]) != file_stat(input_path):
+            return False
+        try:
+            if os.path.getsize(output_path) != row["output_size"]:
+                return False
+            return file_sha256(output_path) == row["output_sha256"]
+        except OSError:
+            return False
+
+    ### Watched files
+
+    def record_ingest(self, path: str, success: bool):
+        """records that a watched file was processed, as it is now"""
+        size, mtime_ns = file_stat(path)
+        self.execute(
+            "INSERT OR REPLACE INTO ingested (path, size, mtime_ns, status, finished) VALUES (?, ?, ?, ?, ?)",
+            (os.path.abspath(path), size, mtime_ns, JOURNAL_DONE if success else JOURNAL_FAILED, time.time()),
+        )
+
+    def ingest_status(self, path: str):
+        """:returns JOURNAL_DONE or JOURNAL_FAILED if <path> was processed and has not changed since, else None"""
+        row = self.fetch_one("SELECT * FROM ingested WHERE path = ?", (os.path.abspath(path),))
+        if row is None or (row["size"], row["mtime_ns"]) != file_stat(path):
+            return None
+        return row["status"]
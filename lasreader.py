@@ -0,0 +1,306 @@
+# Pure-Python LAS/LAZ header and point reader
+
+import os
+import struct
+
+import numpy as np
+
+CHUNK_POINTS = 1_000_000
+VLR_HEADER_SIZE = 54
+LASZIP_USER_ID = "laszip encoded"
+
+ASPRS_CLASSES = {
+    0: "never classified",
+    1: "unclassified",
+    2: "ground",
+    3: "low vegetation",
+    4: "medium vegetation",
+    5: "high vegetation",
+    6: "building",
+    7: "low point (noise)",
+    8: "model key-point",
+    9: "water",
+    10: "rail",
+    11: "road surface",
+    12: "overlap",
+    13: "wire guard",
+    14: "wire conductor",
+    15: "transmission tower",
+    16: "wire connector",
+    17: "bridge deck",
+    18: "high noise",
+}
+
+# Point record layouts, see the ASPRS LAS 1.4 R15 specification
+_LEGACY_BASE = [
+    ("X", "<i4"), ("Y", "<i4"), ("Z", "<i4"),
+    ("intensity", "<u2"),
+    ("return_byte", "u1"),  # return number, number of returns, scan direction, edge of flight line
+    ("classification_byte", "u1"),  # classification (5 bits) + synthetic, key-point, withheld flags
+    ("scan_angle_rank", "i1"),
+    ("user_data", "u1"),
+    ("point_source_id", "<u2"),
+]
+_EXTENDED_BASE = [
+    ("X", "<i4"), ("Y", "<i4"), ("Z", "<i4"),
+    ("intensity", "<u2"),
+    ("return_byte", "u1"),  # return number (4 bits), number of returns (4 bits)
+    ("flags_byte", "u1"),  # classification flags, scanner channel, scan direction, edge of flight line
+    ("classification", "u1"),
+    ("user_data", "u1"),
+    ("scan_angle", "<i2"),
+    ("point_source_id", "<u2"),
+    ("gps_time", "<f8"),
+]
+_GPS = [("gps_time", "<f8")]
+_RGB = [("red", "<u2"), ("green", "<u2"), ("blue", "<u2")]
+_NIR = [("nir", "<u2")]
+_WAVE = [
+    ("wave_packet_index", "u1"),
+    ("wave_byte_offset", "<u8"),
+    ("wave_packet_size", "<u4"),
+    ("wave_return_location", "<f4"),
+    ("wave_x_t", "<f4"), ("wave_y_t", "<f4"), ("wave_z_t", "<f4"),
+]
+POINT_FORMAT_FIELDS = {
+    0: _LEGACY_BASE,
+    1: _LEGACY_BASE + _GPS,
+    2: _LEGACY_BASE + _RGB,
+    3: _LEGACY_BASE + _GPS + _RGB,
+    4: _LEGACY_BASE + _GPS + _WAVE,
+    5: _LEGACY_BASE + _GPS + _RGB + _WAVE,
+    6: _EXTENDED_BASE,
+    7: _EXTENDED_BASE + _RGB,
+    8: _EXTENDED_BASE + _RGB + _NIR,
+    9: _EXTENDED_BASE + _WAVE,
+    10: _EXTENDED_BASE + _RGB + _NIR + _WAVE,
+}
+
+
+def point_dtype(point_format: int, record_length: int):
+    """
+    :returns numpy structured dtype of one point record, padded with an "extra_bytes" field
+    """
+    if point_format not in POINT_FORMAT_FIELDS:
+        raise ValueError(f"Unsupported point data format {point_format}")
+    fields = list(POINT_FORMAT_FIELDS[point_format])
+    size = np.dtype(fields).itemsize
+    if record_length < size:
+        raise ValueError(f"Point record length {record_length} is too short for format {point_format}")
+    if record_length > size:
+        fields.append(("extra_bytes", f"V{record_length - size}"))
+    return np.dtype(fields)
+
+
+class LasHeader():
+    """public header block"""
+
+    def __init__(self, data: bytes):
+        if len(data) < 227 or data[:4] != b"LASF":
+            raise ValueError("Not a LAS/LAZ file")
+        self.file_source_id, self.global_encoding = struct.unpack_from("<HH", data, 4)
+        self.version_major, self.version_minor = data[24], data[25]
+        self.system_identifier = data[26:58].rstrip(b"\0").decode("ascii", "replace")
+        self.generating_software = data[58:90].rstrip(b"\0").decode("ascii", "replace")
+        self.creation_day, self.creation_year = struct.unpack_from("<HH", data, 90)
+        (
+            self.header_size,
+            self.offset_to_point_data,
+            self.number_of_vlrs,
+            format_byte,
+            self.point_record_length,
+            legacy_point_count,
+        ) = struct.unpack_from("<HIIBHI", data, 94)
+        self.legacy_points_by_return = struct.unpack_from("<5I", data, 111)
+        self.scale = struct.unpack_from("<3d", data, 131)
+        self.offset = struct.unpack_from("<3d", data, 155)
+        max_x, min_x, max_y, min_y, max_z, min_z = struct.unpack_from("<6d", data, 179)
+        self.mins = (min_x, min_y, min_z)
+        self.maxs = (max_x, max_y, max_z)
+
+        # LASzip sets bit 7 (and historically bit 6) of the point format
+        self.is_compressed = bool(format_byte & 0xC0)
+        self.point_format = format_byte & 0x3F
+
+        self.point_count = legacy_point_count
+        self.points_by_return = self.legacy_points_by_return
+        self.start_of_first_evlr = 0
+        self.number_of_evlrs = 0
+        if self.version_minor >= 4 and len(data) >= 375:
+            self.start_of_first_evlr, self.number_of_evlrs, point_count = struct.unpack_from("<QIQ", data, 235)
+            self.point_count = point_count or legacy_point_count
+            self.points_by_return = struct.unpack_from("<15Q", data, 255)
+
+    @property
+    def version(self):
+        return f"{self.version_major}.{self.version_minor}"
+
+
+class Vlr():
+    """variable length record"""
+
+    def __init__(self, user_id: str, record_id: int, description: str, data: bytes):
+        self.user_id = user_id
+        self.record_id = record_id
+        self.description = description
+        self.data = data
+
+    def __repr__(self):
+        return f"Vlr({self.user_id!r}, {self.record_id}, {len(self.data)} bytes)"
+
+
+class LasFile():
+    """
+    Header, VLRs and memory mapped point records of a LAS file.
+    LAZ headers and VLRs can be read, LAZ points cannot since they are compressed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        with open(path, "rb") as file:
+            self.header = LasHeader(file.read(375))
+            file.seek(self.header.header_size)
+            self.vlrs = []
+            for _ in range(self.header.number_of_vlrs):
+                vlr_header = file.read(VLR_HEADER_SIZE)
+                if len(vlr_header) < VLR_HEADER_SIZE:
+                    break
+                user_id = vlr_header[2:18].rstrip(b"\0").decode("ascii", "replace")
+                record_id, length = struct.unpack_from("<HH", vlr_header, 18)
+                description = vlr_header[22:54].rstrip(b"\0").decode("ascii", "replace")
+                self.vlrs.append(Vlr(user_id, record_id, description, file.read(length)))
+        self.is_compressed = self.header.is_compressed or any(vlr.user_id == LASZIP_USER_ID for vlr in self.vlrs)
+        self._points = None
+
+    @property
+    def point_count(self):
+        return self.header.point_count
+
+    @property
+    def point_format(self):
+        return self.header.point_format
+
+    def dtype(self):
+        return point_dtype(self.header.point_format, self.header.point_record_length)
+
+    def points(self):
+        """
+        :returns read-only numpy structured memmap of every point record, nothing is copied
+        """
+        if self.is_compressed:
+            raise ValueError(f"{os.path.basename(self.path)} is LAZ compressed, decompress it with laszip to read points")
+        if self._points is None:
+            dtype = self.dtype()
+            available = max(self.file_size - self.header.offset_to_point_data, 0) // dtype.itemsize
+            count = min(self.header.point_count, available)
+            self._points = np.memmap(
+                self.path, dtype=dtype, mode="r", offset=self.header.offset_to_point_data, shape=(count,)
+            )
+        return self._points
+
+    def iter_chunks(self, chunk_size: int = CHUNK_POINTS):
+        """yields (start index, memmap view) of up to <chunk_size> point records"""
+        points = self.points()
+        for start in range(0, len(points), chunk_size):
+            yield start, points[start:start + chunk_size]
+
+    def scaled_xyz(self, records):
+        """:returns x, y, z float64 arrays in map units for a slice of point records"""
+        scale, offset = self.header.scale, self.header.offset
+        return (
+            records["X"] * scale[0] + offset[0],
+            records["Y"] * scale[1] + offset[1],
+            records["Z"] * scale[2] + offset[2],
+        )
+
+    def iter_xyz(self, chunk_size: int = CHUNK_POINTS):
+        """yields scaled x, y, z arrays one chunk at a time, so the whole file is never copied"""
+        for _, records in self.iter_chunks(chunk_size):
+            yield self.scaled_xyz(records)
+
+    def classification(self, records):
+        """:returns uint8 classification of a slice of point records"""
+        if self.header.point_format >= 6:
+            return np.asarray(records["classification"])
+        return np.asarray(records["classification_byte"]) & 0x1F
+
+    def class_histogram(self, chunk_size: int = CHUNK_POINTS):
+        """:returns dict of classification -> point count"""
+        counts = np.zeros(256, dtype=np.int64)
+        for _, records in self.iter_chunks(chunk_size):
+            counts += np.bincount(self.classification(records), minlength=256)
+        return {int(cls): int(counts[cls]) for cls in np.nonzero(counts)[0]}
+
+    def cell_ids(self, records, grid):
+        """
+        :param grid: origin x, origin y, cell size, ncols, nrows, row 0 at the origin
+        :returns int64 cell of every record, row * ncols + col, points outside are clamped to the edge cells
+        """
+        origin_x, origin_y, cell, ncols, nrows = grid
+        x, y, _ = self.scaled_xyz(records)
+        col = np.clip(((x - origin_x) // cell).astype(np.int64), 0, ncols - 1)
+        row = np.clip(((y - origin_y) // cell).astype(np.int64), 0, nrows - 1)
+        return row * ncols + col
+
+    def sort_by_cell(self, grid, index_path: str, on_chunk=None, is_cancelled=None, chunk_size: int = CHUNK_POINTS):
+        """
+        counting sort of the point numbers by the cell of <grid> into an .npy memmap at <index_path>,
+        in file order within a cell, uint32 unless there are too many points
+        :param on_chunk: optional callable(records), sees every record once while the cells are counted
+        :param is_cancelled: optional callable() -> True to stop after the current chunk
+        :returns offsets, the points of cell c are index[offsets[c]:offsets[c + 1]], None if cancelled
+        """
+        ncells = grid[3] * grid[4]
+        counts = np.zeros(ncells, dtype=np.int64)
+        for _, records in self.iter_chunks(chunk_size):
+            counts += np.bincount(self.cell_ids(records, grid), minlength=ncells)
+            if on_chunk is not None:
+                on_chunk(records)
+            if is_cancelled is not None and is_cancelled():
+                return None
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        point_type = np.uint32 if offsets[-1] < 2 ** 32 else np.int64
+        index = np.lib.format.open_memmap(index_path, mode="w+", dtype=point_type, shape=(int(offsets[-1]),))
+        try:
+            cursor = offsets[:-1].copy()
+            for start, records in self.iter_chunks(chunk_size):
+                ids = self.cell_ids(records, grid)
+                order = np.argsort(ids, kind="stable")
+                sorted_ids = ids[order]
+                chunk_counts = np.bincount(sorted_ids, minlength=ncells)
+                first = np.concatenate([[0], np.cumsum(chunk_counts)[:-1]])
+                rank = np.arange(len(order)) - first[sorted_ids]
+                index[cursor[sorted_ids] + rank] = start + order
+                cursor += chunk_counts
+                if is_cancelled is not None and is_cancelled():
+                    return None
+            index.flush()
+        finally:
+            # unmapped before returning, so the caller can move or delete the file
+            del index
+        return offsets
+
+    def summary(self):
+        """:returns multi-line description of the header"""
+        header = self.header
+        lines = [
+            f"{os.path.basename(self.path)}",
+            f"LAS {header.version}, point format {header.point_format}"
+            f"{' (LAZ compressed)' if self.is_compressed else ''}, {header.point_record_length} bytes/point",
+            f"points: {header.point_count:,}",
+            f"min: {header.mins[0]:.3f} {header.mins[1]:.3f} {header.mins[2]:.3f}",
+            f"max: {header.maxs[0]:.3f} {header.maxs[1]:.3f} {header.maxs[2]:.3f}",
+            f"VLRs: {', '.join(f'{vlr.user_id}/{vlr.record_id}' for vlr in self.vlrs) or 'none'}",
+        ]
+        return "\n".join(lines)
+
+
+def format_histogram(histogram: dict):
+    """:returns one line per classification with its share of the points"""
+    total = sum(histogram.values()) or 1
+    return "\n".join(
+        f"class {cls} ({ASPRS_CLASSES.get(cls, 'user defined')}): {count:,} ({100.0 * count / total:.1f}%)"
+        for cls, count in sorted(histogram.items())
+    )
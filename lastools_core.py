@@ -0,0 +1,1469 @@
+# GUI-free core: typed parameters, LAStools command lines and stage runners.
+# Nothing in here may import tkinter, the headless entry point runs on render nodes without it.
+
+import os
+import sys
+import json
+import math
+import codecs
+import itertools
+import time
+import signal
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+
+import admission
+import batch
+import cache
+import console
+import journal
+import pipeline
+import progress
+import telemetry
+import watch
+
+try:
+    import groundfilter
+    import hillshade
+    import lasreader
+    import mosaic
+    import overviews
+    import pointindex
+    import preview
+    import tiling
+except ImportError:
+    # numpy is optional: without it ground classification and hillshading always run lasground and blast2dem,
+    # and tiling, preview, mosaics, the raster and point viewers, file information and sweep counts are unavailable
+    groundfilter = None
+    hillshade = None
+    lasreader = None
+    mosaic = None
+    overviews = None
+    pointindex = None
+    preview = None
+    tiling = None
+
+LASTOOLS_PATH = "C:\\lastools"
+
+DEF_GRD_STEP = 5.0
+DEF_DEM_STEP = 0.5
+DEF_DEM_AZIMUTH = 270.0
+DEF_DEM_ALTITUDE = 45.0
+DEF_DEM_R_FACTOR = 1.0
+GROUND_OPTIONAL_PARAMS = ("stddev", "offset", "bulge", "spike", "sub")
+
+HILLSHADE_ENGINE_LASTOOLS = "lastools"
+HILLSHADE_ENGINE_NUMPY = "numpy"
+GROUND_ENGINE_LASTOOLS = "lastools"
+GROUND_ENGINE_NUMPY = "numpy"
+
+# unwanted intermediates that still need a file go here, tmpfs where there is one
+DEF_SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SCRATCH_HEADROOM = 2.0  # scratch must have this many times a chain's temporary bytes free, other chains share it
+
+# Ground output formats, auto compresses the ground points that are kept and leaves temporary ones uncompressed
+GROUND_FORMAT_AUTO = "auto"
+GROUND_FORMAT_LAS = "las"
+GROUND_FORMAT_LAZ = "laz"
+LAZ_SIZE_RATIO = 0.15  # typical LAZ size as a fraction of the same points in LAS
+
+DEF_MOSAIC_RULE = "last"  # mosaic.RULE_LAST, the mosaic module needs numpy
+
+OUTPUT_CHUNK_SIZE = 64 * 1024  # bytes read from a child process per call
+RETURNCODE_CANCELLED = -1
+
+_scratch_ids = itertools.count(1)
+
+
+### math ultilty
+def sph2cart(azimuth, elevation, r):
+    x = r * math.cos(math.radians(elevation)) * math.cos(math.radians(azimuth))
+    y = r * math.cos(math.radians(elevation)) * math.sin(math.radians(azimuth))
+    z = r * math.sin(math.radians(elevation))
+    return x, y, z
+
+
+def number(value):
+    """formats a command line number without float noise or exponent notation"""
+    return f"{float(value):.12g}"
+
+
+def parse_lights(text: str):
+    """
+    :param text: "azimuth/altitude" pairs separated by commas or spaces e.g. "315/45, 45/30"
+    :returns list of (azimuth, altitude), altitude defaults to 45
+    """
+    lights = []
+    for item in text.replace(",", " ").split():
+        azimuth, _, altitude = item.partition("/")
+        lights.append((float(azimuth), float(altitude or DEF_DEM_ALTITUDE)))
+    return lights
+
+
+### Parameters
+
+@dataclass
+class GroundParams:
+    """
+    lasground options, optional ones are left out of the command when None
+    :param engine: GROUND_ENGINE_NUMPY classifies in-process with groundfilter instead of lasground64
+    """
+    step: float = DEF_GRD_STEP
+    compute_height: bool = False
+    stddev: float = None
+    offset: float = None
+    bulge: float = None
+    spike: float = None
+    sub: float = None
+    extra_args: list = field(default_factory=list)
+    engine: str = GROUND_ENGINE_LASTOOLS
+
+    def in_process(self):
+        """:returns True if the numpy engine should classify, it falls back to lasground64 without numpy"""
+        return self.engine == GROUND_ENGINE_NUMPY and groundfilter is not None
+
+    def args(self):
+        args = ["-step", number(self.step)]
+        if self.compute_height:
+            args.append("-compute_height")
+        for name in GROUND_OPTIONAL_PARAMS:
+            value = getattr(self, name)
+            if value is not None:
+                args += [f"-{name}", number(value)]
+        return args + [str(arg) for arg in self.extra_args]
+
+
+@dataclass
+class DemParams:
+    """blast2dem elevation options"""
+    step: float = DEF_DEM_STEP
+    extra_args: list = field(default_factory=list)
+
+    def args(self):
+        return ["-step", number(self.step)] + [str(arg) for arg in self.extra_args]
+
+
+@dataclass
+class HillshadeParams:
+    """
+    hillshade light and engine
+    :param extra_lights: additional (azimuth, altitude) pairs, only rendered by the numpy engine
+    """
+    azimuth: float = DEF_DEM_AZIMUTH
+    altitude: float = DEF_DEM_ALTITUDE
+    r_factor: float = DEF_DEM_R_FACTOR
+    engine: str = HILLSHADE_ENGINE_LASTOOLS
+    extra_lights: list = field(default_factory=list)
+
+    def light_args(self):
+        x, y, z = sph2cart(float(self.azimuth), float(self.altitude), float(self.r_factor))
+        return ["-light", str(round(x, 3)), str(round(y, 3)), str(round(z, 3))]
+
+    def lights(self):
+        """:returns list of hillshade.Light for the numpy engine, None if blast2dem should shade"""
+        if self.engine != HILLSHADE_ENGINE_NUMPY or hillshade is None:
+            return None
+        return self.all_lights()
+
+    def all_lights(self):
+        """:returns list of hillshade.Light whatever the engine, numpy must be installed"""
+        lights = [hillshade.Light(self.azimuth, self.altitude, self.r_factor)]
+        lights += [hillshade.Light(azimuth, altitude, self.r_factor) for azimuth, altitude in self.extra_lights]
+        return lights
+
+
+@dataclass
+class IntermediateParams:
+    """
+    what happens to the outputs between chain stages
+    :param keep_ground: write grd_*.las/laz, otherwise lasground is piped straight into blast2dem
+    :param keep_elevation: write the elevation .bil to the output folder, otherwise to <scratch_dir>,
+        deleted once the hillshade is done
+    :param scratch_dir: local volume for temporary outputs, the output folder is used when it is too full
+    :param ground_format: GROUND_FORMAT_AUTO, GROUND_FORMAT_LAS or GROUND_FORMAT_LAZ, the numpy engine writes LAS only
+    """
+    keep_ground: bool = True
+    keep_elevation: bool = True
+    scratch_dir: str = DEF_SCRATCH_DIR
+    ground_format: str = GROUND_FORMAT_AUTO
+
+
+@dataclass
+class MosaicParams:
+    """
+    one elevation raster and hillshade from the elevation rasters of every file of a job, made after them
+    :param rule: how cells of overlapping rasters combine, one of mosaic.MOSAIC_RULES
+    :param name: the outputs are <name>_elevation.bil and <name>_hillshade.png in the output folder
+    """
+    enabled: bool = False
+    rule: str = DEF_MOSAIC_RULE
+    name: str = "mosaic"
+
+
+### Command lines
+
+def tool_path(lastools_path: str, tool: str):
+    """
+    :param tool: executable name without extension e.g. lasground64
+    :returns path of the executable, tool.exe if present, else the bare name
+    """
+    exe_path = os.path.join(lastools_path, f"{tool}.exe")
+    bare_path = os.path.join(lastools_path, tool)
+    if os.path.exists(exe_path) or (os.name == "nt" and not os.path.exists(bare_path)):
+        return exe_path
+    return bare_path
+
+
+def ground_command(lastools_path: str, input_path: str, output_path: str, params: GroundParams):
+    return [tool_path(lastools_path, "lasground64"), "-v", "-i", input_path, "-o", output_path] + params.args()
+
+
+def blast2dem_command(lastools_path: str, input_path: str, output_path: str, params: DemParams, extra_args=()):
+    return (
+        [tool_path(lastools_path, "blast2dem64"), "-v", "-keep_class", "2", "-i", input_path, "-o", output_path]
+        + params.args() + list(extra_args)
+    )
+
+
+def ground_pipe_command(lastools_path: str, input_path: str, params: GroundParams):
+    """lasground writing uncompressed LAS to stdout, to be piped into blast2dem_pipe_command"""
+    return [tool_path(lastools_path, "lasground64"), "-v", "-i", input_path, "-stdout", "-olas"] + params.args()
+
+
+def blast2dem_pipe_command(lastools_path: str, output_path: str, params: DemParams):
+    """blast2dem reading the points from stdin"""
+    return (
+        [tool_path(lastools_path, "blast2dem64"), "-v", "-keep_class", "2", "-stdin", "-o", output_path]
+        + params.args()
+    )
+
+
+def hillshade_command(lastools_path: str, input_path: str, output_path: str, params: HillshadeParams):
+    return (
+        [tool_path(lastools_path, "blast2dem64"), "-v", "-hillshade", "-opng", "-i", input_path, "-o", output_path]
+        + params.light_args()
+    )
+
+
+def view_command(lastools_path: str, file_path: str):
+    return [tool_path(lastools_path, "lasview64"), file_path]
+
+
+def is_piped(command):
+    """:returns True if <command> is a list of commands to pipe together rather than one argument list"""
+    return bool(command) and isinstance(command[0], (list, tuple))
+
+
+def command_text(command):
+    """:returns the command as one line for the log, piped commands joined with |"""
+    if is_piped(command):
+        return " | ".join(subprocess.list2cmdline(part) for part in command)
+    return subprocess.list2cmdline(command)
+
+
+def chain_outputs(input_path: str, out_folder: str = ""):
+    """
+    :param out_folder: output folder, empty writes next to <input_path>
+    :returns ground, elevation and hillshade output paths for <input_path>
+    """
+    name = os.path.basename(input_path)
+    stem = Path(name).stem
+    out_folder = out_folder or os.path.dirname(input_path)
+    return (
+        os.path.join(out_folder, f"grd_{name}"),
+        os.path.join(out_folder, f"dem_elevation_{stem}.bil"),
+        os.path.join(out_folder, f"dem_hillshade_{stem}.png"),
+    )
+
+
+def mosaic_outputs(out_folder: str, name: str):
+    """:returns elevation and hillshade paths of a mosaic"""
+    return os.path.join(out_folder, f"{name}_elevation.bil"), os.path.join(out_folder, f"{name}_hillshade.png")
+
+
+### Output planning
+
+def is_laz(path: str):
+    return path.lower().endswith(".laz")
+
+
+@dataclass
+class OutputPlan:
+    """
+    where the outputs of one chain go
+    :param grd_path: ground output, None when lasground is piped into blast2dem
+    :param scratch: folder of the temporary outputs, None if there are none
+    :param temporary: outputs deleted as soon as every stage reading them has succeeded
+    :param local_scratch: <scratch> is on the scratch volume, not in the output folder
+    :param notes: decisions worth a line in the log
+    """
+    grd_path: str
+    ele_path: str
+    hill_path: str
+    scratch: str = None
+    temporary: list = field(default_factory=list)
+    local_scratch: bool = False
+    notes: list = field(default_factory=list)
+
+
+def temporary_bytes(input_path: str, ground_path: str, elevation_path: str, dem_step: float):
+    """:returns estimated size of the temporary ground and elevation outputs of a chain, either path may be None"""
+    size = 0
+    try:
+        input_size = os.path.getsize(input_path)
+    except OSError:
+        input_size = 0
+    if ground_path:
+        size += input_size / LAZ_SIZE_RATIO if is_laz(input_path) else input_size
+    bounds = batch.read_bounds(input_path)
+    if elevation_path and bounds is not None and dem_step:
+        min_x, min_y, max_x, max_y = bounds
+        size += admission.RASTER_CELL_BYTES * int((max_x - min_x) / dem_step + 1) * int((max_y - min_y) / dem_step + 1)
+    return size
+
+
+def free_bytes(folder: str):
+    """:returns free bytes on the volume of <folder> or the nearest folder above it that exists, None if unknown"""
+    folder = os.path.abspath(folder)
+    while not os.path.isdir(folder) and os.path.dirname(folder) != folder:
+        folder = os.path.dirname(folder)
+    try:
+        return shutil.disk_usage(folder).free
+    except OSError:
+        return None
+
+
+def plan_outputs(input_path: str, out_folder: str, ground: GroundParams, dem: DemParams,
+                 intermediates: IntermediateParams = None):
+    """
+    picks the format and location of every chain output of <input_path>: kept ground points are compressed for the
+    output disk, temporary ones go uncompressed to the local scratch volume if it has room
+    :param out_folder: output folder, empty writes next to <input_path>
+    :returns OutputPlan
+    """
+    grd_path, ele_path, hill_path = chain_outputs(input_path, out_folder)
+    intermediates = intermediates or IntermediateParams()
+    notes = []
+    # the numpy engine cannot write to a pipe, its unwanted ground output goes to scratch instead
+    piped = not intermediates.keep_ground and not ground.in_process()
+    temporary_ground = not intermediates.keep_ground and not piped
+
+    ground_format = intermediates.ground_format
+    if ground.engine == GROUND_ENGINE_NUMPY:
+        if ground_format == GROUND_FORMAT_LAZ:
+            notes.append("the numpy ground engine writes LAS only, ground output is not compressed")
+        ground_format = GROUND_FORMAT_LAS
+    elif ground_format == GROUND_FORMAT_AUTO:
+        # scratch is local, compressing what is deleted again only costs CPU
+        ground_format = GROUND_FORMAT_LAS if temporary_ground else GROUND_FORMAT_LAZ
+    grd_path = None if piped else str(Path(grd_path).with_suffix(f".{ground_format}"))
+
+    temporary = []
+    if temporary_ground:
+        temporary.append(grd_path)
+    if not intermediates.keep_elevation:
+        temporary.append(ele_path)
+    if not temporary:
+        return OutputPlan(grd_path, ele_path, hill_path, notes=notes)
+
+    needed = temporary_bytes(input_path, grd_path if temporary_ground else None,
+                             ele_path if not intermediates.keep_elevation else None, dem.step)
+    free = free_bytes(intermediates.scratch_dir)
+    local_scratch = free is not None and free >= SCRATCH_HEADROOM * needed
+    if local_scratch:
+        scratch = os.path.join(intermediates.scratch_dir, f"lastools_{os.getpid()}_{next(_scratch_ids)}")
+    else:
+        notes.append(
+            f"{intermediates.scratch_dir} has less than {SCRATCH_HEADROOM * needed / 1024 ** 2:.0f} MB free, "
+            f"temporary outputs go to the output folder"
+        )
+        scratch = os.path.join(os.path.dirname(hill_path), f".lastools_{os.getpid()}_{next(_scratch_ids)}")
+    temporary = [os.path.join(scratch, os.path.basename(path)) for path in temporary]
+    if temporary_ground:
+        grd_path = temporary[0]
+    if not intermediates.keep_elevation:
+        ele_path = temporary[-1]
+    return OutputPlan(grd_path, ele_path, hill_path, scratch, temporary, local_scratch, notes)
+
+
+### Running commands
+
+def write_stdout(message: str):
+    sys.stdout.write(message)
+    sys.stdout.flush()
+
+
+def kill_process_tree(process: subprocess.Popen):
+    """kills <process> and every process it started"""
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        return
+    try:
+        # the child leads its own session, see ProcessTracker.popen
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class ProcessTracker():
+    """
+    Child processes of one job, so cancelling the job can kill all of them.
+    Once cancelled no new process is started.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processes = set()
+        self.cancelled = False
+
+    def popen(self, command, **kwargs):
+        """:returns subprocess.Popen in its own process group, None if the job was cancelled"""
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        with self.lock:
+            if self.cancelled:
+                return None
+            process = subprocess.Popen(command, **kwargs)
+            self.processes.add(process)
+            return process
+
+    def discard(self, process: subprocess.Popen):
+        with self.lock:
+            self.processes.discard(process)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            processes = list(self.processes)
+        for process in processes:
+            kill_process_tree(process)
+
+
+def run_command(command, output=write_stdout, tracker: ProcessTracker = None, metrics=None):
+    """
+    Runs <command> and streams its output to <output> in chunks.
+    :param tracker: optional ProcessTracker of the job running the command
+    :param metrics: optional telemetry.StageMetrics, filled with the CPU, memory and I/O of the child
+    :returns the return code, RETURNCODE_CANCELLED if the job was cancelled before it started
+    """
+    popen = tracker.popen if tracker else subprocess.Popen
+    process = popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if process is None:
+        return RETURNCODE_CANCELLED
+    try:
+        stream_output(process.stdout, output)
+        return telemetry.wait_measured(process, metrics)
+    finally:
+        if tracker:
+            tracker.discard(process)
+
+
+def stream_output(stream, output):
+    """passes everything read from the binary <stream> to <output> until it closes"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        # read1 returns whatever is available (up to the chunk size) instead of waiting for all of it
+        out = stream.read1(OUTPUT_CHUNK_SIZE)
+        if out == b"":
+            break
+        output(decoder.decode(out))
+    output(decoder.decode(b"", final=True))
+
+
+def run_piped(commands, output=write_stdout, tracker: ProcessTracker = None, metrics=None):
+    """
+    Runs <commands> with the stdout of each one piped into the stdin of the next, like a | b in a shell,
+    so the data between them never touches the disk. Their log output is streamed to <output>.
+    :param metrics: optional telemetry.StageMetrics, filled with the combined usage of the processes,
+        saved_bytes gets twice the bytes that went through the pipes (not written, not read back)
+    :returns the first non-zero return code, RETURNCODE_CANCELLED if the job was cancelled before all started
+    """
+    popen = tracker.popen if tracker else subprocess.Popen
+    processes = []
+    readers = []
+
+    def stop(started):
+        # the processes already running would wait on the pipe forever
+        for process in started:
+            if tracker:
+                kill_process_tree(process)
+            else:
+                process.kill()
+            process.wait()
+
+    stdin = None
+    try:
+        for index, command in enumerate(commands):
+            last = index == len(commands) - 1
+            try:
+                process = popen(
+                    command, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.STDOUT if last else subprocess.PIPE
+                )
+            except OSError:
+                stop(processes)
+                raise
+            finally:
+                if stdin is not None:
+                    stdin.close()  # the next process holds its own copy, the writer sees EPIPE if it goes away
+            if process is None:
+                stop(processes)
+                return RETURNCODE_CANCELLED
+            processes.append(process)
+            if not last:
+                # LAStools log to stderr when stdout carries the points
+                reader = threading.Thread(target=stream_output, args=(process.stderr, output), daemon=True)
+                reader.start()
+                readers.append(reader)
+                stdin = process.stdout
+        stream_output(processes[-1].stdout, output)
+        for reader in readers:
+            reader.join()
+
+        parts = [replace(metrics) if metrics is not None else None for _ in processes]
+        returncodes = [telemetry.wait_measured(process, part) for process, part in zip(processes, parts)]
+        if metrics is not None:
+            telemetry.combine_concurrent(metrics, parts)
+            piped = [part.write_bytes for part in parts[:-1]]
+            if None not in piped:
+                metrics.saved_bytes = 2 * sum(piped)
+        return next((code for code in returncodes if code != 0), 0)
+    finally:
+        if tracker:
+            for process in processes:
+                tracker.discard(process)
+
+
+class StageRunner():
+    """
+    Runs lasground, blast2dem and hillshade stages against one LAStools install.
+    Used by the Tk app and the headless entry point alike.
+    """
+
+    def __init__(self, lastools_path: str, output=write_stdout, result_cache=None, force_rerun=False, tracker=None,
+                 recorder=None, job_progress=None):
+        """
+        :param output: callable(str) receiving all log output, must be thread safe
+        :param result_cache: optional cache.ResultCache, None always runs the tools
+        :param force_rerun: skip cache lookups but still store new results
+        :param tracker: optional ProcessTracker, cancelling it fails every stage that has not finished
+        :param recorder: optional telemetry.RunTelemetry receiving the resource usage of every stage
+        :param job_progress: optional progress.JobProgress, updated from the -v output of every tool run
+        """
+        self.lastools_path = lastools_path
+        self.output = output
+        self.result_cache = result_cache
+        self.force_rerun = force_rerun
+        self.tracker = tracker
+        self.recorder = recorder
+        self.job_progress = job_progress
+        self.journal = None
+        self.job_id = None
+        self.resume = False
+
+    def use_journal(self, job_journal, job_id: int, resume: bool = False):
+        """
+        records every stage of this runner under <job_id> of <job_journal>
+        :param resume: skip stages whose journaled output is still complete
+        :returns self
+        """
+        self.journal = job_journal
+        self.job_id = job_id
+        self.resume = resume
+        return self
+
+    def with_output(self, output, tracker=None, recorder=None, job_progress=None):
+        """:returns StageRunner with the same install, cache and settings that writes to <output>"""
+        return StageRunner(self.lastools_path, output, self.result_cache, self.force_rerun, tracker, recorder,
+                           job_progress)
+
+    def start_metrics(self, stage: str, input_path: str):
+        """:returns telemetry.StageMetrics for a stage about to run, None without a recorder"""
+        if self.recorder is None:
+            return None
+        points = batch.read_point_count(input_path) if input_path.lower().endswith(batch.LAS_EXTENSIONS) else 0
+        return self.recorder.start(stage, input_path, points or None)
+
+    def record_metrics(self, metrics, returncode: int, output_paths=()):
+        """:param output_paths: files the stage wrote, their size is recorded if it succeeded"""
+        if metrics is not None:
+            metrics.finish(returncode)
+            if returncode == 0 and output_paths:
+                metrics.output_bytes = sum(os.path.getsize(path) for path in output_paths if os.path.isfile(path))
+            self.recorder.record(metrics)
+
+    def is_cancelled(self, name: str):
+        """:returns True, after logging it, if the job of this runner was cancelled"""
+        if self.tracker is not None and self.tracker.cancelled:
+            self.output(f"\n{name}: cancelled\n")
+            return True
+        return False
+
+    def check_output(self, command, metrics=None, parser=None):
+        """
+        :param command: argument list, or list of argument lists to pipe together
+        :param parser: optional progress.VerboseParser the output goes through on its way to the log
+        """
+        output = parser.wrap(self.output) if parser is not None else self.output
+        if is_piped(command):
+            return run_piped(command, output, self.tracker, metrics)
+        return run_command(command, output, self.tracker, metrics)
+
+    def check_output_cached(self, tool: str, command, input_path: str, output_path: str, las_args, metrics=None,
+                            parser=None):
+        """
+        Runs <command> unless the result cache already holds its output, returns the return code.
+        Successful runs are added to the cache.
+        """
+        if self.result_cache is None:
+            return self.check_output(command, metrics, parser)
+        key = self.result_cache.key(tool, input_path, " ".join(las_args), output_path)
+        if not self.force_rerun and self.result_cache.restore(key, output_path):
+            self.output(f"\n{tool}: cache hit, reused {output_path}\n")
+            if metrics is not None:
+                metrics.cached = True
+            return 0
+
+        returncode = self.check_output(command, metrics, parser)
+        if returncode == 0:
+            try:
+                self.result_cache.store(key, output_path)
+            except OSError as e:
+                # the stage itself succeeded, only later runs miss the cache
+                self.output(f"{tool}: could not add {output_path} to the result cache: {e}\n")
+        return returncode
+
+    def stage_parser(self, tool: str, input_path: str, metrics=None):
+        """:returns progress.VerboseParser of a run of <tool> feeding the job progress, None without one"""
+        if self.job_progress is None:
+            return None
+        if metrics is not None:
+            points = metrics.points
+        else:
+            points = batch.read_point_count(input_path) if input_path.lower().endswith(batch.LAS_EXTENSIONS) else 0
+        return self.job_progress.parser(tool, input_path, points)
+
+    def run_tool(self, tool: str, command, input_path: str, output_path: str, las_args, saved_bytes=None):
+        """:param saved_bytes: estimate of the intermediate bytes a piped command avoids, used if it cannot be measured"""
+        if self.is_cancelled(tool):
+            return False
+        if input_path:
+            self.output(f"\n{tool}: {input_path}\n")
+            self.output(command_text(command) + "\n")
+            metrics = self.start_metrics(tool, input_path)
+            parser = self.stage_parser(tool, input_path, metrics)
+            returncode = self.check_output_cached(tool, command, input_path, output_path, las_args, metrics, parser)
+            if parser is not None:
+                parser.close()
+                if returncode == 0:
+                    self.job_progress.finish_stage(tool, input_path)
+            if metrics is not None and metrics.saved_bytes is None and not metrics.cached:
+                metrics.saved_bytes = saved_bytes
+            self.record_metrics(metrics, returncode, [output_path])
+
+            ### check return code
+            if self.is_cancelled(tool):
+                return False
+            if returncode != 0:
+                self.output(f"Error. {tool} failed.\n")
+                return False
+            return True
+        else:
+            self.output(f"Invalid input: {input_path}\n")
+            return False
+
+    def run_las_ground(self, input_path: str, output_path: str, params: GroundParams, workers=None):
+        """:param workers: processes of the numpy engine, None for one per core"""
+        if params.in_process():
+            if not is_laz(input_path) and not is_laz(output_path):
+                return self.run_ground_engine(input_path, output_path, params, workers)
+            self.output("\nthe numpy engine reads and writes LAS only, classifying with lasground\n")
+        elif params.engine == GROUND_ENGINE_NUMPY:
+            self.output("\nnumpy is not installed, classifying with lasground\n")
+        command = ground_command(self.lastools_path, input_path, output_path, params)
+        return self.run_tool("lasground", command, input_path, output_path, params.args())
+
+    def run_ground_engine(self, input_path: str, output_path: str, params: GroundParams, workers=None):
+        """classifies ground in-process with groundfilter, tiles run in up to <workers> processes"""
+        if self.is_cancelled("lasground"):
+            return False
+        if input_path and os.path.exists(input_path):
+            self.output(f"\nlasground (NumPy): {input_path}\n")
+            if params.compute_height or params.extra_args:
+                self.output("compute height and extra arguments need lasground64, ignored\n")
+            metrics = self.start_metrics("lasground", input_path)
+            try:
+                points, ground = groundfilter.classify_file(
+                    input_path, output_path, params, workers, lambda: self.tracker is not None and self.tracker.cancelled
+                )
+            except (OSError, ValueError) as e:
+                self.output(f"Error. lasground failed: {e}\n")
+                self.record_metrics(metrics, 1)
+                return False
+            if points is None:
+                self.record_metrics(metrics, RETURNCODE_CANCELLED)
+                self.is_cancelled("lasground")
+                return False
+            self.record_metrics(metrics, 0, [output_path])
+            self.output(f"wrote {output_path}, {ground:,} of {points:,} points ground "
+                        f"({100.0 * ground / max(points, 1):.1f}%)\n")
+            return True
+        else:
+            self.output(f"Invalid input: {input_path}\n")
+            return False
+
+    def run_blast2dem(self, input_path: str, output_path: str, params: DemParams, extra_args=()):
+        command = blast2dem_command(self.lastools_path, input_path, output_path, params, extra_args)
+        return self.run_tool("blast2dem", command, input_path, output_path, params.args() + list(extra_args))
+
+    def run_piped_dem(self, input_path: str, output_path: str, ground: GroundParams, dem: DemParams):
+        """lasground piped into blast2dem, no ground classified LAS is written"""
+        command = [
+            ground_pipe_command(self.lastools_path, input_path, ground),
+            blast2dem_pipe_command(self.lastools_path, output_path, dem),
+        ]
+        # the ground LAS would hold the same points uncompressed, written once and read back once
+        estimate = 2 * os.path.getsize(input_path) if input_path.lower().endswith(".las") else None
+        return self.run_tool("lasground|blast2dem", command, input_path, output_path,
+                             ground.args() + ["|"] + dem.args(), estimate)
+
+    def run_hillshade(self, input_path: str, output_path: str, params: HillshadeParams):
+        lights = params.lights()
+        if lights:
+            return self.run_hillshade_engine(input_path, output_path, lights)
+        if params.engine == HILLSHADE_ENGINE_NUMPY:
+            self.output("\nnumpy is not installed, shading with blast2dem\n")
+        command = hillshade_command(self.lastools_path, input_path, output_path, params)
+        return self.run_tool("hillshade", command, input_path, output_path, params.light_args())
+
+    def run_hillshade_engine(self, input_path: str, output_path: str, lights):
+        """
+        shades the elevation raster in-process, reading it once for every light
+        the first light writes <output_path>, the others get an _az<>_alt<> suffix
+        """
+        if self.is_cancelled("hillshade"):
+            return False
+        if input_path and os.path.exists(input_path):
+            outputs = [(output_path, lights[0])]
+            outputs += [(hillshade.output_name(output_path, light), light) for light in lights[1:]]
+            self.output(f"\nhillshade (NumPy): {input_path}\n")
+            metrics = self.start_metrics("hillshade", input_path)
+            cpu_start = time.thread_time()
+            try:
+                hillshade.render(input_path, outputs)
+            except (OSError, ValueError, KeyError) as e:
+                self.output(f"Error. hillshade failed: {e}\n")
+                self.record_metrics(metrics, 1)
+                return False
+            if metrics is not None:
+                metrics.user_seconds = time.thread_time() - cpu_start
+            self.record_metrics(metrics, 0, [path for path, _ in outputs])
+            for path, light in outputs:
+                self.output(f"wrote {path} (azimuth {light.azimuth:g}, altitude {light.altitude:g})\n")
+            return True
+        else:
+            self.output(f"Invalid input: {input_path}\n")
+            return False
+
+    def run_mosaic(self, tile_paths, output_path: str, hill_path: str, rule: str, shade: HillshadeParams):
+        """
+        mosaics the elevation rasters <tile_paths> into <output_path>, shading it into <hill_path> in the same pass
+        with the lights of <shade>, in-process whatever its engine
+        """
+        if mosaic is None:
+            self.output("Install numpy to mosaic DEMs\n")
+            return False
+        if self.is_cancelled("mosaic"):
+            return False
+        lights = shade.all_lights()
+        outputs = [(hill_path, lights[0])] + [(hillshade.output_name(hill_path, light), light) for light in lights[1:]]
+        self.output(f"\nmosaic: {len(tile_paths)} rasters into {output_path}, overlaps resolved by {rule}\n")
+        metrics = self.start_metrics("mosaic", output_path)
+        try:
+            size = mosaic.mosaic(tile_paths, output_path, rule, outputs,
+                                 lambda: self.tracker is not None and self.tracker.cancelled)
+        except (OSError, ValueError) as e:
+            self.output(f"Error. mosaic failed: {e}\n")
+            self.record_metrics(metrics, 1)
+            return False
+        if size is None:
+            self.record_metrics(metrics, RETURNCODE_CANCELLED)
+            self.is_cancelled("mosaic")
+            return False
+        self.record_metrics(metrics, 0, [output_path] + [path for path, _ in outputs])
+        self.output(f"wrote {output_path} ({size[1]} by {size[0]} cells) and "
+                    f"{', '.join(path for path, _ in outputs)}\n")
+        return True
+
+    def mosaic_files(self, files, out_folder: str, params: MosaicParams, shade: HillshadeParams):
+        """mosaics the elevation rasters the chains of <files> wrote, in <files> order"""
+        if not files:
+            self.output("\nmosaic: no file succeeded, nothing to mosaic\n")
+            return False
+        tile_paths = [chain_outputs(path, out_folder)[1] for path in files]
+        output_path, hill_path = mosaic_outputs(out_folder or os.path.dirname(files[0]), params.name)
+        return self.run_mosaic(tile_paths, output_path, hill_path, params.rule, shade)
+
+    ### Stages
+
+    def journaled(self, stage: pipeline.Stage, *params):
+        """
+        records the runs of <stage> in the journal of this runner, if it has one
+        :param params: parameter dataclasses of the stage, a changed parameter makes a journaled output stale
+        :returns <stage>
+        """
+        args = json.dumps([asdict(param) for param in params], sort_keys=True)
+        action = stage.action
+
+        def run():
+            if self.journal is None:
+                return action()
+            input_path, output_path = stage.inputs[0], stage.outputs[0]
+            if self.resume and self.journal.is_complete(stage.name, input_path, args, output_path):
+                self.output(f"\n{stage.name}: {output_path} is complete, skipped\n")
+                return True
+            stage_id = self.journal.start_stage(self.job_id, stage.name, input_path, args, output_path)
+            success = False
+            try:
+                success = action()
+            finally:
+                self.journal.finish_stage(stage_id, success, output_path)
+            return success
+
+        stage.action = run
+        return stage
+
+    def ground_stage(self, input_path: str, output_path: str, params: GroundParams):
+        return self.journaled(pipeline.Stage(
+            "lasground",
+            lambda: self.run_las_ground(input_path, output_path, params),
+            inputs=[input_path],
+            outputs=[output_path],
+            step=params.step,
+        ), params)
+
+    def blast2dem_stage(self, input_path: str, output_path: str, params: DemParams):
+        return self.journaled(pipeline.Stage(
+            "blast2dem",
+            lambda: self.run_blast2dem(input_path, output_path, params),
+            inputs=[input_path],
+            outputs=[output_path],
+            step=params.step,
+        ), params)
+
+    def piped_dem_stage(self, input_path: str, output_path: str, ground: GroundParams, dem: DemParams):
+        return self.journaled(pipeline.Stage(
+            "lasground|blast2dem",
+            lambda: self.run_piped_dem(input_path, output_path, ground, dem),
+            inputs=[input_path],
+            outputs=[output_path],
+            step=dem.step,
+        ), ground, dem)
+
+    def hillshade_stage(self, input_path: str, output_path: str, params: HillshadeParams):
+        return self.journaled(pipeline.Stage(
+            "hillshade",
+            lambda: self.run_hillshade(input_path, output_path, params),
+            inputs=[input_path],
+            outputs=[output_path],
+        ), params)
+
+    def command_stage(self, name: str, command, inputs, outputs):
+        """stage that runs <command> without the result cache, used for throwaway intermediates"""
+        def action():
+            if self.is_cancelled(name):
+                return False
+            self.output(f"\n{name}: {command_text(command)}\n")
+            metrics = self.start_metrics(name, inputs[0] if inputs else "")
+            returncode = self.check_output(command, metrics)
+            self.record_metrics(metrics, returncode, outputs)
+            if self.is_cancelled(name):
+                return False
+            if returncode != 0:
+                self.output(f"Error. {name} failed.\n")
+                return False
+            return True
+
+        return pipeline.Stage(name, action, inputs=inputs, outputs=outputs)
+
+    def chain_stages(self, input_path: str, out_folder: str, ground: GroundParams, dem: DemParams, shade: HillshadeParams,
+                     intermediates: IntermediateParams = None, plan: OutputPlan = None):
+        """
+        lasground -> blast2dem -> hillshade for one input file
+        :param out_folder: output folder, empty writes next to <input_path>
+        :param intermediates: optional IntermediateParams, None keeps every intermediate in <out_folder>
+        :param plan: optional OutputPlan the caller already made from the same arguments
+        :returns list of pipeline.Stage
+        """
+        plan = plan or plan_outputs(input_path, out_folder, ground, dem, intermediates)
+        for note in plan.notes:
+            self.output(f"\n{os.path.basename(input_path)}: {note}\n")
+
+        if plan.grd_path:
+            stages = [
+                self.ground_stage(input_path, plan.grd_path, ground),
+                self.blast2dem_stage(plan.grd_path, plan.ele_path, dem),
+            ]
+        else:
+            stages = [self.piped_dem_stage(input_path, plan.ele_path, ground, dem)]
+        stages.append(self.hillshade_stage(plan.ele_path, plan.hill_path, shade))
+        if plan.scratch:
+            self.use_scratch(stages, plan)
+        return stages
+
+    def use_scratch(self, stages, plan: OutputPlan):
+        """
+        creates the scratch folder of <plan> before the first of <stages>, deletes every temporary output as soon as
+        the stages reading it have succeeded, and removes the folder after the last stage,
+        or as soon as one fails since the pipeline then skips the rest
+        """
+        first, last = stages[0], stages[-1]
+        readers = {
+            os.path.normpath(path): [stage for stage in stages if os.path.normpath(path) in stage.inputs]
+            for path in plan.temporary
+        }
+        succeeded = set()
+        removed = []  # sizes of the temporary outputs deleted so far
+
+        def remove(path):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            removed.append(size)
+
+        def cleanup():
+            metrics = self.start_metrics("cleanup", "")
+            for path in Path(plan.scratch).glob("*"):
+                if path.is_file():
+                    remove(str(path))
+            shutil.rmtree(plan.scratch, ignore_errors=True)
+            if metrics is not None and plan.local_scratch:
+                # written to scratch and read back once instead of going through the output disk
+                metrics.saved_bytes = 2 * sum(removed)
+            self.record_metrics(metrics, 0)
+
+        def wrap(stage):
+            action = stage.action
+
+            def run():
+                if stage is first:
+                    os.makedirs(plan.scratch, exist_ok=True)
+                success = False
+                try:
+                    success = action()
+                    if success:
+                        succeeded.add(stage)
+                        for path in stage.inputs:
+                            if path in readers and all(reader in succeeded for reader in readers[path]):
+                                remove(path)
+                finally:
+                    if stage is last or not success:
+                        cleanup()
+                return success
+
+            stage.action = run
+
+        for stage in stages:
+            wrap(stage)
+
+    ### Tiled processing
+
+    def run_tiled_chain(self, input_path: str, grd_output: str, ele_output: str, hill_output: str,
+                        ground: GroundParams, dem: DemParams, shade: HillshadeParams,
+                        tile_size=None, buffer=None, workers=None):
+        """
+        splits <input_path> into buffered tiles, runs lasground and blast2dem per tile in parallel,
+        then merges the buffer-free tile results and shades the merged DEM
+        :returns True if every stage succeeded
+        """
+        if tiling is None:
+            self.output("Install numpy to use tiled processing\n")
+            return False
+        if self.is_cancelled("tiling"):
+            return False
+        try:
+            las_file = lasreader.LasFile(input_path)
+            tiles = tiling.plan(las_file, ground.step, dem.step, tile_size, buffer)
+        except (OSError, ValueError) as e:
+            self.output(f"Error. cannot tile {input_path}: {e}\n")
+            return False
+
+        folder = None
+        if len(tiles) == 1:
+            self.output("\ntiling: input fits in one tile, running it whole\n")
+            stages = [
+                self.ground_stage(input_path, grd_output, ground),
+                self.blast2dem_stage(grd_output, ele_output, dem),
+            ]
+        else:
+            folder = tiling.tile_folder(grd_output)
+            self.output(
+                f"\ntiling: {len(tiles)} tiles of {tiles[0].size:g} with a {tiles[0].buffer:g} buffer in {folder}\n"
+            )
+            try:
+                tiles = tiling.split(las_file, tiles, folder)
+            except (OSError, ValueError) as e:
+                self.output(f"Error. cannot tile {input_path}: {e}\n")
+                shutil.rmtree(folder, ignore_errors=True)
+                return False
+
+            stages = []
+            for tile in tiles:
+                tile.set_output_paths(folder)
+                if ground.in_process():
+                    # the tiles already run in parallel, one process each
+                    stages.append(pipeline.Stage(
+                        f"lasground {tile.name}",
+                        lambda tile=tile: self.run_ground_engine(tile.path, tile.ground_path, ground, workers=1),
+                        inputs=[tile.path], outputs=[tile.ground_path],
+                    ))
+                else:
+                    stages.append(self.command_stage(
+                        f"lasground {tile.name}",
+                        ground_command(self.lastools_path, tile.path, tile.ground_path, ground),
+                        [tile.path], [tile.ground_path],
+                    ))
+                stages.append(self.command_stage(
+                    f"blast2dem {tile.name}",
+                    blast2dem_command(self.lastools_path, tile.ground_path, tile.dem_path, dem, tile.dem_grid_args(dem.step)),
+                    [tile.ground_path], [tile.dem_path],
+                ))
+
+            def merge_ground():
+                return tiling.merge_ground_tiles(tiles, grd_output)
+
+            def merge_dem():
+                tiling.merge_dem_tiles([tile.dem_path for tile in tiles], ele_output)
+                return True
+
+            stages.append(pipeline.Stage(
+                "merge ground", merge_ground, inputs=[tile.ground_path for tile in tiles], outputs=[grd_output]
+            ))
+            stages.append(pipeline.Stage(
+                "merge dem", merge_dem, inputs=[tile.dem_path for tile in tiles], outputs=[ele_output]
+            ))
+
+        stages.append(self.hillshade_stage(ele_output, hill_output, shade))
+        try:
+            success = pipeline.Pipeline(stages, max_workers=workers, output=self.output).run()
+        finally:
+            # the tiles and their partial outputs go whether the stages succeeded, failed or were cancelled
+            if folder:
+                shutil.rmtree(folder, ignore_errors=True)
+        self.output(f"\ntiling: {'done' if success else 'failed'} {input_path}\n")
+        return success
+
+
+    ### Preview
+
+    def run_preview(self, input_path: str, ground: GroundParams, dem: DemParams, shade: HillshadeParams,
+                    method: str = None, amount: float = None):
+        """
+        runs ground -> DEM -> hillshade on a thinned subsample of <input_path>
+        the subsample is made once per input and thinning, parameter changes reuse it
+        :param method: preview.THIN_GRID or preview.THIN_EVERY_NTH, None for the grid
+        :param amount: N or grid cell size, None aims for preview.PREVIEW_TARGET_POINTS
+        :returns ground, elevation and hillshade paths of the preview, None if it failed
+        """
+        if preview is None:
+            self.output("Install numpy to use previews\n")
+            return None
+        if self.is_cancelled("preview"):
+            return None
+        try:
+            sample, reused = preview.subsample(input_path, method or preview.THIN_GRID, amount)
+        except (OSError, ValueError) as e:
+            self.output(f"Error. cannot thin {input_path}: {e}\n")
+            return None
+        self.output(
+            f"\npreview: {'reusing' if reused else 'made'} {batch.read_point_count(sample):,} point subsample "
+            f"of {batch.read_point_count(input_path):,} in {sample}\n"
+        )
+
+        out_folder = preview.preview_outputs(sample)
+        os.makedirs(out_folder, exist_ok=True)
+        # the preview's ground points are read back in-process, which needs LAS
+        intermediates = IntermediateParams(ground_format=GROUND_FORMAT_LAS)
+        plan = plan_outputs(sample, out_folder, ground, dem, intermediates)
+        stages = self.chain_stages(sample, out_folder, ground, dem, shade, intermediates, plan)
+        if not pipeline.Pipeline(stages, output=self.output).run():
+            return None
+        return plan.grd_path, plan.ele_path, plan.hill_path
+
+
+### Headless jobs
+
+@dataclass
+class Job:
+    """
+    One headless run, loaded from a JSON job file e.g.
+    {"inputs": ["D:/tiles/*.las"], "output_folder": "D:/out", "ground": {"step": 3},
+     "dem": {"step": 0.5}, "hillshade": {"azimuth": 315, "engine": "numpy"}}
+    """
+    inputs: list
+    output_folder: str = ""
+    lastools_path: str = None
+    workers: int = None
+    tiled: bool = False
+    tile_size: float = None
+    buffer: float = None
+    use_cache: bool = True
+    force_rerun: bool = False
+    ground: GroundParams = field(default_factory=GroundParams)
+    dem: DemParams = field(default_factory=DemParams)
+    hillshade: HillshadeParams = field(default_factory=HillshadeParams)
+    intermediates: IntermediateParams = field(default_factory=IntermediateParams)
+    mosaic: MosaicParams = field(default_factory=MosaicParams)
+    agents: list = field(default_factory=list)  # "host:port" of cluster agents, empty runs locally
+    agent_token: str = None  # the --token the agents were started with
+    admission: bool = True  # workers is then the most concurrent stages, fewer run if memory or throughput says so
+    memory_budget_gb: float = None  # None for admission.DEF_MEMORY_FRACTION of physical memory
+
+
+def job_from_dict(data: dict):
+    """
+    :returns Job of the parsed JSON of a job file, or of a job_spec
+    :raises TypeError, AttributeError on unknown or malformed settings
+    """
+    data = dict(data)
+    if isinstance(data.get("inputs"), str):
+        data["inputs"] = [data["inputs"]]
+    data["ground"] = GroundParams(**data.get("ground", {}))
+    data["dem"] = DemParams(**data.get("dem", {}))
+    data["hillshade"] = HillshadeParams(**data.get("hillshade", {}))
+    data["intermediates"] = IntermediateParams(**data.get("intermediates", {}))
+    data["mosaic"] = MosaicParams(**data.get("mosaic", {}))
+    return Job(**data)
+
+
+def job_spec(job: Job):
+    """:returns JSON-able dict of <job>, job_from_dict rebuilds it, without the agent token"""
+    return asdict(replace(job, agent_token=None))
+
+
+def load_job(job_path: str):
+    """
+    :returns Job
+    :raises ValueError on a malformed job file
+    """
+    try:
+        with open(job_path, "r", encoding="utf-8") as file:
+            return job_from_dict(json.load(file))
+    except (OSError, TypeError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid job file {job_path}: {e}")
+
+
+def job_files(job: Job):
+    """:returns input files of <job>, expanding folders and globs"""
+    files = []
+    for source in job.inputs:
+        files += [source] if os.path.isfile(source) else batch.find_las_files(source)
+    return files
+
+
+def job_intermediates(job: Job, output=write_stdout):
+    """:returns intermediates of <job>, keeping the elevation rasters if its mosaic is made from them"""
+    if job.mosaic.enabled and not job.intermediates.keep_elevation:
+        output("the mosaic is made from the elevation rasters, they are kept\n")
+        return replace(job.intermediates, keep_elevation=True)
+    return job.intermediates
+
+
+def watched_files(job: Job):
+    """:returns input files of <job> that are deliveries, not ground outputs a chain wrote next to its input"""
+    return [path for path in job_files(job) if not os.path.basename(path).startswith("grd_")]
+
+
+def job_admission(job: Job):
+    """
+    :returns admission.AdmissionController for the local stages of <job>, None if it runs without one
+    pass its observe method as on_record of the run's telemetry.RunTelemetry so the estimates learn
+    """
+    if not job.admission:
+        return None
+    budget = job.memory_budget_gb * 1024 ** 3 if job.memory_budget_gb else None
+    return admission.AdmissionController(budget, job.workers)
+
+
+def run_job(job: Job, lastools_path: str, output=write_stdout, recorder=None, job_journal=None, name: str = "job",
+            resume_id: int = None, resume: bool = False, admission_control=None, job_progress=None):
+    """
+    runs the ground -> DEM -> hillshade chain for every input of <job>
+    :param recorder: optional telemetry.RunTelemetry for the resource usage of every stage
+    :param admission_control: optional admission.AdmissionController deciding when local stages start
+    :param job_progress: optional progress.JobProgress of the local stages
+    :param job_journal: optional journal.Journal recording the job as <name> and every stage it runs
+    :param resume_id: id of an interrupted job of <job_journal> this run takes over
+    :param resume: skip stages whose journaled output is still complete
+    :returns True if every file succeeded
+    """
+    if job_journal is None:
+        return run_job_stages(job, lastools_path, output, recorder, admission_control=admission_control,
+                              job_progress=job_progress)
+    job_id = job_journal.start_job(name, job_spec(job), resume_id)
+    # an exception leaves the job running in the journal, so it can be resumed once this process is gone
+    success = run_job_stages(job, lastools_path, output, recorder, lambda runner: runner.use_journal(
+        job_journal, job_id, resume or resume_id is not None
+    ), admission_control, job_progress)
+    job_journal.finish_job(job_id, journal.JOURNAL_DONE if success else journal.JOURNAL_FAILED)
+    return success
+
+
+def run_job_stages(job: Job, lastools_path: str, output=write_stdout, recorder=None, prepare=lambda runner: runner,
+                   admission_control=None, job_progress=None):
+    """
+    :param prepare: callable(StageRunner) -> StageRunner applied to every runner of the job
+    :param admission_control: optional admission.AdmissionController, not used for agents or tiled jobs
+    :param job_progress: optional progress.JobProgress, not updated by agents
+    :returns True if every file, and the mosaic of the job if it has one, succeeded
+    """
+    files = job_files(job)
+    if not files:
+        output(f"Invalid input: no LAS/LAZ files match {job.inputs}\n")
+        return False
+
+    result_cache = cache.ResultCache() if job.use_cache else None
+    runner = prepare(StageRunner(lastools_path, output, result_cache, job.force_rerun, recorder=recorder,
+                                 job_progress=job_progress))
+    intermediates = job_intermediates(job, output)
+
+    def with_mosaic(done, success):
+        """mosaics the files in <done> locally, whichever way they ran"""
+        if not job.mosaic.enabled:
+            return success
+        done = set(done)
+        # files finish in any order, the overlap rules go by the input order
+        done = [path for path in files if path in done]
+        return runner.mosaic_files(done, job.output_folder, job.mosaic, job.hillshade) and success
+
+    if job.agents and not job.tiled:
+        # cluster imports this module
+        import cluster
+        if job.use_cache:
+            output("agents do not use the result cache, use_cache and force_rerun are ignored\n")
+        try:
+            agents = cluster.Cluster(job.agents, job.agent_token, output)
+        except ConnectionError as e:
+            output(f"Error. {e}\n")
+            return False
+        try:
+            stats = batch.BatchRunner(
+                lambda path: prepare(cluster.ClusterStageRunner(agents, output, recorder=recorder)).chain_stages(
+                    path, job.output_folder, job.ground, job.dem, job.hillshade, intermediates
+                ),
+                max_workers=agents.slots,
+                on_status=lambda path, status, points, seconds: output(f"\n[{status}] {path}\n"),
+                output=output,
+            ).run(files)
+        finally:
+            agents.close()
+        output(f"\n{stats.summary()}\n")
+        return with_mosaic(stats.done_paths, stats.files_failed == 0)
+
+    if job.tiled:
+        if job.agents:
+            output("tiled jobs run locally, agents are ignored\n")
+        done = []
+        writers = {}  # elevation raster -> the file writing it
+        for path in files:
+            outputs = chain_outputs(path, job.output_folder)
+            if outputs[1] in writers:
+                output(f"Error. {os.path.basename(path)} has the output names of "
+                       f"{os.path.basename(writers[outputs[1]])}, it is not processed\n")
+                continue
+            writers[outputs[1]] = path
+            if runner.run_tiled_chain(path, *outputs, job.ground, job.dem, job.hillshade,
+                                      job.tile_size, job.buffer, job.workers):
+                done.append(path)
+        failed = len(files) - len(done)
+        output(f"\n{len(done)}/{len(files)} done, {failed} failed\n")
+        return with_mosaic(done, failed == 0)
+
+    def on_status(path, status, points, seconds):
+        if job_progress is not None and status in (batch.STATUS_DONE, batch.STATUS_FAILED):
+            status = f"{status}, job {job_progress.describe()}"
+        output(f"\n[{status}] {path}\n")
+
+    stats = batch.BatchRunner(
+        lambda path: runner.chain_stages(path, job.output_folder, job.ground, job.dem, job.hillshade, intermediates),
+        max_workers=job.workers,
+        on_status=on_status,
+        admission=admission_control,
+        job_progress=job_progress,
+        output=output,
+    ).run(files)
+    output(f"\n{stats.summary()}\n")
+    if job_progress is not None and job_progress.summary():
+        output(f"{job_progress.summary()}\n")
+    if admission_control is not None:
+        output(f"{admission_control.summary()}\n")
+    return with_mosaic(stats.done_paths, stats.files_failed == 0)
+
+
+def watch_job(job: Job, lastools_path: str, output=write_stdout, recorder=None, job_journal=None, name: str = "job",
+              admission_control=None, settle_seconds: float = watch.DEF_SETTLE_SECONDS, progress_log=None):
+    """
+    runs the chain on every file delivered to the inputs of <job> until the user interrupts,
+    at most <job.workers> files at once, the others wait in their folder
+    files <job_journal> recorded as processed are skipped until they change
+    :param name: the job is journaled as "watch <name>"
+    :param progress_log: optional callable(str) receiving the progress events of every file, e.g. the job log's write
+    :returns True if every file processed succeeded
+    """
+    if job.tiled or job.agents or job.mosaic.enabled:
+        output("watched files run untiled, locally and are not mosaicked, tiling, agents and mosaic are ignored\n")
+    workers = max(1, int(job.workers or batch.default_worker_count()))
+    result_cache = cache.ResultCache() if job.use_cache else None
+    runner = StageRunner(lastools_path, output, result_cache, job.force_rerun, recorder=recorder)
+    job_id = None
+    if job_journal is not None:
+        for row in job_journal.interrupted_jobs(f"watch {name}"):
+            job_journal.discard_job(row["id"])
+        job_id = job_journal.start_job(f"watch {name}", job_spec(job))
+
+    lock = threading.Lock()
+    running = set()
+    failed = []
+    stopping = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def skip(path):
+        status = job_journal.ingest_status(path) if job_journal is not None else None
+        if status == journal.JOURNAL_FAILED:
+            output(f"\nwatch: {path} failed before, skipped until it changes\n")
+        return status is not None
+
+    def process(path):
+        file_progress = progress.JobProgress(progress_log)
+        file_runner = runner.with_output(output, recorder=recorder, job_progress=file_progress)
+        if job_journal is not None:
+            # a file a stopped watch left half done keeps its complete outputs
+            file_runner.use_journal(job_journal, job_id, resume=True)
+        success = False
+        try:
+            success = batch.BatchRunner(
+                lambda path: file_runner.chain_stages(
+                    path, job.output_folder, job.ground, job.dem, job.hillshade, job.intermediates
+                ),
+                max_workers=1,
+                on_status=lambda path, status, points, seconds: output(f"\n[{status}] {path}\n"),
+                admission=admission_control,
+                job_progress=file_progress,
+                output=output,
+            ).run([path]).files_failed == 0
+        finally:
+            with lock:
+                running.discard(path)
+            # files interrupted by the stop are processed again by the next watch
+            if job_journal is not None and (success or not stopping.is_set()):
+                job_journal.record_ingest(path, success)
+            if not success:
+                failed.append(path)
+            if file_progress.summary():
+                output(f"{file_progress.summary()}\n")
+
+    def on_ready(path):
+        with lock:
+            if len(running) >= workers:
+                return False
+            running.add(path)
+        output(f"\nwatch: {path} delivered\n")
+        executor.submit(process, path)
+        return True
+
+    watcher = watch.FolderWatcher(lambda: watched_files(job), on_ready, settle_seconds, skip=skip)
+    output(f"watching {', '.join(job.inputs)}, {workers} files at once, Ctrl+C stops\n")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        stopping.set()
+        output("\nwatch: stopping, waiting for the files in progress\n")
+    finally:
+        executor.shutdown(wait=True)
+        if job_journal is not None:
+            job_journal.finish_job(job_id, journal.JOURNAL_FAILED if failed else journal.JOURNAL_DONE)
+    output(f"\nwatch: {len(failed)} files failed\n")
+    return not failed
+
+
+def find_lastools_path(lastools_path: str = None):
+    """:returns the LAStools bin folder, None if it does not exist"""
+    lastools_path = lastools_path or os.path.join(LASTOOLS_PATH, "bin")
+    return lastools_path if os.path.exists(lastools_path) else None
+
+
+def run_job_file(job_path: str, lastools_path: str = None, resume: bool = False, watch_inputs: bool = False,
+                 settle_seconds: float = watch.DEF_SETTLE_SECONDS):
+    """
+    headless entry point
+    :param lastools_path: overrides the job file and the default install folder
+    :param resume: take over an interrupted run of the same job, skipping the outputs it completed
+    :param watch_inputs: keep processing the files delivered to the inputs of the job until interrupted
+    :param settle_seconds: how long a watched file must stop growing before it is processed
+    :returns process exit code
+    """
+    try:
+        job = load_job(job_path)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    found_path = find_lastools_path(lastools_path or job.lastools_path)
+    # cluster jobs run LAStools on the agents, tiled ones still need it here
+    if found_path is None and (job.tiled or not job.agents):
+        print(f"Cannot find lastools bin folder {lastools_path or job.lastools_path or LASTOOLS_PATH}")
+        return 1
+    if found_path:
+        print(f"Found {found_path} ...")
+
+    # everything printed is also kept in a rotating log file for the job
+    log = console.open_job_log(Path(job_path).stem)
+    print(f"Logging to {log.path}")
+
+    def output(message):
+        log.write(message)
+        write_stdout(message)
+
+    # runs are journaled under the job file path, a run with the same settings that did not finish can be resumed
+    name = os.path.abspath(job_path)
+    job_journal = journal.open_journal(output)
+    resume_id = None
+    if job_journal is not None and not watch_inputs:
+        interrupted = job_journal.interrupted_jobs(name, job_spec(job))
+        if interrupted and resume:
+            resume_id = interrupted[0]["id"]
+            done = job_journal.stage_counts(resume_id).get(journal.JOURNAL_DONE, 0)
+            output(f"Resuming the run of {time.ctime(interrupted[0]['started'])}, {done} stages were done\n")
+            interrupted = interrupted[1:]
+        elif interrupted:
+            output(f"The run of {time.ctime(interrupted[0]['started'])} was interrupted, "
+                   f"rerun with --resume to skip the outputs it completed\n")
+        for row in interrupted:
+            job_journal.discard_job(row["id"])
+
+    admission_control = job_admission(job)
+    recorder = telemetry.RunTelemetry(Path(job_path).stem, admission_control and admission_control.observe)
+    # progress events go to the log file only, the raw output they come from is printed already
+    job_progress = progress.JobProgress(log.write)
+    try:
+        if watch_inputs:
+            return 0 if watch_job(job, found_path, output, recorder, job_journal, name, admission_control,
+                                  settle_seconds, log.write) else 1
+        return 0 if run_job(job, found_path, output, recorder, job_journal, name, resume_id, resume,
+                            admission_control, job_progress) else 1
+    finally:
+        json_path, csv_path = telemetry.export_paths(log.path)
+        recorder.write_json(json_path)
+        recorder.write_csv(csv_path)
+        output(f"\n{recorder.format_summary()}\ntelemetry: {json_path}\n")
+        log.close()
+        if job_journal is not None:
+            job_journal.close()
@@ -0,0 +1,2240 @@
+# Gabriel J. Young
+# Feb 2025
+# gjyoung@calpoly.edu
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+import os
+import sys
+import queue
+import threading
+import time
+import traceback
+from pathlib import Path
+
+import admission
+import batch
+import cache
+import cluster
+import console
+import jobqueue
+import journal
+import lastools_core as core
+import pipeline
+import progress
+import sweep
+import telemetry
+import watch
+from lastools_core import groundfilter, hillshade, lasreader, overviews, pointindex, preview, tiling
+
+# Static global constants
+WINDOW_TITLE = "Simple LasTools GUI"
+WINDOW_SIZE = "1600x900"  # Increased size to fit new elements
+
+# Layout settings
+TITLE_PADY = (10, 10)
+TITLE_PADX = (10, 10)
+H1_PADY = (8, 8)
+H1_PADX = (8, 8)
+
+VIEW_BTN_PADX = (0, 5)
+
+# Title settings
+TITLE_FONT = ("Arial", 14, "bold")
+H1_FONT = ("Arial", 14)
+H2_FONT = ("Arial", 12)
+H2_PADX = (5, 5)
+
+# Textbox settings
+TEXTBOX_HEIGHT = 20
+INFOBOX_HEIGHT = 20
+
+# Output streaming settings
+OUTPUT_FLUSH_MS = 33  # ~30 frames per second
+PROGRESS_REFRESH_SECONDS = 0.25  # progress columns of the job table are redrawn at most this often
+
+MIN_COL_0_W = 700
+BATCH_TABLE_HEIGHT = 8
+JOB_TABLE_HEIGHT = 6
+SWEEP_TABLE_HEIGHT = 6
+PREVIEW_MAX_SIZE = 800  # pixels, larger preview hillshades are shown subsampled
+PREVIEW_METHODS = ("Grid", "Every Nth Point")
+LAS_FILETYPES = [("LAS/LAZ files", "*.las *.laz"), ("LAS files", "*.las"), ("LAZ files", "*.laz")]
+GROUND_FORMATS = (core.GROUND_FORMAT_AUTO, core.GROUND_FORMAT_LAS, core.GROUND_FORMAT_LAZ)
+MOSAIC_RULES = ("first", "last", "min", "max", "mean")  # mosaic.MOSAIC_RULES, listed without numpy
+VIEWER_SIZE = (900, 700)  # initial raster viewer canvas, pixels
+VIEWER_MAX_ZOOM = 3  # closest zoom shows one raster cell as 2**3 pixels
+POINT_ZOOM_STEP = 1.25  # point viewer zoom per mouse wheel step
+MAX_POINT_SIZE = 4  # pixels, points grow with the zoom up to this size
+TELEMETRY_TABLE_HEIGHT = 8
+TELEMETRY_TABLE_MAX_ROWS = 1000
+TELEMETRY_KEEP_RUNS = 100
+BATCH_JOURNAL_NAME = "batch"  # journal name of batch runs, interrupted ones are offered for resuming at startup
+WATCH_JOURNAL_NAME = "watch batch"  # journal name of watched folder sessions, never offered for resuming
+
+DEF_GRD_STEP = f"{core.DEF_GRD_STEP:g}"
+DEF_DEM_STEP = f"{core.DEF_DEM_STEP:g}"
+DEF_DEM_AZIMUTH = f"{core.DEF_DEM_AZIMUTH:g}"
+DEF_DEM_ALTITUDE = f"{core.DEF_DEM_ALTITUDE:g}"
+DEF_DEM_R_FACTOR = f"{core.DEF_DEM_R_FACTOR:g}"
+DEF_GRD_OP_PARAMS_DEC_ENTRY = list(core.GROUND_OPTIONAL_PARAMS)
+
+
+class ConsoleView():
+    """
+    Text widget that only ever holds the visible lines of a console.LineBuffer.
+    The scrollbar pages through the buffer, new output is followed unless the user scrolled up.
+    """
+
+    def __init__(self, parent, buffer: console.LineBuffer, height: int):
+        self.buffer = buffer
+        self.height = height
+        self.top = 0  # line number shown in the first row
+        self.follow = True
+
+        self.frame = ttk.Frame(parent)
+        self.frame.columnconfigure(0, weight=1)
+        self.text = tk.Text(self.frame, wrap=tk.NONE, height=height, state=tk.DISABLED)
+        self.text.grid(row=0, column=0, sticky=tk.NSEW)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        x_scrollbar = ttk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self.text.xview)
+        x_scrollbar.grid(row=1, column=0, sticky=tk.EW)
+        self.text.configure(xscrollcommand=x_scrollbar.set)
+
+        self.text.bind("<MouseWheel>", lambda event: self.scroll_lines(-3 if event.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_lines(3))
+
+    def last_top(self):
+        return max(self.buffer.end() - self.height, self.buffer.first())
+
+    def render(self):
+        first = self.buffer.first()
+        if self.follow:
+            self.top = self.last_top()
+        self.top = min(max(self.top, first), self.last_top())
+        lines = self.buffer.window(self.top, self.height)
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, "\n".join(lines))
+        self.text.config(state=tk.DISABLED)
+
+        total = max(self.buffer.end() - first, 1)
+        self.scrollbar.set((self.top - first) / total, (self.top - first + len(lines)) / total)
+
+    def scroll_to(self, top: int):
+        self.top = top
+        self.follow = top >= self.last_top()
+        self.render()
+
+    def scroll_lines(self, count: int):
+        self.scroll_to(self.top + count)
+        return "break"
+
+    def on_scroll(self, action, amount, unit=None):
+        """scrollbar command, e.g. ("moveto", "0.5") or ("scroll", "1", "pages")"""
+        if action == tk.MOVETO:
+            first = self.buffer.first()
+            self.scroll_to(first + int(float(amount) * (self.buffer.end() - first)))
+        else:
+            self.scroll_lines(int(amount) * (self.height if unit == tk.PAGES else 1))
+
+
+class RasterViewer():
+    """
+    Zoomable, pannable window on an overviews.Pyramid.
+    Only the tiles in view are drawn, from the pyramid level closest to the zoom, through an LRU tile cache.
+    Drag to pan, mouse wheel to zoom around the pointer.
+    """
+
+    def __init__(self, parent, pyramid):
+        self.pyramid = pyramid
+        self.tiles = overviews.TileCache()
+        self.top_level = len(pyramid.levels) - 1
+        self.zoom = 0  # 2 ** zoom pixels per raster cell
+        self.x0 = 0.0  # raster column and row at the top left corner of the canvas
+        self.y0 = 0.0
+        self.drag = None
+        self.render_pending = False
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"{os.path.basename(pyramid.path)} - {pyramid.ncols:,} x {pyramid.nrows:,}")
+        self.canvas = tk.Canvas(self.window, width=VIEWER_SIZE[0], height=VIEWER_SIZE[1], background="black",
+                                highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        info = ttk.Frame(self.window)
+        self.status = ttk.Label(info, text="")
+        self.status.pack(side=tk.LEFT, padx=H2_PADX)
+        ttk.Button(info, text="Fit", command=self.fit).pack(side=tk.RIGHT)
+        info.pack(fill=tk.X, padx=2, pady=2)
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_render())
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom_at(event.x, event.y, 1 if event.delta > 0 else -1))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom_at(event.x, event.y, 1))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom_at(event.x, event.y, -1))
+        self.window.after_idle(self.fit)
+
+    def scale(self):
+        return 2.0 ** self.zoom
+
+    def fit(self):
+        """zooms out until the whole raster fits the canvas and centres it"""
+        width, height = max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+        self.zoom = 0
+        while self.zoom > -self.top_level and (self.pyramid.ncols * self.scale() > width
+                                                or self.pyramid.nrows * self.scale() > height):
+            self.zoom -= 1
+        self.x0 = (self.pyramid.ncols - width / self.scale()) / 2
+        self.y0 = (self.pyramid.nrows - height / self.scale()) / 2
+        self.schedule_render()
+
+    def zoom_at(self, x: int, y: int, steps: int):
+        """zooms by 2 ** <steps>, the cell under canvas pixel <x>, <y> stays put"""
+        zoom = min(max(self.zoom + steps, -self.top_level), VIEWER_MAX_ZOOM)
+        if zoom == self.zoom:
+            return "break"
+        col, row = self.x0 + x / self.scale(), self.y0 + y / self.scale()
+        self.zoom = zoom
+        self.x0, self.y0 = col - x / self.scale(), row - y / self.scale()
+        self.schedule_render()
+        return "break"
+
+    def on_press(self, event):
+        self.drag = (event.x, event.y)
+
+    def on_drag(self, event):
+        self.x0 -= (event.x - self.drag[0]) / self.scale()
+        self.y0 -= (event.y - self.drag[1]) / self.scale()
+        self.drag = (event.x, event.y)
+        self.schedule_render()
+
+    def on_motion(self, event):
+        col, row = int(self.x0 + event.x / self.scale()), int(self.y0 + event.y / self.scale())
+        value = self.pyramid.value(row, col)
+        if value is None:
+            self.status.config(text=f"zoom 1:{2 ** -self.zoom:g}" if self.zoom < 0 else f"zoom {2 ** self.zoom}:1")
+            return
+        position = f"col {col:,}, row {row:,}"
+        if self.pyramid.cell:
+            xdim, ydim, ulxmap, ulymap = self.pyramid.cell
+            position = f"x {ulxmap + col * xdim:.2f}, y {ulymap - row * ydim:.2f}"
+        self.status.config(text=f"{position}: {value:g}")
+
+    def schedule_render(self):
+        """coalesces the events of one frame into a single redraw"""
+        if not self.render_pending:
+            self.render_pending = True
+            self.window.after_idle(self.render)
+
+    def photo(self, level: int, row: int, col: int, magnify: int):
+        tile = self.pyramid.tile(level, row, col)
+        image = tk.PhotoImage(
+            master=self.window,
+            data=b"P5 %d %d 255\n" % (tile.shape[1], tile.shape[0]) + tile.tobytes(),
+            format="PPM",
+        )
+        return image.zoom(magnify) if magnify > 1 else image
+
+    def render(self):
+        self.render_pending = False
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        level = min(max(-self.zoom, 0), self.top_level)
+        magnify = 2 ** max(self.zoom, 0)
+        span = overviews.TILE_SIZE * 2 ** level  # raster cells per tile
+        nrows, ncols = self.pyramid.level_shape(level)
+        scale = self.scale()
+
+        first_row, first_col = max(int(self.y0 // span), 0), max(int(self.x0 // span), 0)
+        last_row = min(int((self.y0 + height / scale) // span), (nrows - 1) // overviews.TILE_SIZE)
+        last_col = min(int((self.x0 + width / scale) // span), (ncols - 1) // overviews.TILE_SIZE)
+        self.canvas.delete("tile")
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                image = self.tiles.get(
+                    (level, row, col, magnify), lambda: self.photo(level, row, col, magnify)
+                )
+                self.canvas.create_image(
+                    (col * span - self.x0) * scale, (row * span - self.y0) * scale,
+                    image=image, anchor=tk.NW, tags="tile",
+                )
+
+
+class PointViewer():
+    """
+    Top-down view of a LAS file coloured by classification, read through a pointindex.PointIndex.
+    Every frame draws at most pointindex.MAX_FRAME_POINTS points, thinned evenly over the cells in view.
+    Drag to pan, mouse wheel to zoom around the pointer.
+    """
+
+    def __init__(self, parent, index):
+        self.index = index
+        self.min_x, self.max_y = index.extent[0], index.extent[3]  # map position of the top left pixel
+        self.scale = 1.0  # pixels per map unit
+        self.drag = None
+        self.render_pending = False
+        self.image = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"{os.path.basename(index.las_file.path)} - {index.las_file.point_count:,} points")
+        self.canvas = tk.Canvas(self.window, width=VIEWER_SIZE[0], height=VIEWER_SIZE[1], background="black",
+                                highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas_image = self.canvas.create_image(0, 0, anchor=tk.NW)
+
+        legend = ttk.Frame(self.window)
+        for cls, count in sorted(index.histogram.items()):
+            colour = "#%02x%02x%02x" % pointindex.class_colour(cls)
+            tk.Label(legend, text="  ", background=colour).pack(side=tk.LEFT, padx=(H2_PADX[0], 2))
+            ttk.Label(legend, text=f"{lasreader.ASPRS_CLASSES.get(cls, cls)} ({count:,})").pack(side=tk.LEFT)
+        legend.pack(fill=tk.X, padx=2, pady=2)
+        info = ttk.Frame(self.window)
+        self.status = ttk.Label(info, text="")
+        self.status.pack(side=tk.LEFT, padx=H2_PADX)
+        self.position = ttk.Label(info, text="")
+        self.position.pack(side=tk.LEFT, padx=H2_PADX)
+        ttk.Button(info, text="Fit", command=self.fit).pack(side=tk.RIGHT)
+        info.pack(fill=tk.X, padx=2, pady=2)
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_render())
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom_at(event.x, event.y, 1 if event.delta > 0 else -1))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom_at(event.x, event.y, 1))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom_at(event.x, event.y, -1))
+        self.window.after_idle(self.fit)
+
+    def fit(self):
+        """shows the whole file, centred"""
+        width, height = max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+        min_x, min_y, max_x, max_y = self.index.extent
+        self.scale = min(width / (max_x - min_x), height / (max_y - min_y))
+        self.min_x = (min_x + max_x) / 2 - width / 2 / self.scale
+        self.max_y = (min_y + max_y) / 2 + height / 2 / self.scale
+        self.schedule_render()
+
+    def zoom_at(self, x: int, y: int, steps: int):
+        """zooms by POINT_ZOOM_STEP ** <steps>, the map position under canvas pixel <x>, <y> stays put"""
+        map_x, map_y = self.min_x + x / self.scale, self.max_y - y / self.scale
+        self.scale *= POINT_ZOOM_STEP ** steps
+        self.min_x, self.max_y = map_x - x / self.scale, map_y + y / self.scale
+        self.schedule_render()
+        return "break"
+
+    def on_press(self, event):
+        self.drag = (event.x, event.y)
+
+    def on_drag(self, event):
+        self.min_x -= (event.x - self.drag[0]) / self.scale
+        self.max_y += (event.y - self.drag[1]) / self.scale
+        self.drag = (event.x, event.y)
+        self.schedule_render()
+
+    def on_motion(self, event):
+        self.position.config(text=f"x {self.min_x + event.x / self.scale:.2f}, y {self.max_y - event.y / self.scale:.2f}")
+
+    def schedule_render(self):
+        """coalesces the events of one frame into a single redraw"""
+        if not self.render_pending:
+            self.render_pending = True
+            self.window.after_idle(self.render)
+
+    def render(self):
+        self.render_pending = False
+        width, height = max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+        max_x, min_y = self.min_x + width / self.scale, self.max_y - height / self.scale
+        x, y, classification, total = self.index.query(self.min_x, min_y, max_x, self.max_y)
+
+        # points grow once the full density is shown and neighbours drift apart on screen
+        spacing = self.index.cell / pointindex.POINTS_PER_CELL ** 0.5 * self.scale
+        point_size = min(max(int(spacing / 2), 1), MAX_POINT_SIZE) if len(x) == total else 1
+        frame = pointindex.render_points(x, y, classification, self.min_x, self.max_y, self.scale, width, height,
+                                         point_size)
+        self.image = tk.PhotoImage(
+            master=self.window, data=b"P6 %d %d 255\n" % (width, height) + frame.tobytes(), format="PPM"
+        )
+        self.canvas.itemconfig(self.canvas_image, image=self.image)
+        self.status.config(text=f"{len(x):,} of {total:,} points in view")
+
+
+class CommandWrapperApp():
+    def __init__(self, root, lastools_path):
+        self.root = root
+        self.lastools_path = lastools_path
+        self.root.title(WINDOW_TITLE)
+        self.root.geometry(WINDOW_SIZE)
+
+        # Worker threads never touch widgets directly, they post to these queues
+        self.output_queue = queue.Queue()
+        self.main_thread_calls = queue.Queue()
+
+        # All LAStools runs go through the GUI-free core, stage outputs are reused unless "Force Rerun" is checked
+        self.runner = core.StageRunner(lastools_path, output=self.update_output, result_cache=cache.ResultCache())
+
+        # Runs are queued as jobs, the job table is redrawn on the next frame after any change
+        self.job_queue = jobqueue.JobQueue(on_change=lambda job: setattr(self, "jobs_changed", True))
+        self.jobs_changed = False
+        # set from stage threads as LAStools output is parsed, the progress columns follow at a lower rate
+        self.progress_changed = False
+        self.progress_refreshed = 0.0
+        # telemetry.RunTelemetry by job id, newest last
+        self.job_telemetry = {}
+        # every local batch and sweep stage draws on one memory budget, estimates learn from the telemetry
+        self.admission = admission.AdmissionController()
+        # batch runs and their stages are journaled, so a run cut short by a crash can be resumed
+        self.journal = journal.open_journal(self.update_output)
+        # watch.FolderWatcher of the batch source while watching, and its journal job id
+        self.watcher = None
+        self.watch_id = None
+
+        # Create a container frame
+        self.root.grid_columnconfigure(0, weight=1)
+        self.root.grid_rowconfigure(0, weight=1)
+
+        #canvas
+        self.base_canvas = tk.Canvas(self.root)
+        self.base_canvas.grid(row=0, column=0, sticky=tk.NSEW)
+
+        #scrollbar
+        self.base_scrollbar = ttk.Scrollbar(self.root, orient=tk.VERTICAL, command=self.base_canvas.yview)
+        self.base_scrollbar.grid(row=0, column=1, sticky=tk.NS)
+
+        #configure canvas
+        self.base_canvas.configure(yscrollcommand=self.base_scrollbar.set)
+
+        self.base_frame = ttk.Frame(self.base_canvas)
+        self.base_window = self.base_canvas.create_window((0, 0), window=self.base_frame, anchor=tk.NW)
+        # Update the scroll region
+        self.base_frame.bind("<Configure>", self.on_canvas_configure)
+
+        # Create UI components
+        ttk.Label(self.base_frame, text=WINDOW_TITLE, font=TITLE_FONT).grid(row=0, column=0, padx=10, pady=10)
+
+        self.create_widgets(self.base_frame)
+
+        # Expand frame width as canvas resizes
+        self.base_frame.bind("<Configure>", self.on_frame_configure)
+
+        # Start flushing worker output to the UI
+        self.root.after(OUTPUT_FLUSH_MS, self.flush_output)
+        # asked once the window is up
+        self.root.after_idle(self.offer_resume)
+
+    def on_frame_configure(self, event):
+        self.base_canvas.configure(scrollregion=self.base_canvas.bbox("all"))
+
+    def on_canvas_configure(self, event):
+        """Ensure the inner frame matches the width of the canvas."""
+        self.base_canvas.itemconfig(self.base_window, width=event.width)
+
+    ### File I/O utility functions
+
+    def select_file(self, input_file: ttk.Entry, filetypes_list):
+        """
+        selects file and updates ttk Entry <input_file>
+        :param input_file: ttk Entry
+        """
+        file_path = filedialog.askopenfilename(filetypes=filetypes_list)
+        if file_path:
+            input_file.config(state=tk.NORMAL)
+            input_file.delete(0, tk.END)
+            input_file.insert(0, file_path)
+            input_file.config(state=tk.DISABLED)
+
+
+    def select_folder(self, folder: ttk.Entry):
+        """
+        selects folder and updates ttk Entry <input_file>
+        :param folder: ttk Entry
+        """
+        file_path = filedialog.askdirectory()
+        if file_path:
+            folder.config(state=tk.NORMAL)
+            folder.delete(0, tk.END)
+            folder.insert(0, file_path)
+            folder.config(state=tk.DISABLED)
+
+
+    def show_file_info(self, file_path: str):
+        """
+        shows the LAS header of <file_path> right away, the class histogram follows from a worker thread
+        """
+        if not file_path:
+            return
+        if lasreader is None:
+            self.file_info_lb.config(text="Install numpy to show file information")
+            return
+        try:
+            las_file = lasreader.LasFile(file_path)
+        except (OSError, ValueError) as e:
+            self.file_info_lb.config(text=f"Cannot read {file_path}: {e}")
+            return
+
+        summary = las_file.summary()
+        self.file_info_path = file_path
+        if las_file.is_compressed:
+            self.file_info_lb.config(text=f"{summary}\nclass histogram not available for LAZ input")
+            return
+        self.file_info_lb.config(text=f"{summary}\ncounting classes ...")
+
+        def count_classes():
+            try:
+                text = lasreader.format_histogram(las_file.class_histogram())
+            except (OSError, ValueError) as e:
+                text = f"class histogram failed: {e}"
+            self.call_on_main_thread(lambda: show_histogram(text))
+
+        def show_histogram(text):
+            # drop the result if another file was selected in the meantime
+            if self.file_info_path == file_path:
+                self.file_info_lb.config(text=f"{summary}\n{text}")
+
+        self.start_worker(count_classes)
+
+    def create_info_button(self, frame: ttk.Frame, file : str):
+        """
+        return: ttk Button
+        """
+        return ttk.Button(
+            frame,
+            text="Doc. View",
+            command=lambda: self.update_info_box(
+                resource_path(f"data/{file}.txt")
+            ),
+        )
+
+
+    ### Run LASTools Commands
+
+    def run_las_view(self, file_path: str):
+        """opens lasview on a worker thread, it is interactive so it does not take a job slot"""
+        if os.path.exists(file_path):
+            self.update_output(f"\nlasview: {file_path}\n")
+            command = core.view_command(self.lastools_path, file_path)
+            self.update_output(core.command_text(command) + "\n")
+
+            def run():
+                ### check return code
+                if self.runner.check_output(command) != 0:
+                    self.update_output("Error. lasview failed.\n")
+
+            self.start_worker(run)
+        else:
+            self.update_output(f"Invalid input: {file_path}\n")
+
+    def open_raster_viewer(self, file_path: str):
+        """builds the overviews of <file_path> on a worker thread if they are missing, then opens a RasterViewer"""
+        if overviews is None:
+            self.update_output("Install numpy to view rasters\n")
+            return
+        if not os.path.exists(file_path):
+            self.update_output(f"Invalid input: {file_path}\n")
+            return
+        result = {}
+
+        def build():
+            if not overviews.has_overviews(file_path):
+                self.update_output(f"\nbuilding overviews of {file_path}\n")
+            try:
+                result["pyramid"] = overviews.open_pyramid(
+                    file_path, lambda message: self.update_output(message + "\n")
+                )
+            except (OSError, ValueError) as e:
+                self.update_output(f"Error. cannot view {file_path}: {e}\n")
+
+        def show():
+            if result.get("pyramid"):
+                RasterViewer(self.root, result["pyramid"])
+
+        self.start_worker(build, on_done=show)
+
+    def open_point_viewer(self, file_path: str):
+        """indexes <file_path> on a worker thread unless its index exists, then opens a PointViewer"""
+        if pointindex is None:
+            self.update_output("Install numpy to show points\n")
+            return
+        if not os.path.exists(file_path):
+            self.update_output(f"Invalid input: {file_path}\n")
+            return
+        result = {}
+
+        def build():
+            if not os.path.exists(pointindex.index_path(file_path)):
+                self.update_output(f"\nindexing {file_path}\n")
+            try:
+                result["index"] = pointindex.open_index(file_path)
+            except (OSError, ValueError) as e:
+                self.update_output(f"Error. cannot show {file_path}: {e}\n")
+
+        def show():
+            if result.get("index"):
+                PointViewer(self.root, result["index"])
+
+        self.start_worker(build, on_done=show)
+
+    ### Worker thread utility functions
+
+    def start_worker(self, target, *args, on_done=None):
+        """
+        runs <target>(*args) on a background thread so the UI stays responsive
+        :param target: callable, must not touch Tk widgets
+        :param on_done: optional callable, run on the Tk main thread once <target> returns
+        """
+        def worker():
+            target(*args)
+            if on_done:
+                self.call_on_main_thread(on_done)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def call_on_main_thread(self, callback):
+        """queues <callback> to be run by the Tk main loop"""
+        self.main_thread_calls.put(callback)
+
+    ### Parameters, read on the main thread before a run starts
+
+    def ground_params(self):
+        """:returns core.GroundParams from the lasground entries"""
+        params = core.GroundParams(
+            step=float(self.grd_step.get() or DEF_GRD_STEP),
+            compute_height=self.compute_height.get(),
+            engine=core.GROUND_ENGINE_NUMPY if self.grd_in_process.get() else core.GROUND_ENGINE_LASTOOLS,
+        )
+        for param, option in self.grd_params_dict.items():
+            if option["is_enabled"].get():
+                setattr(params, param, float(option["entry"].get() or 0))
+        return params
+
+    def dem_params(self):
+        """:returns core.DemParams from the DEM entries"""
+        return core.DemParams(step=float(self.dem_step.get() or DEF_DEM_STEP))
+
+    def hillshade_params(self):
+        """:returns core.HillshadeParams from the hillshade entries"""
+        try:
+            extra_lights = core.parse_lights(self.dem_extra_lights.get())
+        except ValueError:
+            self.update_output(f"Invalid additional lights: {self.dem_extra_lights.get()}\n")
+            extra_lights = []
+        return core.HillshadeParams(
+            azimuth=float(self.dem_azimuth.get() or DEF_DEM_AZIMUTH),
+            altitude=float(self.dem_altitude.get() or DEF_DEM_ALTITUDE),
+            r_factor=float(self.dem_r_factor.get() or DEF_DEM_R_FACTOR),
+            engine=core.HILLSHADE_ENGINE_NUMPY if self.numpy_hillshade.get() else core.HILLSHADE_ENGINE_LASTOOLS,
+            extra_lights=extra_lights,
+        )
+
+    def intermediate_params(self):
+        """:returns core.IntermediateParams from the batch intermediates options"""
+        return core.IntermediateParams(
+            keep_ground=self.keep_ground.get(),
+            keep_elevation=self.keep_elevation.get(),
+            scratch_dir=self.scratch_folder.get() or core.DEF_SCRATCH_DIR,
+            ground_format=self.ground_format.get() or core.GROUND_FORMAT_AUTO,
+        )
+
+    ### Jobs
+
+    def job_runner(self, job: jobqueue.QueuedJob):
+        """
+        :returns core.StageRunner for <job> and the console.LogFile its output is streamed to
+        the output also goes to the console, cancelling the job kills the runner's child processes
+        """
+        log = console.open_job_log(job.name)
+        self.update_output(f"\n{job.name}: logging to {log.path}\n")
+
+        def output(message):
+            log.write(message)
+            self.update_output(message)
+
+        def on_record(metrics):
+            self.admission.observe(metrics)
+            self.call_on_main_thread(lambda: self.add_telemetry_row(job.id, metrics))
+
+        recorder = telemetry.RunTelemetry(job.name, on_record=on_record)
+        self.job_telemetry[job.id] = recorder
+        while len(self.job_telemetry) > TELEMETRY_KEEP_RUNS:
+            self.job_telemetry.pop(next(iter(self.job_telemetry)))
+        # progress events are written to the log only, the console already shows the output they come from
+        job.progress = progress.JobProgress(log.write, on_change=lambda: setattr(self, "progress_changed", True))
+        return self.runner.with_output(output, job.tracker, recorder, job.progress), log
+
+    def submit_job(self, job: jobqueue.QueuedJob, log: console.LogFile, run, on_done=None, on_cancel=None):
+        """
+        queues <job>
+        :param run: callable returning True on success, runs on the job thread and must not touch Tk widgets
+        :param on_done: optional callable, run on the Tk main thread if the job succeeded
+        :param on_cancel: optional callable, run instead of <run> if the job is cancelled before it starts
+        """
+        recorder = self.job_telemetry[job.id]
+
+        def close_log():
+            # every run keeps its telemetry next to its log
+            json_path, csv_path = telemetry.export_paths(log.path)
+            recorder.write_json(json_path)
+            recorder.write_csv(csv_path)
+            log.write(f"\n{recorder.format_summary()}\n")
+            self.update_output(f"\n{job.name}:\n{recorder.format_summary()}\ntelemetry: {json_path}\n")
+            if job.progress.summary():
+                log.write(f"{job.progress.summary()}\n")
+                self.update_output(f"{job.progress.summary()}\n")
+            log.close()
+
+        def action(job):
+            try:
+                success = run()
+            finally:
+                close_log()
+            if success and on_done:
+                self.call_on_main_thread(on_done)
+            return success
+
+        def cancelled(job):
+            log.write("\ncancelled before it started\n")
+            try:
+                if on_cancel:
+                    on_cancel()
+            finally:
+                close_log()
+
+        job.action = action
+        job.on_cancel = cancelled
+        self.job_queue.submit(job)
+
+    def run_pipeline(self, name: str, build_stages, on_done=None):
+        """
+        queues the stages of one job
+        :param build_stages: callable(core.StageRunner) returning the stages, called on the main thread
+        :param on_done: optional callable, run on the Tk main thread if every stage succeeded
+        """
+        job = jobqueue.QueuedJob(name)
+        runner, log = self.job_runner(job)
+        stages = build_stages(runner)
+        self.submit_job(job, log, lambda: pipeline.Pipeline(stages, output=runner.output).run(), on_done)
+
+    def selected_job(self):
+        """:returns jobqueue.QueuedJob selected in the job table, None if there is none"""
+        selection = self.job_table.selection()
+        return self.job_queue.get(int(selection[0])) if selection else None
+
+    def cancel_selected_job(self):
+        job = self.selected_job()
+        if job:
+            self.job_queue.cancel(job)
+
+    def move_selected_job(self, offset: int):
+        job = self.selected_job()
+        if job:
+            self.job_queue.move(job, offset)
+
+    def job_row(self, job: jobqueue.QueuedJob):
+        """:returns values of the job table row of <job>"""
+        bar = eta = ""
+        if job.progress is not None and job.started:
+            fraction = 1.0 if job.status == jobqueue.JOB_DONE else job.progress.fraction()
+            bar = f"{progress.format_bar(fraction)} {100.0 * fraction:.0f}%"
+            if job.status == jobqueue.JOB_RUNNING:
+                seconds = job.progress.eta()
+                eta = progress.format_seconds(seconds) if seconds is not None else ""
+                eta += f"  {job.progress.phase()}"
+        return (
+            job.name,
+            f"{job.status}: {job.error}" if job.error else job.status,
+            f"{job.seconds():.1f}" if job.started else "",
+            bar,
+            eta,
+        )
+
+    def refresh_job_table(self):
+        selection = self.job_table.selection()
+        self.job_table.delete(*self.job_table.get_children())
+        for job in self.job_queue.ordered():
+            self.job_table.insert("", tk.END, iid=str(job.id), values=self.job_row(job))
+        self.job_table.selection_set([iid for iid in selection if self.job_table.exists(iid)])
+
+    def refresh_job_progress(self):
+        """redraws the rows of running jobs in place"""
+        for job in self.job_queue.ordered():
+            if job.status == jobqueue.JOB_RUNNING and self.job_table.exists(str(job.id)):
+                self.job_table.item(str(job.id), values=self.job_row(job))
+
+    def set_max_running_jobs(self):
+        if self.max_jobs.get().isdigit():
+            self.job_queue.set_max_running(int(self.max_jobs.get()))
+
+    ### Telemetry
+
+    def add_telemetry_row(self, job_id: int, metrics: telemetry.StageMetrics):
+        def size(value):
+            return f"{value / 1024 ** 2:.1f}" if value is not None else ""
+
+        cpu = (metrics.user_seconds or 0.0) + (metrics.sys_seconds or 0.0)
+        self.telemetry_row_count += 1
+        self.telemetry_table.insert("", 0, iid=f"{job_id}.{self.telemetry_row_count}", values=(
+            metrics.run,
+            metrics.stage,
+            os.path.basename(metrics.input_path),
+            "cached" if metrics.cached else f"{metrics.wall_seconds:.2f}",
+            f"{cpu:.2f}" if metrics.user_seconds is not None else "",
+            size(metrics.peak_rss_bytes),
+            size(metrics.read_bytes),
+            size(metrics.write_bytes),
+            size(metrics.saved_bytes),
+            size(metrics.output_bytes),
+            f"{metrics.points_per_sec:,.0f}" if metrics.points_per_sec else "",
+        ))
+        rows = self.telemetry_table.get_children()
+        if len(rows) > TELEMETRY_TABLE_MAX_ROWS:
+            self.telemetry_table.delete(*rows[TELEMETRY_TABLE_MAX_ROWS:])
+
+    def selected_telemetry(self):
+        """:returns RunTelemetry of the selected row's job, every kept run if nothing is selected"""
+        selection = self.telemetry_table.selection()
+        if selection:
+            recorder = self.job_telemetry.get(int(selection[0].split(".")[0]))
+            return [recorder] if recorder else []
+        return list(self.job_telemetry.values())
+
+    def export_telemetry(self, extension: str):
+        runs = self.selected_telemetry()
+        if not runs:
+            self.update_output("No telemetry recorded yet\n")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=extension, filetypes=[(f"{extension[1:].upper()} files", f"*{extension}")]
+        )
+        if not path:
+            return
+        try:
+            if extension == ".json":
+                telemetry.write_json(path, runs)
+            else:
+                telemetry.write_csv(path, [metrics for run in runs for metrics in run.stages])
+        except OSError as e:
+            self.update_output(f"Error. cannot write {path}: {e}\n")
+            return
+        self.update_output(f"\nExported telemetry of {len(runs)} runs to {path}\n")
+
+    ### Tiled processing
+
+    def start_tiled(self):
+        """reads the ground, DEM and tiling settings on the main thread and runs the tiled chain on a worker thread"""
+        if tiling is None:
+            self.update_output("Install numpy to use tiled processing\n")
+            return
+        input_path = self.grd_input_path.get()
+        if not input_path:
+            self.update_output(f"Invalid input: {input_path}\n")
+            return
+
+        out_folder = self.grd_out_folder.get() or os.path.dirname(input_path)
+        _, ele_path, hill_path = core.chain_outputs(input_path, out_folder)
+        outputs = (
+            os.path.join(out_folder, self.grd_out_file.get() or f"grd_{os.path.basename(input_path)}"),
+            ele_path,
+            hill_path,
+        )
+        settings = {
+            "ground": self.ground_params(),
+            "dem": self.dem_params(),
+            "shade": self.hillshade_params(),
+            "tile_size": float(self.grd_tile_size.get()) if self.grd_tile_size.get() else None,
+            "buffer": float(self.grd_tile_buffer.get()) if self.grd_tile_buffer.get() else None,
+            "workers": int(self.batch_workers.get() or batch.default_worker_count()),
+        }
+
+        job = jobqueue.QueuedJob(f"tiled_{Path(input_path).stem}")
+        runner, log = self.job_runner(job)
+        self.submit_job(
+            job,
+            log,
+            lambda: runner.run_tiled_chain(input_path, *outputs, **settings),
+            on_done=lambda: [
+                self.update_dem_in_path(outputs[0]),
+                self.update_dem_ele_file(os.path.basename(input_path)),
+                self.update_dem_hill_file(os.path.basename(input_path)),
+                self.update_dem_out_folder(out_folder),
+            ],
+        )
+
+    ### Preview
+
+    def start_preview(self):
+        """reads the settings on the main thread and runs the chain on a subsample as a queued job"""
+        if preview is None:
+            self.update_output("Install numpy to use previews\n")
+            return
+        input_path = self.grd_input_path.get()
+        if not input_path:
+            self.update_output(f"Invalid input: {input_path}\n")
+            return
+        ground, dem, shade = self.ground_params(), self.dem_params(), self.hillshade_params()
+        method = preview.THIN_EVERY_NTH if self.preview_method.get() == PREVIEW_METHODS[1] else preview.THIN_GRID
+        amount = float(self.preview_amount.get()) if self.preview_amount.get() else None
+        outputs = {}
+
+        def run():
+            outputs["paths"] = runner.run_preview(input_path, ground, dem, shade, method, amount)
+            return outputs["paths"] is not None
+
+        job = jobqueue.QueuedJob(f"preview_{Path(input_path).stem}")
+        runner, log = self.job_runner(job)
+        self.submit_job(job, log, run, on_done=lambda: self.show_preview(input_path, *outputs["paths"]))
+
+    def show_preview(self, input_path: str, grd_path: str, ele_path: str, hill_path: str):
+        """shows the preview hillshade in its own window, scaled down to fit PREVIEW_MAX_SIZE"""
+        try:
+            image = tk.PhotoImage(file=hill_path)
+        except tk.TclError as e:
+            self.update_output(f"Error. cannot show {hill_path}: {e}\n")
+            return
+        factor = -(-max(image.width(), image.height()) // PREVIEW_MAX_SIZE)
+        if factor > 1:
+            image = image.subsample(factor)
+
+        window = tk.Toplevel(self.root)
+        window.title(f"Preview - {os.path.basename(input_path)}")
+        label = ttk.Label(window, image=image)
+        label.image = image  # Tk drops images without a Python reference
+        label.pack(padx=2, pady=2)
+        info = ttk.Frame(window)
+        ttk.Label(info, text=self.preview_summary(grd_path)).pack(side=tk.LEFT, padx=H2_PADX)
+        ttk.Button(info, text="View Points", command=lambda: self.run_las_view(grd_path)).pack(side=tk.RIGHT)
+        ttk.Button(info, text="Show Points", command=lambda: self.open_point_viewer(grd_path)).pack(side=tk.RIGHT)
+        info.pack(fill=tk.X, padx=2, pady=2)
+
+    def preview_summary(self, grd_path: str):
+        points, ground = sweep.count_ground(grd_path)
+        if not points:
+            return os.path.basename(grd_path)
+        return f"{points:,} points, {ground:,} ground ({100.0 * ground / points:.1f}%)"
+
+    ### Parameter sweep
+
+    def start_sweep(self):
+        """reads the sweep ranges on the main thread and runs the grid of lasground jobs as one queued job"""
+        input_path = self.grd_input_path.get()
+        if not input_path:
+            self.update_output(f"Invalid input: {input_path}\n")
+            return
+        try:
+            ranges = {param: sweep.parse_values(entry.get()) for param, entry in self.sweep_ranges.items()}
+            variants = sweep.sweep_variants(self.ground_params(), ranges)
+        except ValueError as e:
+            self.update_output(f"Invalid sweep: {e}\n")
+            return
+
+        folder = sweep.sweep_folder(input_path, self.grd_out_folder.get())
+        csv_path = f"{folder}.csv"
+        keep_outputs = self.sweep_keep_outputs.get()
+        workers = int(self.batch_workers.get() or batch.default_worker_count())
+
+        self.sweep_table.delete(*self.sweep_table.get_children())
+        for index, params in enumerate(variants):
+            values = [core.number(getattr(params, param)) if getattr(params, param) is not None else "-"
+                      for param in sweep.SWEEP_PARAMS]
+            self.sweep_table.insert("", tk.END, iid=str(index), values=[index] + values + ["queued", "", ""])
+
+        job = jobqueue.QueuedJob(f"sweep_{len(variants)}_{Path(input_path).stem}")
+        runner, log = self.job_runner(job)
+        sweep_admission = self.admission if self.batch_admission.get() else None
+
+        def run():
+            runner.output(f"sweep: {len(variants)} lasground runs on {input_path}, {workers} workers\n")
+            results = sweep.run_sweep(
+                runner, input_path, variants, folder, workers, keep_outputs,
+                on_result=lambda result: self.call_on_main_thread(lambda: self.update_sweep_row(result)),
+                admission=sweep_admission,
+            )
+            runner.output(f"\n{sweep.format_table(results)}\n")
+            try:
+                sweep.write_csv(csv_path, results)
+                runner.output(f"sweep table: {csv_path}\n")
+            except OSError as e:
+                runner.output(f"Error. cannot write {csv_path}: {e}\n")
+            return all(result.success for result in results)
+
+        self.submit_job(job, log, run)
+
+    def update_sweep_row(self, result: sweep.SweepResult):
+        iid = str(result.index)
+        if not self.sweep_table.exists(iid):
+            return
+        values = list(self.sweep_table.item(iid, "values"))
+        if not result.success:
+            values[-3:] = ["failed", "", f"{result.seconds:.1f}"]
+        else:
+            fraction = result.ground_fraction
+            values[-3:] = [
+                f"{result.ground_points:,}" if result.ground_points is not None else "?",
+                f"{100.0 * fraction:.1f}%" if fraction is not None else "?",
+                f"{result.seconds:.1f}",
+            ]
+        self.sweep_table.item(iid, values=values)
+
+    ### Batch processing
+
+    def batch_job(self):
+        """:returns core.Job from the batch settings"""
+        return core.Job(
+            inputs=[self.batch_source.get()],
+            output_folder=self.batch_out_folder.get(),
+            workers=int(self.batch_workers.get() or batch.default_worker_count()),
+            ground=self.ground_params(),
+            dem=self.dem_params(),
+            hillshade=self.hillshade_params(),
+            intermediates=self.intermediate_params(),
+            agents=self.batch_agents.get().replace(",", " ").split(),
+            agent_token=self.batch_token.get() or None,
+            admission=self.batch_admission.get(),
+            memory_budget_gb=float(self.batch_memory.get() or 0) or None,
+            mosaic=core.MosaicParams(self.batch_mosaic.get(), self.mosaic_rule.get() or core.DEF_MOSAIC_RULE),
+        )
+
+    def start_batch(self):
+        """reads the batch settings on the main thread and runs the batch on a worker thread"""
+        self.run_batch_job(self.batch_job())
+
+    def run_batch_job(self, batch_job: core.Job, resume_id: int = None):
+        """
+        queues the chain for every input of <batch_job>
+        :param resume_id: id of the interrupted journal entry this run takes over, its complete outputs are skipped
+        """
+        files = core.job_files(batch_job)
+        if not files:
+            self.update_output(f"Invalid input: no LAS/LAZ files match {batch_job.inputs}\n")
+            return
+
+        out_folder, agents = batch_job.output_folder, batch_job.agents
+        ground, dem, shade = batch_job.ground, batch_job.dem, batch_job.hillshade
+        intermediates = core.job_intermediates(batch_job, self.update_output)
+
+        self.batch_table.delete(*self.batch_table.get_children())
+        for path in files:
+            self.batch_table.insert("", tk.END, iid=path, values=(os.path.basename(path), batch.STATUS_QUEUED, "", ""))
+
+        job = jobqueue.QueuedJob(f"batch_{len(files)}_files")
+        stage_runner, log = self.job_runner(job)
+        batch_admission = None
+        if batch_job.admission and not agents:
+            batch_admission = self.admission
+            batch_admission.configure(
+                batch_job.memory_budget_gb * 1024 ** 3 if batch_job.memory_budget_gb else None, batch_job.workers
+            )
+        def make_runner(stage_runner, workers, batch_admission=None):
+            return batch.BatchRunner(
+                lambda path: stage_runner.chain_stages(path, out_folder, ground, dem, shade, intermediates),
+                max_workers=workers,
+                on_status=lambda path, status, points, seconds: self.call_on_main_thread(
+                    lambda: self.update_batch_row(path, status, points, seconds)
+                ),
+                on_progress=lambda stats: self.call_on_main_thread(
+                    lambda summary=f"{stats.summary()} | {job.progress.describe()}":
+                    self.batch_stats_lb.config(text=summary)
+                ),
+                admission=batch_admission,
+                job_progress=job.progress,
+                output=stage_runner.output,
+            )
+
+        def with_mosaic(stats: batch.BatchStats):
+            """mosaics the files that succeeded, in input order, if the job asks for it"""
+            success = stats.files_failed == 0
+            if not batch_job.mosaic.enabled:
+                return success
+            done = set(stats.done_paths)
+            done = [path for path in files if path in done]
+            return stage_runner.mosaic_files(done, out_folder, batch_job.mosaic, shade) and success
+
+        def run_batch(job_id):
+            if not agents:
+                runner = make_runner(stage_runner, batch_job.workers, batch_admission)
+                stage_runner.output(f"batch: {len(files)} files, {runner.max_workers} workers\n")
+                stats = runner.run(files)
+                if batch_admission is not None:
+                    stage_runner.output(f"{batch_admission.summary()}\n")
+                return with_mosaic(stats)
+            if stage_runner.result_cache is not None:
+                stage_runner.output("agents do not use the result cache, every stage runs and Force Rerun is ignored\n")
+            # connecting blocks, so it happens on the job thread
+            try:
+                agent_cluster = cluster.Cluster(agents, batch_job.agent_token, stage_runner.output)
+            except ConnectionError as e:
+                stage_runner.output(f"Error. {e}\n")
+                return False
+            try:
+                cluster_runner = cluster.ClusterStageRunner(agent_cluster, stage_runner.output, stage_runner.tracker,
+                                                            stage_runner.recorder)
+                if job_id is not None:
+                    cluster_runner.use_journal(self.journal, job_id, resume_id is not None)
+                runner = make_runner(cluster_runner, agent_cluster.slots)
+                stage_runner.output(f"batch: {len(files)} files on {len(agents)} agents, {runner.max_workers} slots\n")
+                stats = runner.run(files)
+            finally:
+                agent_cluster.close()
+            # the agents wrote the rasters to the shared output folder, the mosaic is made here
+            return with_mosaic(stats)
+
+        def run():
+            # journaled once it starts, a batch cancelled in the queue is never offered for resuming
+            job_id = None
+            if self.journal is not None:
+                job_id = self.journal.start_job(BATCH_JOURNAL_NAME, core.job_spec(batch_job), resume_id)
+                stage_runner.use_journal(self.journal, job_id, resume_id is not None)
+            success = False
+            try:
+                success = run_batch(job_id)
+            finally:
+                if job_id is not None:
+                    if job.tracker.cancelled:
+                        status = journal.JOURNAL_CANCELLED
+                    else:
+                        status = journal.JOURNAL_DONE if success else journal.JOURNAL_FAILED
+                    self.journal.finish_job(job_id, status)
+            return success
+
+        def cancelled():
+            # the interrupted batch the user chose to resume is given up
+            if self.journal is not None and resume_id is not None:
+                self.journal.discard_job(resume_id)
+
+        self.submit_job(job, log, run, on_cancel=cancelled)
+
+    def offer_resume(self):
+        """asks whether to resume each batch run an earlier session did not finish"""
+        if self.journal is None:
+            return
+        for row in self.journal.interrupted_jobs(BATCH_JOURNAL_NAME):
+            try:
+                batch_job = core.job_from_dict(self.journal.job_spec(row["id"]))
+                # the journal does not keep the token
+                batch_job.agent_token = self.batch_token.get() or None
+            except (TypeError, AttributeError) as e:
+                # written by a version with other settings
+                self.update_output(f"Cannot resume interrupted batch {row['id']}: {e}\n")
+                self.journal.discard_job(row["id"])
+                continue
+            done = self.journal.stage_counts(row["id"]).get(journal.JOURNAL_DONE, 0)
+            if messagebox.askyesno(
+                "Resume batch",
+                f"The batch of {', '.join(batch_job.inputs)} started {time.ctime(row['started'])} was interrupted "
+                f"after {done} stages.\n\nResume it? Complete outputs are checked and skipped.",
+                parent=self.root,
+            ):
+                self.run_batch_job(batch_job, row["id"])
+            else:
+                self.journal.discard_job(row["id"])
+
+    ### Watched folders
+
+    def toggle_watch(self):
+        """starts watching the batch source with the batch settings, or stops watching"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            if self.journal is not None:
+                self.journal.finish_job(self.watch_id, journal.JOURNAL_DONE)
+            self.watch_button.config(text="Watch")
+            self.update_output("\nwatch: stopped, queued files still run\n")
+            return
+
+        watch_job = self.batch_job()
+        if not watch_job.inputs[0]:
+            self.update_output("Invalid input: select a folder to watch\n")
+            return
+        if watch_job.agents:
+            self.update_output("watched files run locally, agents are ignored\n")
+        if self.journal is not None:
+            for row in self.journal.interrupted_jobs(WATCH_JOURNAL_NAME):
+                self.journal.discard_job(row["id"])
+            self.watch_id = self.journal.start_job(WATCH_JOURNAL_NAME, core.job_spec(watch_job))
+
+        def skip(path):
+            status = self.journal.ingest_status(path) if self.journal is not None else None
+            if status == journal.JOURNAL_FAILED:
+                self.update_output(f"\nwatch: {path} failed before, skipped until it changes\n")
+            return status is not None
+
+        # every delivered file becomes a queued job, the job queue's running limit bounds the pool
+        self.watcher = watch.FolderWatcher(
+            lambda: core.watched_files(watch_job),
+            lambda path: self.call_on_main_thread(lambda: self.queue_watched_file(watch_job, path)),
+            skip=skip,
+        ).start()
+        self.watch_button.config(text="Stop Watching")
+        self.update_output(f"\nwatch: watching {watch_job.inputs[0]} for LAS/LAZ files\n")
+
+    def queue_watched_file(self, watch_job: core.Job, path: str):
+        """queues the chain for one delivered file as its own job"""
+        if not self.batch_table.exists(path):
+            self.batch_table.insert("", tk.END, iid=path, values=(os.path.basename(path), batch.STATUS_QUEUED, "", ""))
+        job = jobqueue.QueuedJob(f"watch_{Path(path).stem}")
+        stage_runner, log = self.job_runner(job)
+        if self.journal is not None:
+            # a file a closed app left half done keeps its complete outputs
+            stage_runner.use_journal(self.journal, self.watch_id, resume=True)
+        file_admission = None
+        if watch_job.admission:
+            file_admission = self.admission
+            file_admission.configure(
+                watch_job.memory_budget_gb * 1024 ** 3 if watch_job.memory_budget_gb else None, watch_job.workers
+            )
+
+        def run():
+            success = batch.BatchRunner(
+                lambda path: stage_runner.chain_stages(
+                    path, watch_job.output_folder, watch_job.ground, watch_job.dem, watch_job.hillshade,
+                    watch_job.intermediates,
+                ),
+                max_workers=1,
+                on_status=lambda path, status, points, seconds: self.call_on_main_thread(
+                    lambda: self.update_batch_row(path, status, points, seconds)
+                ),
+                admission=file_admission,
+                job_progress=job.progress,
+                output=stage_runner.output,
+            ).run([path]).files_failed == 0
+            # a cancelled file is not recorded, so watching it again processes it
+            if self.journal is not None and not job.tracker.cancelled:
+                self.journal.record_ingest(path, success)
+            return success
+
+        self.submit_job(job, log, run)
+
+    def update_batch_row(self, path, status, points, seconds):
+        if self.batch_table.exists(path):
+            self.batch_table.item(path, values=(
+                os.path.basename(path),
+                status,
+                f"{points:,}" if points else "",
+                f"{seconds:.1f}" if seconds else "",
+            ))
+
+    ### LASTools command builder utility functions
+
+    def decimal_validation(self, P):
+        if P == "":  # Allow empty input (for backspacing)
+            return True
+        try:
+            float(P)  # Try converting the input to a float
+            return True
+        except ValueError:
+            return False
+
+    def integer_validation(self, P):
+        return P == "" or P.isdigit()
+
+    ### Second-level frames
+
+    def create_grd_input_frame(self, parent_frame):
+        # Frame for input selector and button
+        input_frame = ttk.Frame(parent_frame)
+        ttk.Label(input_frame, text="Select File:").pack(side=tk.LEFT, padx=H2_PADX)
+        # File entry field
+        self.grd_input_path = ttk.Entry(input_frame, state=tk.DISABLED)
+        self.grd_input_path.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        # Browse button
+        browse_button = ttk.Button(
+            input_frame,
+            text="...",
+            command=lambda: [
+                self.select_file(self.grd_input_path, LAS_FILETYPES),
+                self.update_grd_out_file(os.path.basename(self.grd_input_path.get())),
+                self.update_grd_out_folder(os.path.dirname(self.grd_input_path.get())),
+                self.show_file_info(self.grd_input_path.get()),
+            ],
+        )
+        browse_button.pack(side=tk.LEFT)
+        # Run command button
+        view_button = ttk.Button(
+            input_frame,
+            text="View",
+            command=lambda: self.run_las_view(self.grd_input_path.get()),
+        )
+        view_button.pack(side=tk.RIGHT)
+        ttk.Button(
+            input_frame,
+            text="Show",
+            command=lambda: self.open_point_viewer(self.grd_input_path.get()),
+        ).pack(side=tk.RIGHT)
+
+        return input_frame
+
+    def create_batch_input_frame(self, parent_frame):
+        batch_frame = ttk.Frame(parent_frame)
+        batch_frame.columnconfigure(0, weight=1)
+
+        # Folder or glob of input tiles
+        source_frame = ttk.Frame(batch_frame)
+        ttk.Label(source_frame, text="Folder or Glob:").pack(side=tk.LEFT, padx=H2_PADX)
+        self.batch_source = ttk.Entry(source_frame)
+        self.batch_source.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        def browse_source():
+            folder = filedialog.askdirectory()
+            if folder:
+                self.batch_source.delete(0, tk.END)
+                self.batch_source.insert(0, folder)
+
+        ttk.Button(source_frame, text="...", command=browse_source).pack(side=tk.LEFT)
+        source_frame.grid(row=0, column=0, pady=2, sticky=tk.EW)
+
+        # Output folder, empty writes next to each input
+        out_frame = ttk.Frame(batch_frame)
+        ttk.Label(out_frame, text="Output Folder:").pack(side=tk.LEFT, padx=H2_PADX)
+        self.batch_out_folder = ttk.Entry(out_frame, state=tk.DISABLED)
+        self.batch_out_folder.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            out_frame,
+            text="...",
+            command=lambda: self.select_folder(self.batch_out_folder),
+        ).pack(side=tk.LEFT)
+        out_frame.grid(row=1, column=0, pady=2, sticky=tk.EW)
+
+        # Concurrent child processes
+        workers_frame = ttk.Frame(batch_frame)
+        ttk.Label(workers_frame, text="Workers:").pack(side=tk.LEFT, padx=H2_PADX)
+        v_int_cmd = workers_frame.register(self.integer_validation)
+        self.batch_workers = ttk.Entry(workers_frame, width=6, validate="all", validatecommand=(v_int_cmd, "%P"))
+        self.batch_workers.insert(0, batch.default_worker_count())
+        self.batch_workers.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        # workers is then only the most, stages wait while their estimated memory does not fit the budget
+        self.batch_admission = tk.BooleanVar(value=True)
+        ttk.Checkbutton(workers_frame, text="Adaptive", variable=self.batch_admission).pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        ttk.Label(workers_frame, text="Memory (GB):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = workers_frame.register(self.decimal_validation)
+        self.batch_memory = ttk.Entry(workers_frame, width=6, validate="all", validatecommand=(v_dec_cmd, "%P"))
+        budget = admission.default_memory_budget()
+        if budget:
+            self.batch_memory.insert(0, f"{budget / 1024 ** 3:.1f}")
+        self.batch_memory.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        # stages go to these cluster agents instead of local processes
+        ttk.Label(workers_frame, text="Agents (host:port, ...):").pack(side=tk.LEFT, padx=H2_PADX)
+        self.batch_agents = ttk.Entry(workers_frame)
+        self.batch_agents.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        ttk.Label(workers_frame, text="Token:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.batch_token = ttk.Entry(workers_frame, width=12, show="*")
+        self.batch_token.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        ttk.Button(workers_frame, text="Run Batch", command=self.start_batch).pack(side=tk.RIGHT)
+        # new files in the source folder are queued as they finish arriving
+        self.watch_button = ttk.Button(workers_frame, text="Watch", command=self.toggle_watch)
+        self.watch_button.pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        workers_frame.grid(row=2, column=0, pady=2, sticky=tk.EW)
+
+        # unticked intermediates are piped (ground) or written to the scratch folder and deleted (elevation)
+        intermediates_frame = ttk.Frame(batch_frame)
+        self.keep_ground = tk.BooleanVar(value=True)
+        ttk.Checkbutton(intermediates_frame, text="Keep Ground", variable=self.keep_ground).pack(
+            side=tk.LEFT, padx=H2_PADX
+        )
+        # auto compresses kept ground points and leaves scratch ones uncompressed
+        self.ground_format = ttk.Combobox(intermediates_frame, values=GROUND_FORMATS, state="readonly", width=5)
+        self.ground_format.set(core.GROUND_FORMAT_AUTO)
+        self.ground_format.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.keep_elevation = tk.BooleanVar(value=True)
+        ttk.Checkbutton(intermediates_frame, text="Keep Elevation BIL", variable=self.keep_elevation).pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        ttk.Label(intermediates_frame, text="Scratch Folder:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.scratch_folder = ttk.Entry(intermediates_frame)
+        self.scratch_folder.insert(0, core.DEF_SCRATCH_DIR)
+        self.scratch_folder.config(state=tk.DISABLED)
+        self.scratch_folder.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            intermediates_frame,
+            text="...",
+            command=lambda: self.select_folder(self.scratch_folder),
+        ).pack(side=tk.LEFT)
+        intermediates_frame.grid(row=3, column=0, pady=2, sticky=tk.EW)
+
+        # the elevation rasters of the batch are combined into one, and shaded, once every file is done
+        mosaic_frame = ttk.Frame(batch_frame)
+        self.batch_mosaic = tk.BooleanVar(value=False)
+        ttk.Checkbutton(mosaic_frame, text="Mosaic", variable=self.batch_mosaic).pack(side=tk.LEFT, padx=H2_PADX)
+        ttk.Label(mosaic_frame, text="Overlaps:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.mosaic_rule = ttk.Combobox(mosaic_frame, values=MOSAIC_RULES, state="readonly", width=6)
+        self.mosaic_rule.set(core.DEF_MOSAIC_RULE)
+        self.mosaic_rule.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        mosaic_frame.grid(row=4, column=0, pady=2, sticky=tk.EW)
+
+        # Per-file status table
+        columns = ("file", "status", "points", "seconds")
+        self.batch_table = ttk.Treeview(batch_frame, columns=columns, show="headings", height=BATCH_TABLE_HEIGHT)
+        for column in columns:
+            self.batch_table.heading(column, text=column.capitalize())
+        self.batch_table.column("file", width=300)
+        for column in columns[1:]:
+            self.batch_table.column(column, width=100, anchor=tk.E)
+        self.batch_table.grid(row=5, column=0, pady=2, sticky=tk.EW)
+
+        table_scrollbar = ttk.Scrollbar(batch_frame, orient=tk.VERTICAL, command=self.batch_table.yview)
+        table_scrollbar.grid(row=5, column=1, sticky=tk.NS)
+        self.batch_table.configure(yscrollcommand=table_scrollbar.set)
+
+        # Aggregate throughput
+        self.batch_stats_lb = ttk.Label(batch_frame, text="")
+        self.batch_stats_lb.grid(row=6, column=0, pady=2, sticky=tk.W)
+
+        return batch_frame
+
+    def create_processing_frame(self, parent_frame):
+        processing_frame = ttk.Frame(parent_frame)
+        processing_frame_row = 0
+
+        processing_frame.columnconfigure(processing_frame_row, minsize=MIN_COL_0_W)
+
+        self.create_ground_command_frame(processing_frame).grid(
+            row=0, column=0, pady=2, sticky=tk.W
+        )
+
+        self.create_sweep_frame(processing_frame).grid(
+            row=1, column=0, pady=2, sticky=tk.EW
+        )
+
+        self.create_dem_command_frame(processing_frame).grid(
+            row=2, column=0, pady=2, sticky=tk.W
+        )
+
+        self.create_cache_frame(processing_frame).grid(
+            row=3, column=0, pady=2, sticky=tk.W
+        )
+
+        self.create_jobs_frame(processing_frame).grid(
+            row=4, column=0, pady=2, sticky=tk.EW
+        )
+
+        self.create_telemetry_frame(processing_frame).grid(
+            row=5, column=0, pady=2, sticky=tk.EW
+        )
+
+        return processing_frame
+
+    def create_sweep_frame(self, parent_frame):
+        sweep_frame = ttk.Frame(parent_frame)
+        sweep_frame.columnconfigure(0, weight=1)
+
+        controls_frame = ttk.Frame(sweep_frame)
+        ttk.Label(controls_frame, text="Lasground Sweep", font=H2_FONT).pack(side=tk.LEFT, padx=H1_PADX, pady=H1_PADY)
+        self.sweep_keep_outputs = tk.BooleanVar()
+        ttk.Checkbutton(controls_frame, text="Keep Outputs", variable=self.sweep_keep_outputs).pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        ttk.Button(controls_frame, text="Run Sweep", command=self.start_sweep).pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        controls_frame.grid(row=0, column=0, pady=2, sticky=tk.EW)
+
+        # e.g. "1:5:1" or "0.5, 1, 2", empty keeps the value from the lasground settings
+        ranges_frame = ttk.Frame(sweep_frame)
+        self.sweep_ranges = {}
+        for param in sweep.SWEEP_PARAMS:
+            ttk.Label(ranges_frame, text=f"{param.capitalize()}:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+            self.sweep_ranges[param] = ttk.Entry(ranges_frame, width=14)
+            self.sweep_ranges[param].pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        ranges_frame.grid(row=1, column=0, pady=2, sticky=tk.W)
+
+        columns = ("run",) + sweep.SWEEP_PARAMS + ("ground", "fraction", "seconds")
+        self.sweep_table = ttk.Treeview(sweep_frame, columns=columns, show="headings", height=SWEEP_TABLE_HEIGHT)
+        for column in columns:
+            self.sweep_table.heading(column, text=column.capitalize())
+            self.sweep_table.column(column, width=80, anchor=tk.E)
+        self.sweep_table.column("ground", width=120)
+        self.sweep_table.grid(row=2, column=0, pady=2, sticky=tk.EW)
+
+        table_scrollbar = ttk.Scrollbar(sweep_frame, orient=tk.VERTICAL, command=self.sweep_table.yview)
+        table_scrollbar.grid(row=2, column=1, sticky=tk.NS)
+        self.sweep_table.configure(yscrollcommand=table_scrollbar.set)
+
+        return sweep_frame
+
+    def create_cache_frame(self, parent_frame):
+        cache_frame = ttk.Frame(parent_frame)
+        ttk.Label(cache_frame, text="Result Cache", font=H2_FONT).pack(side=tk.LEFT, padx=H1_PADX, pady=H1_PADY)
+
+        # plain attributes mirror the checkboxes so worker threads never read Tk variables
+        self.force_rerun = tk.BooleanVar()
+        ttk.Checkbutton(
+            cache_frame,
+            text="Force Rerun",
+            variable=self.force_rerun,
+            command=lambda: setattr(self.runner, "force_rerun", self.force_rerun.get()),
+        ).pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+
+        self.hash_inputs = tk.BooleanVar()
+        ttk.Checkbutton(
+            cache_frame,
+            text="Hash Input Contents",
+            variable=self.hash_inputs,
+            command=lambda: setattr(self.runner.result_cache, "hash_content", self.hash_inputs.get()),
+        ).pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+
+        ttk.Button(
+            cache_frame,
+            text="Clear Cache",
+            command=lambda: [
+                self.runner.result_cache.clear(),
+                self.update_output(f"\nCleared result cache {self.runner.result_cache.cache_dir}\n"),
+            ],
+        ).pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+
+        return cache_frame
+
+    def create_jobs_frame(self, parent_frame):
+        jobs_frame = ttk.Frame(parent_frame)
+        jobs_frame.columnconfigure(0, weight=1)
+
+        controls_frame = ttk.Frame(jobs_frame)
+        ttk.Label(controls_frame, text="Jobs", font=H2_FONT).pack(side=tk.LEFT, padx=H1_PADX, pady=H1_PADY)
+        ttk.Label(controls_frame, text="Max Running:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.max_jobs = ttk.Spinbox(controls_frame, from_=1, to=64, width=4, command=self.set_max_running_jobs)
+        self.max_jobs.set(self.job_queue.max_running)
+        self.max_jobs.bind("<Return>", lambda event: self.set_max_running_jobs())
+        self.max_jobs.bind("<FocusOut>", lambda event: self.set_max_running_jobs())
+        self.max_jobs.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+
+        # buttons act on the selected job
+        ttk.Button(
+            controls_frame,
+            text="Cancel",
+            command=self.cancel_selected_job,
+        ).pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            controls_frame,
+            text="Down",
+            command=lambda: self.move_selected_job(1),
+        ).pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            controls_frame,
+            text="Up",
+            command=lambda: self.move_selected_job(-1),
+        ).pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        controls_frame.grid(row=0, column=0, pady=2, sticky=tk.EW)
+
+        # running, then queued in start order, then finished
+        columns = ("job", "status", "seconds", "progress", "eta")
+        self.job_table = ttk.Treeview(
+            jobs_frame, columns=columns, show="headings", height=JOB_TABLE_HEIGHT, selectmode=tk.BROWSE
+        )
+        for column in columns:
+            self.job_table.heading(column, text=column.upper() if column == "eta" else column.capitalize())
+        self.job_table.column("job", width=300)
+        self.job_table.column("status", width=200)
+        self.job_table.column("seconds", width=100, anchor=tk.E)
+        self.job_table.column("progress", width=150)
+        self.job_table.column("eta", width=300)
+        self.job_table.grid(row=1, column=0, pady=2, sticky=tk.EW)
+
+        table_scrollbar = ttk.Scrollbar(jobs_frame, orient=tk.VERTICAL, command=self.job_table.yview)
+        table_scrollbar.grid(row=1, column=1, sticky=tk.NS)
+        self.job_table.configure(yscrollcommand=table_scrollbar.set)
+
+        return jobs_frame
+
+    def create_telemetry_frame(self, parent_frame):
+        telemetry_frame = ttk.Frame(parent_frame)
+        telemetry_frame.columnconfigure(0, weight=1)
+
+        controls_frame = ttk.Frame(telemetry_frame)
+        ttk.Label(controls_frame, text="Stage Telemetry", font=H2_FONT).pack(side=tk.LEFT, padx=H1_PADX, pady=H1_PADY)
+        # exports the run of the selected row, or every run if nothing is selected
+        ttk.Button(
+            controls_frame,
+            text="Export CSV",
+            command=lambda: self.export_telemetry(".csv"),
+        ).pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            controls_frame,
+            text="Export JSON",
+            command=lambda: self.export_telemetry(".json"),
+        ).pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        controls_frame.grid(row=0, column=0, pady=2, sticky=tk.EW)
+
+        # newest stage first
+        columns = ("run", "stage", "input", "wall s", "cpu s", "peak MB", "read MB", "write MB", "saved MB", "output MB",
+                   "points/s")
+        self.telemetry_row_count = 0
+        self.telemetry_table = ttk.Treeview(
+            telemetry_frame, columns=columns, show="headings", height=TELEMETRY_TABLE_HEIGHT, selectmode=tk.BROWSE
+        )
+        for column in columns:
+            self.telemetry_table.heading(column, text=column.capitalize())
+            self.telemetry_table.column(column, width=80, anchor=tk.E)
+        for column in columns[:3]:
+            self.telemetry_table.column(column, width=160, anchor=tk.W)
+        self.telemetry_table.grid(row=1, column=0, pady=2, sticky=tk.EW)
+
+        table_scrollbar = ttk.Scrollbar(telemetry_frame, orient=tk.VERTICAL, command=self.telemetry_table.yview)
+        table_scrollbar.grid(row=1, column=1, sticky=tk.NS)
+        self.telemetry_table.configure(yscrollcommand=table_scrollbar.set)
+
+        return telemetry_frame
+
+    def create_ground_command_frame(self, parent_frame):
+        # Dictionary to store the optional parameter checkboxes and entries
+        grd_params_dict = {}
+        self.grd_params_dict = grd_params_dict
+
+        # grd frame
+        grd_command_frame = ttk.Frame(parent_frame)
+        grd_command_frame_row = 0
+        grd_command_frame.columnconfigure(grd_command_frame_row, minsize=MIN_COL_0_W)
+
+        # grd label
+        ground_lb_frame = ttk.Frame(grd_command_frame)
+        ground_lb = ttk.Label(ground_lb_frame, text="Lasground", font=H2_FONT)
+        ground_lb.pack(side=tk.LEFT, padx=H1_PADX, pady=H1_PADY)
+
+        # Info button
+        self.create_info_button(ground_lb_frame, "grd_lasground").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        ground_lb_frame.grid(row=grd_command_frame_row, column=0, pady=2, sticky=tk.W)
+        grd_command_frame_row += 1
+
+        # out file
+        grd_out_file_selector = ttk.Frame(grd_command_frame)
+        ttk.Label(grd_out_file_selector, text="Output File:").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        self.grd_out_file = ttk.Entry(grd_out_file_selector)
+        self.grd_out_file.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        grd_out_file_selector.grid(
+            row=grd_command_frame_row, column=0, pady=2, sticky=tk.EW
+        )
+        grd_command_frame_row += 1
+
+        # out folder
+        grd_out_folder_frame = ttk.Frame(grd_command_frame)
+        ttk.Label(grd_out_folder_frame, text="Output Folder:").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        # File entry field
+        self.grd_out_folder = ttk.Entry(grd_out_folder_frame, state=tk.DISABLED)
+        self.grd_out_folder.insert(0, f"{os.path.basename(self.grd_input_path.get())}")
+        self.grd_out_folder.pack(
+            side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX
+        )
+        # Browse button
+        browse_button = ttk.Button(
+            grd_out_folder_frame,
+            text="...",
+            command=lambda: self.select_folder(self.grd_out_folder),
+        )
+        browse_button.pack(side=tk.LEFT)
+
+        grd_out_folder_frame.grid(row=grd_command_frame_row, column=0, pady=2, sticky=tk.EW)
+        grd_command_frame_row += 1
+
+        # step parameter
+        sub_frame = ttk.Frame(grd_command_frame)
+        ttk.Label(sub_frame, text="Step:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = sub_frame.register(self.decimal_validation)
+        # Info button
+        self.create_info_button(sub_frame, "grd_step").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+
+        self.grd_step = ttk.Entry(
+            sub_frame, validate="all", validatecommand=(v_dec_cmd, "%P")
+        )
+        self.grd_step.insert(0, DEF_GRD_STEP)
+        self.grd_step.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        sub_frame.grid(row=grd_command_frame_row, column=0, pady=2, stick=tk.W)
+        grd_command_frame_row += 1
+
+
+        # compute height parameter
+        grd_compute_h_frame = ttk.Frame(grd_command_frame)
+        ttk.Label(grd_compute_h_frame, text="Compute Height:").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        self.compute_height = tk.BooleanVar()
+
+        ttk.Checkbutton(grd_compute_h_frame, variable=self.compute_height).pack(
+            side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX
+        )
+
+        # Info button
+        self.create_info_button(grd_compute_h_frame, "grd_compute_height").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        grd_compute_h_frame.grid(
+            row=grd_command_frame_row, column=0, pady=2, stick=tk.W
+        )
+        grd_command_frame_row += 1
+
+        # in-process ground engine
+        grd_engine_frame = ttk.Frame(grd_command_frame)
+        ttk.Label(grd_engine_frame, text="In-process (NumPy):").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        self.grd_in_process = tk.BooleanVar()
+        ttk.Checkbutton(
+            grd_engine_frame, variable=self.grd_in_process,
+            state=tk.NORMAL if groundfilter is not None else tk.DISABLED,
+        ).pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        # Info button
+        self.create_info_button(grd_engine_frame, "grd_engine").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        grd_engine_frame.grid(
+            row=grd_command_frame_row, column=0, pady=2, stick=tk.W
+        )
+        grd_command_frame_row += 1
+
+        def toggle_Entry(var: tk.IntVar, entry: tk.Entry):
+            if var.get() == True:
+                entry.config(state=tk.NORMAL)
+            else:
+                entry.config(state=tk.DISABLED)
+
+        # optional params with entry fields
+        toggle_param_list = DEF_GRD_OP_PARAMS_DEC_ENTRY
+
+        for param in toggle_param_list:
+            frame = ttk.Frame(grd_command_frame)
+            var = tk.BooleanVar()
+
+            #create the entry first so it can be referenced by the checkbox
+            v_dec_cmd = frame.register(self.decimal_validation)
+            entry = ttk.Entry(frame, validate="all", validatecommand=(v_dec_cmd, "%P"))
+            entry.insert(0, 0)
+            entry.config(state=tk.DISABLED)
+
+            # Store in dictionary
+            grd_params_dict[param] = {"is_enabled": var, "entry": entry}
+
+            ttk.Checkbutton(
+                frame,
+                text=f"Enable {param.capitalize()}",
+                variable=var,
+                command=lambda v=var, e=grd_params_dict[param].get("entry"): (
+                   toggle_Entry(v, e)
+                ),
+            ).pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+            ttk.Label(frame, text=f"{param.capitalize()}:").pack(
+                side=tk.LEFT, padx=VIEW_BTN_PADX
+            )
+            #pack the entry here so it goes in the right place
+            entry.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+            # Info button
+            self.create_info_button(frame, f"grd_{param}").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+
+            # Pack frame into parent processing frame
+            frame.grid(row=grd_command_frame_row, column=0, pady=2, stick=tk.W)
+            grd_command_frame_row += 1
+
+        # tiling parameters, empty picks them from the point count and steps
+        tiling_frame = ttk.Frame(grd_command_frame)
+        v_dec_cmd = tiling_frame.register(self.decimal_validation)
+        ttk.Label(tiling_frame, text="Tile Size (empty = auto):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.grd_tile_size = ttk.Entry(tiling_frame, width=10, validate="all", validatecommand=(v_dec_cmd, "%P"))
+        self.grd_tile_size.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        ttk.Label(tiling_frame, text="Buffer (empty = auto):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.grd_tile_buffer = ttk.Entry(tiling_frame, width=10, validate="all", validatecommand=(v_dec_cmd, "%P"))
+        self.grd_tile_buffer.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        tiling_frame.grid(row=grd_command_frame_row, column=0, pady=2, stick=tk.W)
+        grd_command_frame_row += 1
+
+        # preview thinning, empty amount aims for preview.PREVIEW_TARGET_POINTS
+        preview_frame = ttk.Frame(grd_command_frame)
+        ttk.Label(preview_frame, text="Preview Thinning:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.preview_method = ttk.Combobox(
+            preview_frame, values=PREVIEW_METHODS, state="readonly", width=14
+        )
+        self.preview_method.set(PREVIEW_METHODS[0])
+        self.preview_method.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        ttk.Label(preview_frame, text="N / Cell Size (empty = auto):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = preview_frame.register(self.decimal_validation)
+        self.preview_amount = ttk.Entry(preview_frame, width=10, validate="all", validatecommand=(v_dec_cmd, "%P"))
+        self.preview_amount.pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        preview_frame.grid(row=grd_command_frame_row, column=0, pady=2, stick=tk.W)
+        grd_command_frame_row += 1
+
+        # Run command button update dem inputs once the run finishes
+        ttk.Button(
+            grd_command_frame,
+            text="Run",
+            command=lambda: self.run_pipeline(
+                f"lasground_{Path(self.grd_input_path.get()).stem}",
+                lambda runner: [runner.ground_stage(
+                    self.grd_input_path.get(),
+                    os.path.join(self.grd_out_folder.get(), self.grd_out_file.get()),
+                    self.ground_params(),
+                )],
+                on_done=lambda: [
+                    self.update_dem_in_path(os.path.join(self.grd_out_folder.get(), self.grd_out_file.get())),
+                    self.update_dem_ele_file(os.path.basename(self.grd_input_path.get())),
+                    self.update_dem_hill_file(os.path.basename(self.grd_input_path.get())),
+                    self.update_dem_out_folder(os.path.dirname(self.grd_input_path.get())),
+                ],
+            ),
+        ).grid(row=grd_command_frame_row, column=1, pady=2)
+
+        #view button
+        ttk.Button(
+            grd_command_frame,
+            text="View",
+            command=lambda: self.run_las_view(
+                os.path.join(self.grd_out_folder.get(), self.grd_out_file.get())
+            ),
+        ).grid(row=grd_command_frame_row, column=2, pady=2)
+
+        # Tiled ground -> DEM -> hillshade for inputs too large for one lasground run
+        ttk.Button(
+            grd_command_frame,
+            text="Run Tiled",
+            command=self.start_tiled,
+        ).grid(row=grd_command_frame_row, column=3, pady=2)
+
+        # ground -> DEM -> hillshade on a thinned subsample, to check the settings in seconds
+        ttk.Button(
+            grd_command_frame,
+            text="Preview",
+            command=self.start_preview,
+        ).grid(row=grd_command_frame_row, column=4, pady=2)
+
+        return grd_command_frame
+    
+    def create_dem_input_frame(self, parent_frame):
+        # Frame for input selector and button
+        input_frame = ttk.Frame(parent_frame)
+        ttk.Label(input_frame, text="Select File:").pack(side=tk.LEFT, padx=H2_PADX)
+        # File entry field
+        self.dem_input_path = ttk.Entry(input_frame, state=tk.DISABLED)
+        self.dem_input_path.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        # Browse button
+        browse_button = ttk.Button(
+            input_frame,
+            text="...",
+            command=lambda: [
+                self.select_file(self.dem_input_path, LAS_FILETYPES),
+                self.show_file_info(self.dem_input_path.get()),
+                self.update_dem_ele_file(os.path.basename(self.dem_input_path.get())),
+                self.update_dem_hill_file(os.path.basename(self.dem_input_path.get())),
+                self.update_dem_out_folder(os.path.dirname(self.dem_input_path.get())),
+            ],
+        )
+        browse_button.pack(side=tk.LEFT)
+        # Run command button
+        view_button = ttk.Button(
+            input_frame,
+            text="View",
+            command=lambda: self.run_las_view(self.dem_input_path.get()),
+        )
+        view_button.pack(side=tk.RIGHT)
+        ttk.Button(
+            input_frame,
+            text="Show",
+            command=lambda: self.open_point_viewer(self.dem_input_path.get()),
+        ).pack(side=tk.RIGHT)
+
+        return input_frame   
+
+    def create_dem_command_frame(self, parent_frame):
+        #dem frame
+        dem_command_frame = ttk.Frame(parent_frame)
+        dem_command_frame_row = 0
+        dem_command_frame.columnconfigure(dem_command_frame_row, minsize=MIN_COL_0_W)
+
+        #dem label
+        dem_lb_frame = ttk.Frame(dem_command_frame)
+        dem_lb = ttk.Label(dem_lb_frame, text="Compute DEM", font=H2_FONT)
+        dem_lb.pack(side=tk.LEFT, padx=H1_PADX, pady=H1_PADY)
+
+        # Info button
+        self.create_info_button(dem_lb_frame, "dem_blast2dem").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+        dem_lb_frame.grid(row=dem_command_frame_row, column=0, pady=2, sticky=tk.W)
+        dem_command_frame_row += 1
+
+        #Input Path
+        ttk.Label(dem_command_frame, text="Input Selection", font=H2_FONT).grid(
+            row=dem_command_frame_row, column=0, pady=2, sticky=tk.W)
+        dem_command_frame_row+=1
+
+        self.create_dem_input_frame(dem_command_frame).grid(
+            row=dem_command_frame_row, column=0, pady=2, sticky=tk.EW)
+        dem_command_frame_row+=1
+
+        # Out file elevation
+        dem_ele_file_selector = ttk.Frame(dem_command_frame)
+        ttk.Label(dem_ele_file_selector, text="Output Elevation File:").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        self.dem_ele_file = ttk.Entry(dem_ele_file_selector)
+        self.dem_ele_file.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            dem_ele_file_selector,
+            text="View",
+            command=lambda: self.open_raster_viewer(
+                os.path.join(self.dem_out_folder.get(), self.dem_ele_file.get())
+            ),
+        ).pack(side=tk.LEFT)
+
+        dem_ele_file_selector.grid(
+            row=dem_command_frame_row, column=0, pady=2, sticky=tk.EW
+        )
+        dem_command_frame_row += 1
+
+        # Out file hillshade
+        dem_hill_file_selector = ttk.Frame(dem_command_frame)
+        ttk.Label(dem_hill_file_selector, text="Output Hillshade File:").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        self.dem_hill_file = ttk.Entry(dem_hill_file_selector)
+        self.dem_hill_file.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX)
+        ttk.Button(
+            dem_hill_file_selector,
+            text="View",
+            command=lambda: self.open_raster_viewer(
+                os.path.join(self.dem_out_folder.get(), self.dem_hill_file.get())
+            ),
+        ).pack(side=tk.LEFT)
+
+        dem_hill_file_selector.grid(
+            row=dem_command_frame_row, column=0, pady=2, sticky=tk.EW
+        )
+        dem_command_frame_row += 1
+
+        # out folder
+        dem_out_folder_frame = ttk.Frame(dem_command_frame)
+        ttk.Label(dem_out_folder_frame, text="Output Folder:").pack(
+            side=tk.LEFT, padx=VIEW_BTN_PADX
+        )
+        # File entry field
+        self.dem_out_folder = ttk.Entry(dem_out_folder_frame, state=tk.DISABLED)
+        self.dem_out_folder.pack(
+            side=tk.LEFT, expand=True, fill=tk.X, padx=VIEW_BTN_PADX
+        )
+        # Browse button
+        browse_button = ttk.Button(
+            dem_out_folder_frame,
+            text="...",
+            command=lambda: self.select_folder(self.grd_out_folder),
+        )
+        browse_button.pack(side=tk.LEFT)
+
+        dem_out_folder_frame.grid(row=dem_command_frame_row, column=0, pady=2, sticky=tk.EW)
+        dem_command_frame_row += 1
+
+        #Resolution Parameter
+        dem_step_frame = ttk.Frame(dem_command_frame)
+        ttk.Label(dem_step_frame, text="Step (Resolution):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = dem_step_frame.register(self.decimal_validation)
+        # Info button
+        self.create_info_button(dem_step_frame, "dem_step").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+
+        #step param
+        self.dem_step = ttk.Entry(
+            dem_step_frame, validate="all", validatecommand=(v_dec_cmd, "%P")
+        )
+        self.dem_step.insert(0, DEF_DEM_STEP)
+        self.dem_step.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+        dem_step_frame.grid(row=dem_command_frame_row, column=0, pady=2, stick=tk.W)
+        dem_command_frame_row += 1
+        
+        #Hillshade Option
+        ttk.Label(dem_command_frame, text="Hillshading", font=H2_FONT).grid(
+            row=dem_command_frame_row, column=0, pady=2, sticky=tk.W)
+        dem_command_frame_row+=1
+
+        #Azimuth suboption
+        sub_frame = ttk.Frame(dem_command_frame)
+        ttk.Label(sub_frame, text="Azimuth (degree):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = sub_frame.register(self.decimal_validation)
+        # Info button
+        self.create_info_button(sub_frame, "dem_azimuth").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+
+        self.dem_azimuth = ttk.Entry(
+            sub_frame, validate="all", validatecommand=(v_dec_cmd, "%P")
+        )
+        self.dem_azimuth.insert(0, DEF_DEM_AZIMUTH)
+        self.dem_azimuth.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        sub_frame.grid(row=dem_command_frame_row, column=0, pady=2, stick=tk.W)
+        dem_command_frame_row += 1
+
+        #Altitude suboption
+        sub_frame = ttk.Frame(dem_command_frame)
+        ttk.Label(sub_frame, text="Altitude (degree):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = sub_frame.register(self.decimal_validation)
+        # Info button
+        self.create_info_button(sub_frame, "dem_altitude").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+
+        self.dem_altitude = ttk.Entry(
+            sub_frame, validate="all", validatecommand=(v_dec_cmd, "%P")
+        )
+        self.dem_altitude.insert(0, DEF_DEM_ALTITUDE)
+        self.dem_altitude.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        sub_frame.grid(row=dem_command_frame_row, column=0, pady=2, stick=tk.W)
+        dem_command_frame_row += 1
+
+        # r-value suboption
+        sub_frame = ttk.Frame(dem_command_frame)
+        ttk.Label(sub_frame, text="R factor:").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        v_dec_cmd = sub_frame.register(self.decimal_validation)
+        # Info button
+        self.create_info_button(sub_frame, "dem_r_factor").pack(side=tk.RIGHT, padx=VIEW_BTN_PADX)
+
+        self.dem_r_factor = ttk.Entry(
+            sub_frame, validate="all", validatecommand=(v_dec_cmd, "%P")
+        )
+        self.dem_r_factor.insert(0, DEF_DEM_R_FACTOR)
+        self.dem_r_factor.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        sub_frame.grid(row=dem_command_frame_row, column=0, pady=2, stick=tk.W)
+        dem_command_frame_row += 1
+
+        # In-process hillshade suboption
+        sub_frame = ttk.Frame(dem_command_frame)
+        self.numpy_hillshade = tk.BooleanVar()
+        ttk.Checkbutton(
+            sub_frame,
+            text="In-process (NumPy) Hillshade",
+            variable=self.numpy_hillshade,
+            state=tk.NORMAL if hillshade else tk.DISABLED,
+        ).pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        ttk.Label(sub_frame, text="Additional Lights (az/alt):").pack(side=tk.LEFT, padx=VIEW_BTN_PADX)
+        self.dem_extra_lights = ttk.Entry(sub_frame)
+        self.dem_extra_lights.pack(side=tk.LEFT, fill=tk.X, padx=VIEW_BTN_PADX)
+
+        sub_frame.grid(row=dem_command_frame_row, column=0, pady=2, stick=tk.W)
+        dem_command_frame_row += 1
+
+        #Run Command Button
+        ttk.Button(
+            dem_command_frame,
+            text="Run",
+            command=lambda : self.run_pipeline(f"blast2dem_{Path(self.dem_input_path.get()).stem}", lambda runner: [
+                runner.blast2dem_stage(
+                    self.dem_input_path.get(),
+                    os.path.join(self.dem_out_folder.get(), self.dem_ele_file.get()),
+                    self.dem_params(),
+                ),
+                runner.hillshade_stage(
+                    os.path.join(self.dem_out_folder.get(), self.dem_ele_file.get()),
+                    os.path.join(self.dem_out_folder.get(), self.dem_hill_file.get()),
+                    self.hillshade_params(),
+                ),
+            ])
+        ).grid(row=dem_command_frame_row, column=1, pady=2)
+
+        # Re-shade the existing elevation raster without re-running blast2dem
+        ttk.Button(
+            dem_command_frame,
+            text="Re-shade",
+            command=lambda : self.run_pipeline(f"hillshade_{Path(self.dem_ele_file.get()).stem}", lambda runner: [
+                runner.hillshade_stage(
+                    os.path.join(self.dem_out_folder.get(), self.dem_ele_file.get()),
+                    os.path.join(self.dem_out_folder.get(), self.dem_hill_file.get()),
+                    self.hillshade_params(),
+                ),
+            ])
+        ).grid(row=dem_command_frame_row, column=2, pady=2)
+
+        return dem_command_frame
+
+
+    ### GRD Command Callbacks
+
+    def update_grd_out_file(self, output_file):
+        if output_file:
+            self.grd_out_file.delete(0, tk.END)
+            self.grd_out_file.insert(0, f"grd_{output_file}")
+
+    def update_grd_out_folder(self, output_folder):
+        if output_folder:
+            self.grd_out_folder.config(state=tk.NORMAL)
+            self.grd_out_folder.delete(0, tk.END)
+            self.grd_out_folder.insert(0, f"{output_folder}")
+            self.grd_out_folder.config(state=tk.DISABLED)
+
+    ### DEM Command Callbacks
+
+    def update_dem_in_path(self, input_path):
+        if input_path:
+            self.dem_input_path.config(state=tk.NORMAL)
+            self.dem_input_path.delete(0, tk.END)
+            self.dem_input_path.insert(0, f"{input_path}")
+            self.dem_input_path.config(state=tk.DISABLED)
+
+    def update_dem_ele_file(self, output_file):
+        if output_file:
+            self.dem_ele_file.delete(0, tk.END)
+            self.dem_ele_file.insert(0, f"dem_elevation_{Path(output_file).stem}.bil")
+
+    def update_dem_hill_file(self, output_file):
+        if output_file:
+            self.dem_hill_file.delete(0, tk.END)
+            self.dem_hill_file.insert(0, f"dem_hillshade_{Path(output_file).stem}.png")
+
+    def update_dem_out_folder(self, output_folder):
+        if output_folder:
+            self.dem_out_folder.config(state=tk.NORMAL)
+            self.dem_out_folder.delete(0, tk.END)
+            self.dem_out_folder.insert(0, f"{output_folder}")
+            self.dem_out_folder.config(state=tk.DISABLED)
+
+    ### Main Textboxes
+
+    def update_output(self, message):
+        """Queues <message> for the output console. Safe to call from any thread."""
+        if message:
+            self.output_queue.put(message)
+
+    def flush_output(self):
+        """Drains the output queue into the output console once per frame."""
+        # scheduled first, so an error below cannot stop the output for good
+        self.root.after(OUTPUT_FLUSH_MS, self.flush_output)
+        while True:
+            try:
+                callback = self.main_thread_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback()
+            except Exception:
+                self.update_output(f"\n{traceback.format_exc()}")
+
+        messages = []
+        while True:
+            try:
+                messages.append(self.output_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if self.jobs_changed:
+            self.jobs_changed = False
+            self.progress_changed = False
+            self.refresh_job_table()
+        elif self.progress_changed and time.monotonic() - self.progress_refreshed >= PROGRESS_REFRESH_SECONDS:
+            self.progress_changed = False
+            self.progress_refreshed = time.monotonic()
+            self.refresh_job_progress()
+
+        if messages:
+            # only the visible lines are redrawn, however much output has been buffered
+            self.output_buffer.append("".join(messages))
+            self.output_console.render()
+
+    def update_info_box(self, filename):
+        """Reads a text file and updates the output_text widget with its content."""
+        try:
+            with open(filename, "r", encoding="utf-8") as file:
+                content = file.read()
+
+            self.infobox.config(state=tk.NORMAL)
+            self.infobox.delete("1.0", tk.END)  # Clear previous content
+            self.infobox.insert(tk.END, content)  # Insert new content
+            self.infobox.config(state=tk.DISABLED)
+
+        except FileNotFoundError:
+            print(f"Error: {filename} not found.")
+        except Exception as e:
+            print(f"Error reading {filename}: {e}")
+
+    def create_widgets(self, parent_frame: ttk.Frame):
+        """Create all widgets for the UI."""
+
+        ### widgets
+        # Title label
+        title_lb = ttk.Label(parent_frame, text=WINDOW_TITLE, font=TITLE_FONT)
+
+        input_lb = ttk.Label(parent_frame, text="Input Selection", font=H1_FONT)
+        input_frame = self.create_grd_input_frame(parent_frame)
+        self.file_info_path = None
+        self.file_info_lb = ttk.Label(parent_frame, text="", justify=tk.LEFT)
+
+        # batch input
+        batch_lb = ttk.Label(parent_frame, text="Batch Input", font=H1_FONT)
+        batch_frame = self.create_batch_input_frame(parent_frame)
+
+        # processing frame
+        processing_lb = ttk.Label(parent_frame, text="Processing", font=H1_FONT)
+        processing_frame = self.create_processing_frame(parent_frame)
+
+        # output box
+        output_lb = ttk.Label(parent_frame, text="Output:", font=H1_FONT)
+        self.output_buffer = console.LineBuffer()
+        self.output_console = ConsoleView(parent_frame, self.output_buffer, TEXTBOX_HEIGHT)
+
+        # output box
+        infobox_lb = ttk.Label(parent_frame, text="Documentation:", font=H1_FONT)
+        self.infobox = scrolledtext.ScrolledText(
+            parent_frame, wrap=tk.WORD, height=INFOBOX_HEIGHT, state=tk.DISABLED
+        )
+
+        ### grid layout
+        parent_frame.columnconfigure(
+            0, minsize=MIN_COL_0_W
+        )  # Set minimum size for column 0
+        title_lb.grid(row=0, column=0, pady=2)
+
+        ttk.Separator(parent_frame, orient="horizontal").grid(
+            row=1, column=0, sticky=tk.EW, pady=2
+        )
+        input_lb.grid(row=2, column=0, sticky=tk.EW, pady=2, padx=TITLE_PADX)
+        input_frame.grid(row=3, column=0, sticky=tk.EW, pady=2)
+        self.file_info_lb.grid(row=4, column=0, sticky=tk.W, pady=2, padx=TITLE_PADX)
+
+        batch_lb.grid(row=5, column=0, sticky=tk.EW, pady=2, padx=TITLE_PADX)
+        batch_frame.grid(row=6, column=0, sticky=tk.EW, pady=2)
+
+        ttk.Separator(parent_frame, orient="horizontal").grid(
+            row=7, column=0, sticky=tk.EW, pady=2
+        )
+        processing_lb.grid(row=8, column=0, sticky=tk.W, pady=2, padx=TITLE_PADX)
+        processing_frame.grid(row=9, column=0, sticky=tk.EW, pady=2, padx=TITLE_PADX)
+
+        ttk.Separator(parent_frame, orient="horizontal").grid(
+            row=10, column=0, sticky=tk.EW, pady=2
+        )
+        output_lb.grid(row=11, column=0, sticky=tk.EW, pady=2, padx=TITLE_PADX)
+        self.output_console.frame.grid(row=12, column=0, pady=2, sticky=tk.NSEW)
+
+        infobox_lb.grid(row=2, column=1, pady=2, padx=TITLE_PADX)
+        self.infobox.grid(row=3, column=1, rowspan=11, pady=2, padx=2, sticky=tk.NS)
+
+
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+
+def get_usr_input_lastools_path():
+    root = tk.Tk()
+    root.withdraw()
+    return filedialog.askdirectory(title="Enter LASTOOLS path e.g. ../lastools/bin/")
+
+
+def main():
+    """Main function to start the application."""
+    lastools_path = core.LASTOOLS_PATH + "\\bin"
+    while not os.path.exists(lastools_path):
+        print(f"Cannot find .\\lastools\\bin at {lastools_path}")
+        usr_input = get_usr_input_lastools_path()
+        if not usr_input:
+            print("No path provided")
+            sys.exit(1)
+        lastools_path = usr_input.strip()
+   
+    print(f"Found {lastools_path} ...")
+    # Create Tkinter root window and pass it to the app
+    root = tk.Tk()
+    app = CommandWrapperApp(root, lastools_path)
+
+    # Start the Tkinter loop
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+# LAS writer for point records read with lasreader
+
+import struct
+
+import numpy as np
+
+import lasreader
+
+
+class LasWriter():
+    """
+    Writes point records with the header and VLRs of <template>.
+    Point counts, returns and bounds are patched into the header on close.
+    """
+
+    def __init__(self, path: str, template: lasreader.LasFile):
+        self.path = path
+        self.template = template
+        self.header = template.header
+        with open(template.path, "rb") as file:
+            self.header_bytes = bytearray(file.read(self.header.offset_to_point_data))
+        self.file = open(path, "wb")
+        self.file.write(self.header_bytes)
+        self.count = 0
+        self.by_return = np.zeros(16, dtype=np.int64)
+        self.mins = [np.inf, np.inf, np.inf]
+        self.maxs = [-np.inf, -np.inf, -np.inf]
+
+    def write(self, records):
+        """:param records: structured array with the template point dtype"""
+        if len(records) == 0:
+            return
+        self.file.write(np.ascontiguousarray(records).tobytes())
+        self.count += len(records)
+        for axis, values in enumerate(self.template.scaled_xyz(records)):
+            self.mins[axis] = min(self.mins[axis], float(values.min()))
+            self.maxs[axis] = max(self.maxs[axis], float(values.max()))
+        mask = 0x0F if self.header.point_format >= 6 else 0x07
+        self.by_return += np.bincount(np.asarray(records["return_byte"]) & mask, minlength=16)[:16]
+
+    def close(self):
+        header = self.header_bytes
+        mins = [value if self.count else 0.0 for value in self.mins]
+        maxs = [value if self.count else 0.0 for value in self.maxs]
+        # LAS 1.4 wants the legacy fields zeroed for formats 6-10 or counts past 32 bits
+        legacy = self.header.point_format < 6 and self.count < 2 ** 32
+        struct.pack_into("<I", header, 107, self.count if legacy else 0)
+        struct.pack_into("<5I", header, 111, *[int(n) if legacy else 0 for n in self.by_return[1:6]])
+        struct.pack_into("<6d", header, 179, maxs[0], mins[0], maxs[1], mins[1], maxs[2], mins[2])
+        if self.header.version_minor >= 4 and self.header.header_size >= 375:
+            # extended VLRs of the template are not copied
+            struct.pack_into("<QIQ", header, 235, 0, 0, self.count)
+            struct.pack_into("<15Q", header, 255, *[int(n) for n in self.by_return[1:16]])
+        self.file.seek(0)
+        self.file.write(header[:self.header.header_size])
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
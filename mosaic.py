@@ -0,0 +1,140 @@
+# Streams per-tile BIL elevation rasters into one mosaic raster, a band of rows at a time, and optionally shades
+# the mosaic in the same pass, one band behind. Memory follows the mosaic's width, never its size: only the tiles
+# overlapping the current band are mapped, and the output is a memory mapped BIL.
+
+import os
+import glob
+
+import numpy as np
+
+import hillshade
+import raster
+
+# How cells covered by more than one tile are combined
+RULE_FIRST = "first"  # the first tile in order wins
+RULE_LAST = "last"  # the last tile in order wins
+RULE_MIN = "min"
+RULE_MAX = "max"
+RULE_MEAN = "mean"
+MOSAIC_RULES = (RULE_FIRST, RULE_LAST, RULE_MIN, RULE_MAX, RULE_MEAN)
+
+DEF_NODATA = -9999.0
+GRID_TOLERANCE = 1e-3  # in cells, how far a tile may be off the mosaic grid
+
+
+class TileGrid():
+    """Where one tile raster lies in the mosaic, read from its .hdr without mapping the data"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.nrows, self.ncols, self.xdim, self.ydim, self.ulxmap, self.ulymap = \
+            raster.header_grid(raster.read_hdr(raster.hdr_path(path)))
+        self.row0 = 0
+        self.col0 = 0
+
+    def place(self, ulx: float, uly: float, xdim: float, ydim: float):
+        """sets the first row and column of this tile in a mosaic whose upper left cell centre is <ulx>, <uly>"""
+        row0 = (uly - self.ulymap) / ydim
+        col0 = (self.ulxmap - ulx) / xdim
+        if abs(row0 - round(row0)) > GRID_TOLERANCE or abs(col0 - round(col0)) > GRID_TOLERANCE:
+            raise ValueError(f"{os.path.basename(self.path)} is not aligned to the grid of the other rasters")
+        self.row0, self.col0 = int(round(row0)), int(round(col0))
+
+
+def find_tiles(folder: str, pattern: str = "dem_elevation_*.bil"):
+    """:returns sorted elevation rasters of <folder>"""
+    return sorted(glob.glob(os.path.join(folder, pattern)))
+
+
+def combine(values, count, data, rule: str):
+    """merges the tile cells <data> into the mosaic cells <values> in place, NaN is nodata in both"""
+    valid = ~np.isnan(data)
+    if rule == RULE_MEAN:
+        values[valid & (count == 0)] = 0.0
+        values[valid] += data[valid]
+        count[valid] += 1
+        return
+    if rule == RULE_FIRST:
+        take = valid & np.isnan(values)
+    elif rule == RULE_MIN:
+        # comparisons with NaN are False, so empty cells always take the tile's value
+        take = valid & ~(values <= data)
+    elif rule == RULE_MAX:
+        take = valid & ~(values >= data)
+    else:
+        take = valid
+    values[take] = data[take]
+
+
+def mosaic(tile_paths, output_path: str, rule: str = RULE_LAST, shade_outputs=(), is_cancelled=None):
+    """
+    Places BIL rasters that share one cell size into a single float32 BIL, cells no tile covers are nodata.
+    :param tile_paths: rasters in order, the order decides overlaps for RULE_FIRST and RULE_LAST
+    :param shade_outputs: list of (output_path, hillshade.Light) to shade the mosaic into, .png or uint8 .bil
+    :param is_cancelled: optional callable() -> True to stop between bands
+    :returns nrows, ncols of the mosaic, None if it was cancelled
+    :raises ValueError if the rasters are not on one grid or <rule> is unknown
+    """
+    if rule not in MOSAIC_RULES:
+        raise ValueError(f"Unknown mosaic rule {rule}, use one of {', '.join(MOSAIC_RULES)}")
+    if not tile_paths:
+        raise ValueError("No rasters to mosaic")
+    tiles = [TileGrid(path) for path in tile_paths]
+    xdim, ydim = tiles[0].xdim, tiles[0].ydim
+    for tile in tiles:
+        if abs(tile.xdim - xdim) > GRID_TOLERANCE * xdim or abs(tile.ydim - ydim) > GRID_TOLERANCE * ydim:
+            raise ValueError(f"{os.path.basename(tile.path)} has cells of {tile.xdim:g} by {tile.ydim:g}, "
+                             f"not {xdim:g} by {ydim:g} like {os.path.basename(tiles[0].path)}")
+    ulx = min(tile.ulxmap for tile in tiles)
+    uly = max(tile.ulymap for tile in tiles)
+    lrx = max(tile.ulxmap + (tile.ncols - 1) * xdim for tile in tiles)
+    lry = min(tile.ulymap - (tile.nrows - 1) * ydim for tile in tiles)
+    ncols = int(round((lrx - ulx) / xdim)) + 1
+    nrows = int(round((uly - lry) / ydim)) + 1
+    for tile in tiles:
+        tile.place(ulx, uly, xdim, ydim)
+
+    nodata = raster.BilRaster(tiles[0].path).nodata
+    nodata = DEF_NODATA if nodata is None else nodata
+    georef = {"ulxmap": ulx, "ulymap": uly, "xdim": xdim, "ydim": ydim}
+    output = raster.create_bil(output_path, nrows, ncols, np.float32, georef, nodata)
+    # the shading reads the rows already written back through a second, read-only map of the output
+    source = raster.BilRaster(output_path) if shade_outputs else None
+    writers = [hillshade.HillshadeOutput(path, light, source) for path, light in shade_outputs]
+    open_tiles = {}  # index -> raster.BilRaster of the tiles overlapping the current band
+    band_rows = raster.block_rows(ncols)
+    shaded = 0
+    try:
+        for start in range(0, nrows, band_rows):
+            if is_cancelled is not None and is_cancelled():
+                return None
+            stop = min(start + band_rows, nrows)
+            values = np.full((stop - start, ncols), np.nan)
+            count = np.zeros(values.shape, dtype=np.uint16) if rule == RULE_MEAN else None
+            for index, tile in enumerate(tiles):
+                first, last = max(start, tile.row0), min(stop, tile.row0 + tile.nrows)
+                if first >= last:
+                    continue
+                if index not in open_tiles:
+                    open_tiles[index] = raster.BilRaster(tile.path)
+                data = open_tiles[index].read_rows(first - tile.row0, last - tile.row0)
+                columns = slice(tile.col0, tile.col0 + tile.ncols)
+                combine(values[first - start:last - start, columns],
+                        count[first - start:last - start, columns] if count is not None else None, data, rule)
+                if tile.row0 + tile.nrows <= stop:
+                    del open_tiles[index]
+            if count is not None:
+                values /= np.maximum(count, 1)
+            output[start:stop] = np.where(np.isnan(values), nodata, values)
+            # this band is the lower halo of the one above, which can be shaded now
+            if writers and start > 0:
+                hillshade.shade_block(source, writers, shaded, start)
+                shaded = start
+        if writers:
+            hillshade.shade_block(source, writers, shaded, nrows)
+        output.flush()
+    finally:
+        for writer in writers:
+            writer.close()
+        del output
+    return nrows, ncols
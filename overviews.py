@@ -0,0 +1,340 @@
+# Overview pyramids of DEM and hillshade outputs for the raster viewer.
+# Every level halves the one below it and is kept as a BIL next to the output, so it is built only once.
+
+import os
+import json
+import shutil
+import struct
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import raster
+
+TILE_SIZE = 256  # pixels per tile side, also the size at which the pyramid stops
+TILE_CACHE_TILES = 256  # tiles kept by a TileCache
+OVERVIEW_VERSION = 1  # bump when the level layout changes, older pyramids are then rebuilt
+STRETCH_PERCENTILES = (2, 98)  # elevation range shown from black to white
+MANIFEST = "manifest.json"
+
+PNG_COLOUR_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}  # colour type -> samples per pixel
+
+
+def overview_folder(path: str):
+    """:returns folder holding the pyramid of <path>, e.g. dem_hillshade_t0.ovr"""
+    return str(Path(path).with_suffix(".ovr"))
+
+
+def source_stamp(path: str):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": OVERVIEW_VERSION}
+
+
+### PNG
+
+def png_chunks(file):
+    """yields (chunk type, data) of an open PNG file"""
+    if file.read(len(raster.PNG_SIGNATURE)) != raster.PNG_SIGNATURE:
+        raise ValueError(f"{file.name} is not a PNG file")
+    while True:
+        head = file.read(8)
+        if len(head) < 8:
+            raise ValueError(f"{file.name} ends before its IEND chunk")
+        length, chunk_type = struct.unpack(">I4s", head)
+        data = file.read(length)
+        file.read(4)  # crc
+        yield chunk_type, data
+        if chunk_type == b"IEND":
+            return
+
+
+def unfilter(filter_type: int, line: bytearray, prior: bytearray, bpp: int):
+    """reverses the PNG filter of one scanline in place, <prior> is the previous unfiltered scanline"""
+    if filter_type == 0:
+        return
+    if filter_type == 1:
+        # each channel is a running sum of its deltas
+        deltas = np.frombuffer(line, np.uint8).reshape(-1, bpp)
+        line[:] = np.cumsum(deltas, axis=0, dtype=np.uint8).tobytes()
+    elif filter_type == 2:
+        line[:] = ((np.frombuffer(line, np.uint8) + np.frombuffer(prior, np.uint8)) & 0xFF).astype(np.uint8).tobytes()
+    elif filter_type == 3:
+        for index in range(len(line)):
+            left = line[index - bpp] if index >= bpp else 0
+            line[index] = (line[index] + ((left + prior[index]) >> 1)) & 0xFF
+    elif filter_type == 4:
+        for index in range(len(line)):
+            left = line[index - bpp] if index >= bpp else 0
+            up = prior[index]
+            up_left = prior[index - bpp] if index >= bpp else 0
+            estimate = left + up - up_left
+            distance_left, distance_up, distance_up_left = abs(estimate - left), abs(estimate - up), abs(estimate - up_left)
+            if distance_left <= distance_up and distance_left <= distance_up_left:
+                predictor = left
+            elif distance_up <= distance_up_left:
+                predictor = up
+            else:
+                predictor = up_left
+            line[index] = (line[index] + predictor) & 0xFF
+    else:
+        raise ValueError(f"unknown PNG filter type {filter_type}")
+
+
+def gray_rows(pixels, colour_type: int, palette):
+    """:returns uint8 gray rows from unfiltered 8 bit samples of shape (rows, ncols, channels)"""
+    if colour_type == 3:
+        pixels = palette[pixels[:, :, 0]]
+    if pixels.shape[2] >= 3:
+        return (pixels[:, :, :3] @ np.array([0.299, 0.587, 0.114])).round().astype(np.uint8)
+    return pixels[:, :, 0].copy()
+
+
+def read_png_rows(path: str):
+    """
+    decodes a non-interlaced PNG one block of rows at a time, colour is converted to gray
+    :returns nrows, ncols and a generator of (first row, uint8 rows of shape (n, ncols))
+    :raises ValueError for interlaced PNGs or bit depths below 8
+    """
+    file = open(path, "rb")
+    chunks = png_chunks(file)
+    chunk_type, data = next(chunks)
+    if chunk_type != b"IHDR":
+        file.close()
+        raise ValueError(f"{path} does not start with an IHDR chunk")
+    ncols, nrows, bit_depth, colour_type, _, _, interlace = struct.unpack(">IIBBBBB", data)
+    if interlace or bit_depth not in (8, 16) or colour_type not in PNG_COLOUR_CHANNELS:
+        file.close()
+        raise ValueError(f"{path}: only non-interlaced 8 or 16 bit PNGs can be viewed")
+    channels = PNG_COLOUR_CHANNELS[colour_type]
+    bpp = channels * bit_depth // 8
+    stride = ncols * bpp
+
+    def rows():
+        decompressor = zlib.decompressobj()
+        palette = None
+        pending = bytearray()
+        prior = bytearray(stride)
+        row = 0
+        batch_rows = raster.block_rows(ncols)
+        block = []
+        with file:
+            for chunk_type, data in chunks:
+                if chunk_type == b"PLTE":
+                    palette = np.frombuffer(data, np.uint8).reshape(-1, 3)
+                if chunk_type != b"IDAT":
+                    continue
+                pending += decompressor.decompress(data)
+                while len(pending) > stride and row < nrows:
+                    line = bytearray(pending[1:stride + 1])
+                    unfilter(pending[0], line, prior, bpp)
+                    del pending[:stride + 1]
+                    prior = line
+                    block.append(line)
+                    row += 1
+                    if len(block) == batch_rows:
+                        yield row - len(block), block_pixels(block, palette)
+                        block = []
+            if block:
+                yield row - len(block), block_pixels(block, palette)
+
+    def block_pixels(block, palette):
+        pixels = np.frombuffer(b"".join(block), np.uint8).reshape(len(block), ncols, channels, bit_depth // 8)
+        # 16 bit samples are big endian, the high byte is enough for display
+        return gray_rows(pixels[:, :, :, 0], colour_type, palette)
+
+    return nrows, ncols, rows()
+
+
+### Pyramid
+
+def downsample(block):
+    """:returns 2x2 means of <block>, NaN cells are left out and odd edges are averaged on their own"""
+    rows, cols = block.shape
+    padded = np.full((rows + rows % 2, cols + cols % 2), np.nan, dtype=np.float64)
+    padded[:rows, :cols] = block
+    cells = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+    valid = np.isfinite(cells)
+    count = valid.sum(axis=(1, 3))
+    total = np.where(valid, cells, 0.0).sum(axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def level_path(folder: str, level: int):
+    return os.path.join(folder, f"level_{level}.bil")
+
+
+def read_block(data, nodata, row0: int, row1: int, col0: int = 0, col1: int = None):
+    """:returns float64 copy of a window of a level with nodata as NaN"""
+    block = np.asarray(data[row0:row1, col0:col1], dtype=np.float64)
+    if nodata is not None:
+        block[block == nodata] = np.nan
+    return block
+
+
+def build_overviews(path: str, on_progress=None, is_cancelled=None):
+    """
+    builds the pyramid of a .bil or .png in overview_folder(<path>), level 1 is half the size of the source
+    a PNG is first decoded into level 0 since it cannot be read one window at a time
+    :param on_progress: optional callable(message)
+    :param is_cancelled: optional callable, checked between blocks
+    :returns overview folder, None if cancelled
+    :raises ValueError if <path> is neither a readable BIL nor a PNG
+    """
+    folder = overview_folder(path)
+    tmp_folder = folder + ".tmp"
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+    progress = on_progress or (lambda message: None)
+    cancelled = is_cancelled or (lambda: False)
+    manifest = source_stamp(path)
+    try:
+        if path.lower().endswith(".png"):
+            nrows, ncols, blocks = read_png_rows(path)
+            level = raster.create_bil(level_path(tmp_folder, 0), nrows, ncols, np.uint8, {
+                "ulxmap": 0.0, "ulymap": 0.0, "xdim": 1.0, "ydim": 1.0,
+            })
+            for row, rows in blocks:
+                level[row:row + len(rows)] = rows
+                progress(f"decoded {row + len(rows):,} of {nrows:,} rows")
+                if cancelled():
+                    return None
+            level.flush()
+            data, nodata, dtype, first = level, None, np.uint8, 1
+            manifest.update(kind="image", stretch=[0.0, 255.0])
+        else:
+            source = raster.BilRaster(path)
+            data, nodata, dtype, first = source.data, source.nodata, np.float32, 1
+            manifest.update(kind="elevation")
+
+        level_index = first
+        shape = data.shape
+        while max(shape) > TILE_SIZE:
+            shape = ((shape[0] + 1) // 2, (shape[1] + 1) // 2)
+            level = raster.create_bil(level_path(tmp_folder, level_index), shape[0], shape[1], dtype, {
+                "ulxmap": 0.0, "ulymap": 0.0, "xdim": float(2 ** level_index), "ydim": float(2 ** level_index),
+            })
+            step = raster.block_rows(data.shape[1]) // 2 * 2 or 2
+            for row in range(0, data.shape[0], step):
+                means = downsample(read_block(data, nodata, row, row + step))
+                if dtype == np.uint8:
+                    means = np.nan_to_num(means).round()
+                level[row // 2:row // 2 + len(means)] = means
+                if cancelled():
+                    return None
+            level.flush()
+            progress(f"overview level {level_index}: {shape[1]:,} x {shape[0]:,}")
+            data, nodata = level, None
+            level_index += 1
+
+        manifest["levels"] = level_index
+        if "stretch" not in manifest:
+            values = read_block(data, nodata, 0, data.shape[0])
+            values = values[np.isfinite(values)]
+            low, high = np.percentile(values, STRETCH_PERCENTILES) if values.size else (0.0, 1.0)
+            manifest["stretch"] = [float(low), float(max(high, low + 1e-6))]
+        with open(os.path.join(tmp_folder, MANIFEST), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=1)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp_folder, folder)
+        return folder
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+
+
+def has_overviews(path: str):
+    """:returns True if the pyramid of <path> exists and was built from the current file"""
+    try:
+        with open(os.path.join(overview_folder(path), MANIFEST), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return False
+    return all(manifest.get(key) == value for key, value in source_stamp(path).items())
+
+
+class Pyramid():
+    """
+    Overview levels of one raster, all memory mapped read-only.
+    Tiles are TILE_SIZE square windows of a level stretched to 8 bit gray, nodata is 0.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = overview_folder(path)
+        with open(os.path.join(folder, MANIFEST), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        self.low, self.high = manifest["stretch"]
+        self.kind = manifest["kind"]
+        self.levels = []  # (data, nodata) per level, level 0 is full resolution
+        if self.kind == "elevation":
+            source = raster.BilRaster(path)
+            self.levels.append((source.data, source.nodata))
+            self.cell = (source.xdim, source.ydim, source.ulxmap, source.ulymap)
+        for level in range(len(self.levels), manifest["levels"]):
+            self.levels.append((raster.BilRaster(level_path(folder, level)).data, None))
+        if self.kind != "elevation":
+            self.cell = None
+
+    @property
+    def nrows(self):
+        return self.levels[0][0].shape[0]
+
+    @property
+    def ncols(self):
+        return self.levels[0][0].shape[1]
+
+    def level_shape(self, level: int):
+        return self.levels[level][0].shape
+
+    def tile(self, level: int, row: int, col: int):
+        """:returns uint8 array of tile <row>, <col> of <level>, smaller than TILE_SIZE at the right and bottom edge"""
+        data, nodata = self.levels[level]
+        row0, col0 = row * TILE_SIZE, col * TILE_SIZE
+        if self.kind == "image":
+            return np.array(data[row0:row0 + TILE_SIZE, col0:col0 + TILE_SIZE], dtype=np.uint8)
+        values = read_block(data, nodata, row0, row0 + TILE_SIZE, col0, col0 + TILE_SIZE)
+        with np.errstate(invalid="ignore"):
+            gray = 1 + (values - self.low) * (254 / (self.high - self.low))
+        return np.where(np.isfinite(gray), np.clip(gray, 1, 255), 0).astype(np.uint8)
+
+    def value(self, row: int, col: int):
+        """:returns full resolution value at <row>, <col>, None outside the raster or on nodata"""
+        if not (0 <= row < self.nrows and 0 <= col < self.ncols):
+            return None
+        value = read_block(*self.levels[0], row, row + 1, col, col + 1)[0, 0]
+        return None if np.isnan(value) else float(value)
+
+
+def open_pyramid(path: str, on_progress=None, is_cancelled=None):
+    """:returns Pyramid of <path>, building or rebuilding its overviews first if needed, None if cancelled"""
+    if not has_overviews(path) and build_overviews(path, on_progress, is_cancelled) is None:
+        return None
+    return Pyramid(path)
+
+
+class TileCache():
+    """Least recently used tiles, at most <max_tiles> of them."""
+
+    def __init__(self, max_tiles: int = TILE_CACHE_TILES):
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        """:returns the tile cached under <key>, or load() which is then cached and may evict the oldest tile"""
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            self.hits += 1
+            return self.tiles[key]
+        self.misses += 1
+        tile = load()
+        self.tiles[key] = tile
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def clear(self):
+        self.tiles.clear()
@@ -0,0 +1,192 @@
+# Dependency-graph executor for LAStools stages
+
+import os
+import sys
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Stage states
+STAGE_PENDING = "pending"
+STAGE_RUNNING = "running"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+STAGE_SKIPPED = "skipped"
+
+ADMISSION_LOOKAHEAD = 16  # ready stages offered to admission control when the next one in order does not fit
+ADMISSION_POLL_SECONDS = 0.5  # a refused pipeline asks again after this, the resources may be freed by another one
+
+
+class Stage():
+    """
+    One unit of work, e.g. lasground on a single tile.
+    A stage depends on every other stage that produces one of its inputs.
+    """
+
+    def __init__(self, name: str, action, inputs=(), outputs=(), group=None, step=None):
+        """
+        :param name: label shown in the UI e.g. lasground
+        :param action: callable() -> bool, True on success
+        :param inputs: file paths that must exist before the stage starts
+        :param outputs: file paths the stage produces
+        :param group: optional key shared by the stages of one input file
+        :param step: optional grid step of the stage, sizes its grid for admission control
+        """
+        self.name = name
+        self.action = action
+        self.inputs = [os.path.normpath(path) for path in inputs]
+        self.outputs = [os.path.normpath(path) for path in outputs]
+        self.group = group
+        self.step = step
+        self.status = STAGE_PENDING
+        self.upstream = []
+        self.downstream = []
+        self.depth = 0
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.status})"
+
+
+class Pipeline():
+    """
+    Runs stages as soon as their own inputs are available, with at most <max_workers> at once.
+    Ready stages further down the chain go first, so tile N moves on to its DEM while
+    tile N+1 is still being ground classified.
+    """
+
+    def __init__(self, stages=(), max_workers=None, on_status=None, admission=None, output=sys.stdout.write):
+        """
+        :param max_workers: concurrent stages, defaults to one per core
+        :param on_status: optional callable(Stage), called on every state change
+        :param admission: optional admission.AdmissionController that must admit every stage before it starts
+        :param output: callable(str) for stages that cannot start or raise, e.g. the StageRunner's output
+        """
+        self.stages = []
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        self.on_status = on_status
+        self.admission = admission
+        self.output = output
+        for stage in stages:
+            self.add_stage(stage)
+
+    def add_stage(self, stage: Stage):
+        self.stages.append(stage)
+        return stage
+
+    def link(self):
+        """connects stages through matching output -> input paths and computes their depth"""
+        producers = {}
+        for stage in self.stages:
+            stage.upstream, stage.downstream = [], []
+            for path in stage.outputs:
+                if path in producers:
+                    raise ValueError(f"{path} is produced by both {producers[path].name} and {stage.name}")
+                producers[path] = stage
+
+        for stage in self.stages:
+            for path in stage.inputs:
+                producer = producers.get(path)
+                if producer is not None and producer is not stage and producer not in stage.upstream:
+                    stage.upstream.append(producer)
+                    producer.downstream.append(stage)
+
+        # Kahn's algorithm, also rejects cycles
+        indegree = {stage: len(stage.upstream) for stage in self.stages}
+        ordered = [stage for stage in self.stages if indegree[stage] == 0]
+        for stage in ordered:
+            for child in stage.downstream:
+                child.depth = max(child.depth, stage.depth + 1)
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ordered.append(child)
+        if len(ordered) != len(self.stages):
+            raise ValueError("Pipeline stages form a cycle")
+
+    def set_status(self, stage: Stage, status: str):
+        stage.status = status
+        if self.on_status:
+            self.on_status(stage)
+
+    def execute(self, stage: Stage):
+        missing = [path for path in stage.inputs if not os.path.exists(path)]
+        if missing:
+            self.output(f"Error. {stage.name} missing input: {', '.join(missing)}\n")
+            return False
+        try:
+            return bool(stage.action())
+        except Exception as e:
+            self.output(f"Error. {stage.name} failed: {e}\n")
+            return False
+
+    def next_stage(self, ready):
+        """pops the ready stage to start next off the <ready> heap, None if admission control holds them all back"""
+        if self.admission is None:
+            return heapq.heappop(ready)[2]
+        candidates = heapq.nsmallest(ADMISSION_LOOKAHEAD, ready)
+        stage = self.admission.admit([entry[2] for entry in candidates])
+        if stage is None:
+            return None
+        ready.remove(next(entry for entry in candidates if entry[2] is stage))
+        heapq.heapify(ready)
+        return stage
+
+    def run(self):
+        """
+        blocks until every stage has finished or been skipped
+        :returns True if every stage succeeded
+        """
+        self.link()
+        condition = threading.Condition()
+        ready = []
+        order = {stage: index for index, stage in enumerate(self.stages)}
+        state = {"running": 0, "unfinished": len(self.stages)}
+
+        def push(stage):
+            heapq.heappush(ready, (-stage.depth, order[stage], stage))
+
+        def skip(stage):
+            # a failed stage takes everything downstream of it with it
+            for child in stage.downstream:
+                if child.status == STAGE_PENDING:
+                    self.set_status(child, STAGE_SKIPPED)
+                    state["unfinished"] -= 1
+                    skip(child)
+
+        def run_stage(stage):
+            try:
+                success = self.execute(stage)
+            finally:
+                if self.admission is not None:
+                    self.admission.release(stage)
+            with condition:
+                self.set_status(stage, STAGE_DONE if success else STAGE_FAILED)
+                state["running"] -= 1
+                state["unfinished"] -= 1
+                if success:
+                    for child in stage.downstream:
+                        if child.status == STAGE_PENDING and all(up.status == STAGE_DONE for up in child.upstream):
+                            push(child)
+                else:
+                    skip(stage)
+                condition.notify()
+
+        for stage in self.stages:
+            stage.status = STAGE_PENDING
+            if not stage.upstream:
+                push(stage)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            with condition:
+                while state["unfinished"] > 0:
+                    refused = False
+                    while ready and state["running"] < self.max_workers:
+                        stage = self.next_stage(ready)
+                        if stage is None:
+                            refused = True
+                            break
+                        state["running"] += 1
+                        self.set_status(stage, STAGE_RUNNING)
+                        executor.submit(run_stage, stage)
+                    condition.wait(ADMISSION_POLL_SECONDS if refused else None)
+
+        return all(stage.status == STAGE_DONE for stage in self.stages)
@@ -0,0 +1,197 @@
+# Grid index over the point records of a LAS file for the top-down point viewer.
+# Points are counting-sorted by grid cell, a view then reads an evenly thinned share of every cell it covers,
+# so a frame never touches more than a fixed number of records however large the file is.
+
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+import cache
+import lasreader
+
+POINTS_PER_CELL = 256  # average points per grid cell
+MAX_INDEX_CELLS = 4_000_000  # bounds the offsets array to 32 MB
+MAX_FRAME_POINTS = 200_000  # records read and drawn per frame
+DEF_INDEX_DIR = os.path.join(Path.home(), ".lastools_gui", "pointindex")
+INDEX_KEEP_FILES = 10  # newest indexes kept in the index folder
+
+GROUND_CLASS = 2
+BACKGROUND = (0, 0, 0)
+DEF_CLASS_COLOUR = (200, 200, 200)
+# ASPRS class -> RGB, classes not listed are drawn in DEF_CLASS_COLOUR
+CLASS_COLOURS = {
+    0: (150, 150, 150),
+    1: (200, 200, 200),
+    2: (200, 130, 50),
+    3: (120, 200, 90),
+    4: (60, 170, 60),
+    5: (20, 110, 20),
+    6: (220, 50, 50),
+    7: (255, 0, 255),
+    9: (60, 110, 230),
+    17: (240, 220, 60),
+    18: (255, 0, 255),
+}
+
+
+def index_path(input_path: str, index_dir: str = DEF_INDEX_DIR):
+    """:returns path of the index of <input_path>, the name changes whenever the input does"""
+    return cache.derived_path(input_path, index_dir, ".npy")
+
+
+def grid_for(header: lasreader.LasHeader):
+    """:returns origin x, origin y, cell size, ncols, nrows of a grid with about POINTS_PER_CELL points per cell"""
+    width = max(header.maxs[0] - header.mins[0], 1e-6)
+    height = max(header.maxs[1] - header.mins[1], 1e-6)
+    cells = min(max(header.point_count // POINTS_PER_CELL, 1), MAX_INDEX_CELLS)
+    cell = max(np.sqrt(width * height / cells), 1e-6)
+    ncols = int(width / cell) + 1
+    nrows = int(height / cell) + 1
+    return header.mins[0], header.mins[1], cell, ncols, nrows
+
+
+class PointIndex():
+    """
+    Point numbers of a LAS file sorted by grid cell, in file order within a cell.
+    The points of cell c are points()[index[offsets[c]:offsets[c + 1]]].
+    """
+
+    def __init__(self, las_file: lasreader.LasFile, path: str):
+        self.las_file = las_file
+        self.path = path
+        with open(str(Path(path).with_suffix(".json")), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        self.origin_x, self.origin_y, self.cell = meta["origin_x"], meta["origin_y"], meta["cell"]
+        self.ncols, self.nrows = meta["ncols"], meta["nrows"]
+        self.histogram = {int(cls): count for cls, count in meta["histogram"].items()}
+        self.offsets = np.load(str(Path(path).with_suffix(".offsets.npy")))
+        self.index = np.load(path, mmap_mode="r")
+
+    @property
+    def extent(self):
+        """:returns min x, min y, max x, max y of the grid"""
+        return (self.origin_x, self.origin_y,
+                self.origin_x + self.ncols * self.cell, self.origin_y + self.nrows * self.cell)
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float, budget: int = MAX_FRAME_POINTS):
+        """
+        reads at most <budget> points of the cells overlapping the window, the same share of every cell
+        :returns x, y, classification arrays and the number of points in the overlapped cells
+        """
+        col0 = max(int((min_x - self.origin_x) // self.cell), 0)
+        col1 = min(int((max_x - self.origin_x) // self.cell), self.ncols - 1)
+        row0 = max(int((min_y - self.origin_y) // self.cell), 0)
+        row1 = min(int((max_y - self.origin_y) // self.cell), self.nrows - 1)
+        empty = np.empty(0)
+        if col0 > col1 or row0 > row1:
+            return empty, empty, np.empty(0, dtype=np.uint8), 0
+
+        cells = (np.arange(row0, row1 + 1)[:, None] * self.ncols + np.arange(col0, col1 + 1)).ravel()
+        starts = self.offsets[cells]
+        counts = self.offsets[cells + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty, np.empty(0, dtype=np.uint8), 0
+
+        # every cell keeps ceil(count * share) points spread evenly over its run of the index
+        share = min(budget / total, 1.0)
+        taken = np.ceil(counts * share).astype(np.int64)
+        taken_cells = taken > 0
+        starts, counts, taken = starts[taken_cells], counts[taken_cells], taken[taken_cells]
+        first = np.cumsum(taken) - taken
+        rank = np.arange(int(taken.sum())) - np.repeat(first, taken)
+        positions = np.repeat(starts, taken) + rank * np.repeat(counts, taken) // np.repeat(taken, taken)
+        if len(positions) > budget:
+            # rounding up gave sparse cells a point each, thin the whole selection back to the budget
+            positions = positions[np.linspace(0, len(positions) - 1, budget).astype(np.int64)]
+
+        # sorted so the point memmap is read front to back
+        records = self.las_file.points()[np.sort(self.index[positions])]
+        x, y, _ = self.las_file.scaled_xyz(records)
+        return x, y, self.las_file.classification(records), total
+
+
+def build_index(input_path: str, path: str, is_cancelled=None, chunk_size: int = lasreader.CHUNK_POINTS):
+    """
+    counting sort of the point numbers of <input_path> by grid cell into <path>, with its offsets and grid
+    :returns False if cancelled
+    :raises ValueError for LAZ input
+    """
+    las_file = lasreader.LasFile(input_path)
+    grid = grid_for(las_file.header)
+    origin_x, origin_y, cell, ncols, nrows = grid
+    classes = np.zeros(256, dtype=np.int64)
+
+    def count_classes(records):
+        classes[:] += np.bincount(las_file.classification(records), minlength=256)
+
+    tmp_path = path + ".tmp.npy"
+    try:
+        offsets = las_file.sort_by_cell(grid, tmp_path, count_classes, is_cancelled, chunk_size)
+        if offsets is None:
+            return False
+        np.save(str(Path(path).with_suffix(".offsets.npy")), offsets)
+        with open(str(Path(path).with_suffix(".json")), "w", encoding="utf-8") as file:
+            json.dump({
+                "origin_x": origin_x, "origin_y": origin_y, "cell": cell, "ncols": ncols, "nrows": nrows,
+                "histogram": {int(cls): int(classes[cls]) for cls in np.nonzero(classes)[0]},
+            }, file, indent=1)
+        # the index is written last, its presence marks a complete set
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def open_index(input_path: str, index_dir: str = DEF_INDEX_DIR, is_cancelled=None):
+    """
+    :returns PointIndex of <input_path>, built first unless an index of the current file exists, None if cancelled
+    :raises ValueError for LAZ input
+    """
+    las_file = lasreader.LasFile(input_path)
+    if las_file.is_compressed:
+        raise ValueError(f"{os.path.basename(input_path)} is LAZ compressed, decompress it with laszip to show it")
+    path = index_path(input_path, index_dir)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        os.makedirs(index_dir, exist_ok=True)
+        prune_indexes(index_dir, INDEX_KEEP_FILES - 1)
+        if not build_index(input_path, path, is_cancelled):
+            return None
+    return PointIndex(las_file, path)
+
+
+def prune_indexes(index_dir: str = DEF_INDEX_DIR, keep: int = INDEX_KEEP_FILES):
+    """removes all but the <keep> most recently used indexes"""
+    indexes = [path for path in Path(index_dir).glob("*.npy") if not path.name.endswith(".offsets.npy")]
+    cache.prune_files(indexes, keep, lambda path: [path, path.with_suffix(".offsets.npy"), path.with_suffix(".json")])
+
+
+def class_colour(cls: int):
+    return CLASS_COLOURS.get(cls, DEF_CLASS_COLOUR)
+
+
+def render_points(x, y, classification, min_x: float, max_y: float, scale: float, width: int, height: int,
+                  point_size: int = 1):
+    """
+    draws points top-down into an RGB frame, north up, ground is drawn last so it is never hidden
+    :param min_x, max_y: map position of the top left pixel
+    :param scale: pixels per map unit
+    :returns uint8 array of shape (height, width, 3)
+    """
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = BACKGROUND
+    colours = np.array([class_colour(cls) for cls in range(256)], dtype=np.uint8)
+    order = np.argsort(classification == GROUND_CLASS, kind="stable")
+    col = ((x[order] - min_x) * scale).astype(np.int64)
+    row = ((max_y - y[order]) * scale).astype(np.int64)
+    rgb = colours[classification[order]]
+    for dy in range(point_size):
+        for dx in range(point_size):
+            inside = (row + dy >= 0) & (row + dy < height) & (col + dx >= 0) & (col + dx < width)
+            frame[row[inside] + dy, col[inside] + dx] = rgb[inside]
+    return frame
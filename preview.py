@@ -0,0 +1,120 @@
+# Thinned subsamples of an input for a quick look at the ground/DEM settings before the full run
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+import cache
+import lasreader
+import laswriter
+
+THIN_GRID = "grid"  # first point in every grid cell, keeps the coverage even
+THIN_EVERY_NTH = "nth"  # every Nth record, keeps the density pattern of the flight lines
+THIN_METHODS = (THIN_GRID, THIN_EVERY_NTH)
+
+PREVIEW_TARGET_POINTS = 500_000  # subsample size when no thinning amount is given
+MAX_GRID_CELLS = 100_000_000  # one byte per cell is held while thinning
+DEF_PREVIEW_DIR = os.path.join(Path.home(), ".lastools_gui", "preview")
+PREVIEW_KEEP_FILES = 20  # newest subsamples kept in the preview folder
+
+
+def auto_amount(las_file: lasreader.LasFile, method: str, target: int = PREVIEW_TARGET_POINTS):
+    """:returns N for every Nth point, or the grid cell size, that leaves about <target> points"""
+    header = las_file.header
+    if method == THIN_EVERY_NTH:
+        return max(1, -(-header.point_count // target))
+    area = max(header.maxs[0] - header.mins[0], 1e-9) * max(header.maxs[1] - header.mins[1], 1e-9)
+    return float(f"{np.sqrt(area / target):.3g}")
+
+
+def thin_every_nth(las_file: lasreader.LasFile, output_path: str, nth: int, chunk_size: int = lasreader.CHUNK_POINTS):
+    """writes every <nth> point record of <las_file> to <output_path>, :returns points written"""
+    nth = max(1, int(nth))
+    with laswriter.LasWriter(output_path, las_file) as writer:
+        for start, records in las_file.iter_chunks(chunk_size):
+            # keep the stride across chunk boundaries
+            writer.write(records[(-start) % nth::nth])
+    return writer.count
+
+
+def thin_grid(las_file: lasreader.LasFile, output_path: str, cell: float, chunk_size: int = lasreader.CHUNK_POINTS):
+    """
+    writes the first point record falling in every <cell> sized grid cell to <output_path>
+    :returns points written
+    :raises ValueError if the grid would be larger than MAX_GRID_CELLS
+    """
+    header = las_file.header
+    ncols = int((header.maxs[0] - header.mins[0]) / cell) + 1
+    nrows = int((header.maxs[1] - header.mins[1]) / cell) + 1
+    if ncols * nrows > MAX_GRID_CELLS:
+        raise ValueError(f"a {cell:g} grid has {ncols * nrows:,} cells, use a larger cell size")
+
+    taken = np.zeros(ncols * nrows, dtype=bool)
+    with laswriter.LasWriter(output_path, las_file) as writer:
+        for _, records in las_file.iter_chunks(chunk_size):
+            x, y, _ = las_file.scaled_xyz(records)
+            col = np.clip(((x - header.mins[0]) / cell).astype(np.int64), 0, ncols - 1)
+            row = np.clip(((y - header.mins[1]) / cell).astype(np.int64), 0, nrows - 1)
+            cells = row * ncols + col
+            cells, first = np.unique(cells, return_index=True)
+            new = ~taken[cells]
+            taken[cells[new]] = True
+            writer.write(records[np.sort(first[new])])
+    return writer.count
+
+
+def subsample_path(input_path: str, method: str, amount: float, preview_dir: str = DEF_PREVIEW_DIR):
+    """
+    :returns path of the subsample of <input_path>, the name changes whenever the input or the thinning does
+    so ground/DEM parameter changes keep reusing the same file
+    """
+    return cache.derived_path(input_path, preview_dir, ".las", method=method, amount=amount)
+
+
+def subsample(input_path: str, method: str = THIN_GRID, amount: float = None, preview_dir: str = DEF_PREVIEW_DIR):
+    """
+    thins <input_path> into the preview folder, or reuses the subsample already made with the same settings
+    :param amount: N for THIN_EVERY_NTH or the cell size for THIN_GRID, None aims for PREVIEW_TARGET_POINTS
+    :returns subsample path and True if it was reused
+    :raises ValueError if the input cannot be thinned, e.g. LAZ
+    """
+    if method not in THIN_METHODS:
+        raise ValueError(f"unknown thinning {method}, expected one of {', '.join(THIN_METHODS)}")
+    las_file = lasreader.LasFile(input_path)
+    if las_file.is_compressed:
+        raise ValueError(f"{os.path.basename(input_path)} is LAZ compressed, decompress it with laszip to preview it")
+    amount = amount or auto_amount(las_file, method)
+    path = subsample_path(input_path, method, amount, preview_dir)
+    if os.path.exists(path):
+        os.utime(path)
+        return path, True
+
+    os.makedirs(preview_dir, exist_ok=True)
+    prune_subsamples(preview_dir, PREVIEW_KEEP_FILES - 1)
+    # written under a temporary name so a cancelled run never leaves a partial subsample to be reused
+    tmp_path = path + ".tmp"
+    try:
+        if method == THIN_EVERY_NTH:
+            thin_every_nth(las_file, tmp_path, amount)
+        else:
+            thin_grid(las_file, tmp_path, amount)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path, False
+
+
+def preview_outputs(subsample: str):
+    """:returns folder the preview chain writes to, one per subsample"""
+    return str(Path(subsample).with_suffix("")) + "_out"
+
+
+def prune_subsamples(preview_dir: str = DEF_PREVIEW_DIR, keep: int = PREVIEW_KEEP_FILES):
+    """removes all but the <keep> most recently used subsamples and their outputs"""
+    def parts(sample):
+        out_folder = Path(preview_outputs(str(sample)))
+        return [sample] + (list(out_folder.glob("*")) + [out_folder] if out_folder.is_dir() else [])
+
+    cache.prune_files(Path(preview_dir).glob("*.las"), keep, parts)
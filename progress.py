@@ -0,0 +1,237 @@
+# Structured events parsed from LAStools -v output, and the progress and ETA of the jobs running them.
+# The parser runs on the thread reading the child's output, so it does a regex match per line and nothing else;
+# whatever reacts to its events must not block either.
+
+import os
+import re
+import time
+import threading
+from dataclasses import dataclass
+
+# Event kinds
+EVENT_PHASE = "phase"
+EVENT_POINTS = "points"
+EVENT_WARNING = "warning"
+EVENT_UNLICENSED = "unlicensed"  # LAStools ran without a license and degraded its output, e.g. added noise
+EVENT_ERROR = "error"
+EVENT_DONE = "done"
+
+POINTS_EVENT_SECONDS = 0.1  # points events of one run are passed on at most this often
+MAX_PARTIAL_CHARS = 1_000  # an unterminated line is cut to this before it is parsed
+RASTER_STAGE_WEIGHT = 0.1  # a raster stage counts as this fraction of the points of its file
+ETA_MIN_FRACTION = 0.01  # no ETA before this much of a job is done
+
+# (kind, pattern) tried in order on every line, the first match wins
+LINE_PATTERNS = [
+    (EVENT_UNLICENSED, re.compile(r"unlicensed", re.IGNORECASE)),
+    (EVENT_WARNING, re.compile(r"^WARNING\b:?\s*(?P<message>.*)", re.IGNORECASE)),
+    (EVENT_ERROR, re.compile(r"^ERROR\b:?\s*(?P<message>.*)", re.IGNORECASE)),
+    (EVENT_DONE, re.compile(r"^done with '(?P<output>[^']*)'.*?(?P<seconds>[\d.]+) sec")),
+    (EVENT_POINTS, re.compile(
+        r"\b(?:processed|read|classified|wrote|written)\s+(?P<points>\d+)\s+(?:of\s+(?P<total>\d+)\s+)?points\b"
+    )),
+    (EVENT_PHASE, re.compile(r"^(?P<phase>reading)\s+(?P<total>\d+)\s+points\b")),
+    (EVENT_PHASE, re.compile(
+        r"^(?P<phase>reading|hillshading|rasterizing|triangulating|classifying|ground classification|writing|"
+        r"sorting|processing|merging|tiling)\b",
+        re.IGNORECASE,
+    )),
+]
+
+
+@dataclass
+class ProgressEvent:
+    kind: str
+    tool: str
+    input_path: str
+    phase: str = ""
+    points: int = None
+    total: int = None
+    message: str = ""
+
+    def describe(self):
+        """:returns one line for the job log"""
+        if self.kind == EVENT_PHASE:
+            detail = self.phase + (f" ({self.total:,} points)" if self.total else "")
+        elif self.kind == EVENT_POINTS:
+            detail = f"{self.points:,} of {self.total:,} points" if self.total else f"{self.points:,} points"
+        else:
+            detail = self.message
+        return f"{time.strftime('%H:%M:%S')} {self.kind} {self.tool} {os.path.basename(self.input_path)}: {detail}"
+
+
+class VerboseParser():
+    """Turns the -v output of one tool run into ProgressEvents, fed in chunks by the thread reading it"""
+
+    def __init__(self, tool: str, input_path: str, total_points: int, on_event):
+        """
+        :param total_points: points of the input, for progress lines that do not say
+        :param on_event: callable(ProgressEvent), called on the reading thread and must not block
+        """
+        self.tool = tool
+        self.input_path = input_path
+        self.total_points = total_points or None
+        self.on_event = on_event
+        self.partial = ""
+        self.last_points = 0.0
+
+    def wrap(self, output):
+        """:returns callable(str) that parses the text and passes it on to <output>"""
+        def parse_and_output(text):
+            self.feed(text)
+            output(text)
+
+        return parse_and_output
+
+    def feed(self, text: str):
+        # progress is often redrawn in place with \r
+        lines = (self.partial + text).replace("\r", "\n").split("\n")
+        self.partial = lines.pop()[:MAX_PARTIAL_CHARS]
+        for line in lines:
+            self.parse_line(line.strip())
+
+    def close(self):
+        """parses what is left after the last newline"""
+        if self.partial:
+            self.parse_line(self.partial.strip())
+            self.partial = ""
+
+    def parse_line(self, line: str):
+        if not line:
+            return
+        for kind, pattern in LINE_PATTERNS:
+            match = pattern.search(line)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            event = ProgressEvent(kind, self.tool, self.input_path, message=groups.get("message") or line)
+            if kind == EVENT_POINTS:
+                now = time.monotonic()
+                event.points = int(groups["points"])
+                event.total = int(groups["total"]) if groups.get("total") else self.total_points
+                if now - self.last_points < POINTS_EVENT_SECONDS and event.points != event.total:
+                    return
+                self.last_points = now
+            elif kind == EVENT_PHASE:
+                event.phase = groups["phase"].lower()
+                if groups.get("total"):
+                    # what the tool reads is the total of its progress lines
+                    event.total = self.total_points = int(groups["total"])
+            self.on_event(event)
+            return
+
+
+def format_seconds(seconds: float):
+    """:returns e.g. 0:42, 12:05 or 1:02:05"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+
+def format_bar(fraction: float, width: int = 10):
+    filled = int(round(fraction * width))
+    return "█" * filled + "░" * (width - filled)
+
+
+class JobProgress():
+    """
+    Progress of one job over all its stages, each weighted by the points it works on, safe to update from any thread.
+    Stages are keyed by name and input path, like the runs they parse.
+    """
+
+    def __init__(self, log=None, on_change=None):
+        """
+        :param log: optional callable(str) receiving a line for every event but points, e.g. the job log's write
+        :param on_change: optional callable(), called from any thread when the progress moved, must not block
+        """
+        self.log = log
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.stages = {}  # (name, input path) -> [weight, fraction done]
+        self.current = {}  # (name, input path) -> phase, of the stages running
+        self.unlicensed = set()  # inputs LAStools processed without a license
+        self.warnings = 0
+        self.started = None
+
+    def add_stage(self, name: str, input_path: str, points: int):
+        with self.lock:
+            self.stages.setdefault((name, os.path.normpath(input_path)), [max(points, 1), 0.0])
+
+    def start_stage(self, name: str, input_path: str, points: int = 0):
+        key = (name, os.path.normpath(input_path))
+        with self.lock:
+            self.started = self.started or time.monotonic()
+            self.stages.setdefault(key, [max(points or 0, 1), 0.0])
+            self.current[key] = ""
+        self.changed()
+
+    def finish_stage(self, name: str, input_path: str):
+        key = (name, os.path.normpath(input_path))
+        with self.lock:
+            if key in self.stages:
+                self.stages[key][1] = 1.0
+            self.current.pop(key, None)
+        self.changed()
+
+    def parser(self, tool: str, input_path: str, total_points: int):
+        """:returns VerboseParser for a run of <tool> on <input_path> that updates this progress"""
+        self.start_stage(tool, input_path, total_points)
+        return VerboseParser(tool, input_path, total_points, self.event)
+
+    def event(self, event: ProgressEvent):
+        key = (event.tool, os.path.normpath(event.input_path))
+        with self.lock:
+            stage = self.stages.get(key)
+            if event.kind == EVENT_POINTS and event.total and stage is not None:
+                stage[1] = max(stage[1], min(event.points / event.total, 1.0))
+            elif event.kind == EVENT_PHASE and key in self.current:
+                self.current[key] = event.phase
+            elif event.kind == EVENT_UNLICENSED:
+                self.unlicensed.add(event.input_path)
+            elif event.kind == EVENT_WARNING:
+                self.warnings += 1
+        if event.kind != EVENT_POINTS and self.log is not None:
+            self.log(event.describe() + "\n")
+        self.changed()
+
+    def changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def fraction(self):
+        with self.lock:
+            total = sum(weight for weight, _ in self.stages.values())
+            done = sum(weight * fraction for weight, fraction in self.stages.values())
+        return done / total if total else 0.0
+
+    def eta(self):
+        """:returns seconds left at the rate so far, None until there is a rate"""
+        fraction = self.fraction()
+        if self.started is None or fraction < ETA_MIN_FRACTION:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed * (1.0 - fraction) / fraction
+
+    def phase(self):
+        """:returns e.g. lasground t3.las: reading, for one of the running stages"""
+        with self.lock:
+            running = list(self.current.items())
+        if not running:
+            return ""
+        (name, input_path), phase = running[-1]
+        return f"{name} {os.path.basename(input_path)}" + (f": {phase}" if phase else "")
+
+    def describe(self):
+        """:returns e.g. 62% ETA 1:05"""
+        eta = self.eta()
+        return f"{100.0 * self.fraction():.0f}%" + (f" ETA {format_seconds(eta)}" if eta is not None else "")
+
+    def summary(self):
+        """:returns lines about warnings of the job, empty if there were none"""
+        lines = []
+        if self.unlicensed:
+            names = ", ".join(sorted(os.path.basename(path) for path in self.unlicensed))
+            lines.append(f"LAStools ran unlicensed on {len(self.unlicensed)} inputs, their outputs are degraded: {names}")
+        if self.warnings:
+            lines.append(f"{self.warnings} LAStools warnings, see the job log")
+        return "\n".join(lines)
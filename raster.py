@@ -0,0 +1,166 @@
+# ESRI BIL/HDR rasters and PNG output
+
+import zlib
+import struct
+from pathlib import Path
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COMPRESS_LEVEL = 6
+
+# cells per block, bounds memory to a few hundred MB however large the raster is
+BLOCK_CELLS = 4 * 1024 * 1024
+
+# (pixeltype, nbits) -> numpy type
+BIL_PIXEL_TYPES = {
+    ("float", 32): "f4",
+    ("float", 64): "f8",
+    ("signedint", 8): "i1",
+    ("signedint", 16): "i2",
+    ("signedint", 32): "i4",
+    ("unsignedint", 8): "u1",
+    ("unsignedint", 16): "u2",
+    ("unsignedint", 32): "u4",
+}
+
+
+def block_rows(ncols: int):
+    """:returns rows per block for a raster <ncols> wide"""
+    return max(1, BLOCK_CELLS // max(ncols, 1))
+
+
+def hdr_path(bil_path: str):
+    return str(Path(bil_path).with_suffix(".hdr"))
+
+
+def header_grid(header: dict):
+    """:returns nrows, ncols, xdim, ydim, ulxmap, ulymap of a parsed .hdr, with the defaults of missing fields"""
+    nrows = int(header["nrows"])
+    ncols = int(header["ncols"])
+    xdim = float(header.get("xdim", 1.0))
+    ydim = float(header.get("ydim", xdim))
+    return nrows, ncols, xdim, ydim, float(header.get("ulxmap", 0.0)), float(header.get("ulymap", (nrows - 1) * ydim))
+
+
+class BilRaster():
+    """
+    Single band of a BIL raster, memory mapped read-only.
+    ulxmap/ulymap are the map coordinates of the centre of the upper left cell.
+    """
+
+    def __init__(self, path: str, band: int = 0):
+        self.path = path
+        header = read_hdr(hdr_path(path))
+        self.nrows, self.ncols, self.xdim, self.ydim, self.ulxmap, self.ulymap = header_grid(header)
+        self.nbands = int(header.get("nbands", 1))
+        nbits = int(header.get("nbits", 8))
+        pixeltype = header.get("pixeltype", "float" if nbits >= 32 else "unsignedint").lower()
+        byteorder = ">" if header.get("byteorder", "I").upper() in ("M", "MOTOROLA") else "<"
+        try:
+            self.dtype = np.dtype(byteorder + BIL_PIXEL_TYPES[(pixeltype, nbits)])
+        except KeyError:
+            raise ValueError(f"Unsupported BIL pixel type {pixeltype} {nbits} bit in {path}")
+
+        layout = header.get("layout", "bil").lower()
+        self.nodata = float(header["nodata"]) if "nodata" in header else None
+
+        if layout == "bil":
+            shape = (self.nrows, self.nbands, self.ncols)
+        elif layout == "bsq":
+            shape = (self.nbands, self.nrows, self.ncols)
+        else:
+            raise ValueError(f"Unsupported BIL layout {layout} in {path}")
+        data = np.memmap(path, dtype=self.dtype, mode="r", shape=shape)
+        self.data = data[:, band, :] if layout == "bil" else data[band]
+
+    def georef(self):
+        """:returns header fields needed to write a raster on the same grid"""
+        return {
+            "ulxmap": self.ulxmap,
+            "ulymap": self.ulymap,
+            "xdim": self.xdim,
+            "ydim": self.ydim,
+        }
+
+    def read_rows(self, start: int, stop: int):
+        """:returns float64 copy of rows [start, stop) with nodata as NaN"""
+        block = np.asarray(self.data[max(start, 0):min(stop, self.nrows)], dtype=np.float64)
+        if self.nodata is not None:
+            block[block == self.nodata] = np.nan
+        return block
+
+
+def read_hdr(path: str):
+    """:returns dict of lower-case header keys to string values"""
+    header = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) >= 2:
+                header[parts[0].lower()] = parts[1]
+    return header
+
+
+def write_hdr(path: str, nrows: int, ncols: int, dtype, georef: dict, nodata=None):
+    dtype = np.dtype(dtype)
+    pixeltype = {"f": "float", "i": "signedint", "u": "unsignedint"}[dtype.kind]
+    lines = [
+        f"nrows {nrows}",
+        f"ncols {ncols}",
+        "nbands 1",
+        f"nbits {dtype.itemsize * 8}",
+        f"pixeltype {pixeltype}",
+        f"byteorder {'M' if dtype.byteorder == '>' else 'I'}",
+        "layout bil",
+        f"ulxmap {georef['ulxmap']!r}",
+        f"ulymap {georef['ulymap']!r}",
+        f"xdim {georef['xdim']!r}",
+        f"ydim {georef['ydim']!r}",
+    ]
+    if nodata is not None:
+        lines.append(f"nodata {nodata!r}")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def create_bil(path: str, nrows: int, ncols: int, dtype, georef: dict, nodata=None):
+    """
+    writes the .hdr and allocates the .bil
+    :returns writable numpy memmap of shape (nrows, ncols)
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    write_hdr(hdr_path(path), nrows, ncols, dtype, georef, nodata)
+    return np.memmap(path, dtype=dtype, mode="w+", shape=(nrows, ncols))
+
+
+class PngWriter():
+    """Streams an 8 bit grayscale PNG one block of rows at a time."""
+
+    def __init__(self, path: str, nrows: int, ncols: int):
+        self.ncols = ncols
+        self.file = open(path, "wb")
+        self.compressor = zlib.compressobj(PNG_COMPRESS_LEVEL)
+        self.file.write(PNG_SIGNATURE)
+        # width, height, bit depth 8, colour type 0 (gray), deflate, adaptive filtering, no interlace
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", ncols, nrows, 8, 0, 0, 0, 0))
+
+    def write_chunk(self, chunk_type: bytes, data: bytes):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
+
+    def write_rows(self, rows):
+        """:param rows: uint8 array of shape (n, ncols)"""
+        scanlines = np.zeros((rows.shape[0], self.ncols + 1), dtype=np.uint8)  # filter byte 0 per row
+        scanlines[:, 1:] = rows
+        data = self.compressor.compress(scanlines.tobytes())
+        if data:
+            self.write_chunk(b"IDAT", data)
+
+    def close(self):
+        self.write_chunk(b"IDAT", self.compressor.flush())
+        self.write_chunk(b"IEND", b"")
+        self.file.close()
+
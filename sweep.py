@@ -0,0 +1,187 @@
+# Parameter sweeps for tuning lasground on one input
+
+import os
+import csv
+import time
+import shutil
+import itertools
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import lastools_core as core
+import pipeline
+
+try:
+    import lasreader
+except ImportError:  # numpy is optional, ground points are then not counted
+    lasreader = None
+
+SWEEP_PARAMS = ("step", "stddev", "offset", "bulge", "spike")
+MAX_SWEEP_RUNS = 500  # guards against a typo turning into days of lasground runs
+GROUND_CLASS = 2
+
+
+def parse_values(text: str):
+    """
+    :param text: one value "3", a list "1, 2, 5" or an inclusive range "start:stop:increment" e.g. "1:5:0.5"
+    :returns list of floats, empty for empty text
+    :raises ValueError on malformed text
+    """
+    values = []
+    for item in text.replace(",", " ").split():
+        if ":" not in item:
+            values.append(float(item))
+            continue
+        parts = [float(part) for part in item.split(":")]
+        if len(parts) != 3 or parts[2] <= 0 or parts[1] < parts[0]:
+            raise ValueError(f"expected start:stop:increment with start <= stop and increment > 0, got {item}")
+        start, stop, increment = parts
+        count = int((stop - start) / increment + 1e-9) + 1
+        values += [round(start + index * increment, 9) for index in range(count)]
+    return list(dict.fromkeys(values))
+
+
+def sweep_variants(base: core.GroundParams, ranges: dict):
+    """
+    :param base: parameters kept for everything that is not swept
+    :param ranges: dict of SWEEP_PARAMS name -> list of values, empty lists keep the base value
+    :returns list of core.GroundParams, one per grid point
+    :raises ValueError if the grid is larger than MAX_SWEEP_RUNS
+    """
+    swept = {name: values for name, values in ranges.items() if values}
+    runs = 1
+    for values in swept.values():
+        runs *= len(values)
+    if runs > MAX_SWEEP_RUNS:
+        raise ValueError(f"{runs} parameter combinations, at most {MAX_SWEEP_RUNS} are allowed")
+    return [replace(base, **dict(zip(swept, combination))) for combination in itertools.product(*swept.values())]
+
+
+@dataclass
+class SweepResult:
+    """one lasground run of a sweep"""
+    index: int
+    params: core.GroundParams
+    output_path: str
+    success: bool = False
+    seconds: float = 0.0
+    points: int = None
+    ground_points: int = None
+
+    @property
+    def ground_fraction(self):
+        if not self.points or self.ground_points is None:
+            return None
+        return self.ground_points / self.points
+
+    def values(self):
+        """:returns dict of SWEEP_PARAMS name -> value, None if the option was left out"""
+        return {name: getattr(self.params, name) for name in SWEEP_PARAMS}
+
+
+def count_ground(path: str):
+    """:returns total and ground (class 2) point count of a LAS file, None, None if it cannot be read"""
+    if lasreader is None:
+        return None, None
+    try:
+        histogram = lasreader.LasFile(path).class_histogram()
+    except (OSError, ValueError):
+        return None, None
+    return sum(histogram.values()), histogram.get(GROUND_CLASS, 0)
+
+
+def sweep_folder(input_path: str, out_folder: str = ""):
+    """:returns folder for the outputs of a sweep over <input_path>, e.g. sweep_tile"""
+    return os.path.join(out_folder or os.path.dirname(input_path), f"sweep_{Path(input_path).stem}")
+
+
+def run_sweep(runner: core.StageRunner, input_path: str, variants, folder: str, workers=None, keep_outputs=False,
+              on_result=None, admission=None):
+    """
+    runs lasground once per entry of <variants> on <input_path>, up to <workers> at once
+    outputs are deleted once counted unless <keep_outputs>, they bypass the result cache except when the numpy
+    engine falls back to lasground for a LAZ input
+    :param on_result: optional callable(SweepResult), called from the stage thread as each run finishes
+    :param admission: optional admission.AdmissionController, holds runs back that would not fit in memory
+    :returns list of SweepResult in <variants> order
+    """
+    os.makedirs(folder, exist_ok=True)
+    lock = threading.Lock()
+    results = []
+    stages = []
+    for index, params in enumerate(variants):
+        # LAS rather than LAZ output, the ground points are counted with lasreader
+        result = SweepResult(index, params, os.path.join(folder, f"grd_{index:03d}.las"))
+        results.append(result)
+        if params.in_process():
+            # the sweep runs in parallel already, one process per run, LAZ inputs fall back to lasground
+            stage = pipeline.Stage(
+                f"lasground sweep {index}",
+                lambda result=result, params=params: runner.run_las_ground(
+                    input_path, result.output_path, params, workers=1
+                ),
+            )
+        else:
+            stage = runner.command_stage(
+                f"lasground sweep {index}",
+                core.ground_command(runner.lastools_path, input_path, result.output_path, params),
+                [input_path], [result.output_path],
+            )
+
+        def action(result=result, run=stage.action):
+            start = time.perf_counter()
+            result.success = run()
+            result.seconds = time.perf_counter() - start
+            if result.success:
+                result.points, result.ground_points = count_ground(result.output_path)
+                if not keep_outputs:
+                    os.remove(result.output_path)
+            if on_result:
+                with lock:
+                    on_result(result)
+            return result.success
+
+        stages.append(pipeline.Stage(stage.name, action, [input_path], [result.output_path], step=params.step))
+
+    pipeline.Pipeline(stages, max_workers=workers, admission=admission, output=runner.output).run()
+    if not keep_outputs:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def swept_params(results):
+    """:returns SWEEP_PARAMS names whose value differs between the runs"""
+    return [name for name in SWEEP_PARAMS if len({result.values()[name] for result in results}) > 1]
+
+
+def format_table(results):
+    """:returns comparison table of the runs, one line per run"""
+    names = swept_params(results) or ["step"]
+    header = [f"{name:>8}" for name in names] + [f"{'ground':>12}", f"{'fraction':>9}", f"{'seconds':>8}"]
+    lines = [" ".join(header)]
+    for result in results:
+        cells = [f"{core.number(value) if value is not None else '-':>8}" for value in
+                 (result.values()[name] for name in names)]
+        if not result.success:
+            cells.append(f"{'failed':>12}")
+        else:
+            ground = result.ground_points
+            fraction = result.ground_fraction
+            cells += [
+                f"{ground:>12,}" if ground is not None else f"{'?':>12}",
+                f"{100.0 * fraction:>8.1f}%" if fraction is not None else f"{'?':>9}",
+                f"{result.seconds:>8.1f}",
+            ]
+        lines.append(" ".join(cells))
+    return "\n".join(lines)
+
+
+def write_csv(path: str, results):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(list(SWEEP_PARAMS) + ["success", "points", "ground_points", "ground_fraction", "seconds"])
+        for result in results:
+            writer.writerow(list(result.values().values()) + [
+                result.success, result.points, result.ground_points, result.ground_fraction, round(result.seconds, 3)
+            ])
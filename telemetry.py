@@ -0,0 +1,195 @@
+# Per-stage resource usage of LAStools child processes and in-process stages
+
+import os
+import csv
+import sys
+import json
+import time
+import threading
+from dataclasses import dataclass, asdict, fields
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+@dataclass
+class StageMetrics:
+    """
+    Resource usage of one stage run. Values that cannot be measured on this platform stay None,
+    CPU, memory and I/O are only collected for child processes on POSIX systems.
+    """
+    run: str
+    stage: str
+    input_path: str = ""
+    started: float = 0.0  # unix time
+    wall_seconds: float = 0.0
+    user_seconds: float = None
+    sys_seconds: float = None
+    peak_rss_bytes: int = None
+    read_bytes: int = None
+    write_bytes: int = None
+    points: int = None
+    returncode: int = None
+    cached: bool = False
+    saved_bytes: int = None  # intermediate I/O avoided by piping or moved to the scratch folder
+    output_bytes: int = None  # size of the files the stage wrote, once it succeeded
+
+    def __post_init__(self):
+        self.started = self.started or time.time()
+        self._start = time.perf_counter()
+
+    def finish(self, returncode: int):
+        self.wall_seconds = time.perf_counter() - self._start
+        self.returncode = returncode
+
+    @property
+    def tool(self):
+        """stage name without the tile or file suffix, e.g. lasground"""
+        return self.stage.split()[0] if self.stage else ""
+
+    @property
+    def points_per_sec(self):
+        if not self.points or not self.wall_seconds or self.cached:
+            return None
+        return self.points / self.wall_seconds
+
+    def row(self):
+        """:returns dict of every field plus points_per_sec, for JSON and CSV"""
+        row = asdict(self)
+        row["points_per_sec"] = self.points_per_sec
+        return row
+
+
+CSV_COLUMNS = [field.name for field in fields(StageMetrics)] + ["points_per_sec"]
+
+
+def wait_measured(process, metrics: StageMetrics = None):
+    """
+    Waits for <process> like Popen.wait, filling CPU, peak RSS and I/O of <metrics> where the platform allows.
+    :returns the return code
+    """
+    if metrics is None or not hasattr(os, "wait4"):
+        return process.wait()
+    try:
+        if hasattr(os, "waitid"):
+            # wait for the exit without reaping, so /proc/<pid>/io can still be read
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            read_proc_io(process.pid, metrics)
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:  # already reaped elsewhere
+        return process.wait()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    metrics.user_seconds = usage.ru_utime
+    metrics.sys_seconds = usage.ru_stime
+    metrics.peak_rss_bytes = usage.ru_maxrss * MAXRSS_UNIT
+    return process.returncode
+
+
+def read_proc_io(pid: int, metrics: StageMetrics):
+    """bytes the process read and wrote through system calls, page cache hits included"""
+    try:
+        with open(f"/proc/{pid}/io", "r") as file:
+            counters = dict(line.split(":", 1) for line in file if ":" in line)
+    except OSError:
+        return
+    metrics.read_bytes = int(counters.get("rchar", 0))
+    metrics.write_bytes = int(counters.get("wchar", 0))
+
+
+def combine_concurrent(metrics: StageMetrics, parts):
+    """adds up the CPU, memory and I/O of processes that ran at the same time, e.g. both ends of a pipe"""
+    def total(name):
+        values = [getattr(part, name) for part in parts if getattr(part, name) is not None]
+        return sum(values) if values else None
+
+    for name in ("user_seconds", "sys_seconds", "peak_rss_bytes", "read_bytes", "write_bytes"):
+        setattr(metrics, name, total(name))
+
+
+class RunTelemetry():
+    """StageMetrics of one run, safe to record from several threads"""
+
+    def __init__(self, run: str, on_record=None):
+        """:param on_record: optional callable(StageMetrics), called from the stage thread"""
+        self.run = run
+        self.on_record = on_record
+        self.lock = threading.Lock()
+        self.stages = []
+
+    def start(self, stage: str, input_path: str = "", points: int = None):
+        return StageMetrics(self.run, stage, input_path, points=points)
+
+    def record(self, metrics: StageMetrics):
+        with self.lock:
+            self.stages.append(metrics)
+        if self.on_record:
+            self.on_record(metrics)
+
+    def summary(self):
+        """:returns dict of tool -> totals, to see which stage dominates the run"""
+        totals = {}
+        with self.lock:
+            stages = list(self.stages)
+        for metrics in stages:
+            total = totals.setdefault(metrics.tool, {
+                "runs": 0, "cached": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_bytes": 0,
+                "read_bytes": 0, "write_bytes": 0, "saved_bytes": 0, "output_bytes": 0,
+            })
+            total["runs"] += 1
+            total["cached"] += int(metrics.cached)
+            total["wall_seconds"] += metrics.wall_seconds
+            total["cpu_seconds"] += (metrics.user_seconds or 0.0) + (metrics.sys_seconds or 0.0)
+            total["peak_rss_bytes"] = max(total["peak_rss_bytes"], metrics.peak_rss_bytes or 0)
+            total["read_bytes"] += metrics.read_bytes or 0
+            total["write_bytes"] += metrics.write_bytes or 0
+            total["saved_bytes"] += metrics.saved_bytes or 0
+            total["output_bytes"] += metrics.output_bytes or 0
+        return totals
+
+    def format_summary(self):
+        lines = []
+        for tool, total in sorted(self.summary().items(), key=lambda item: -item[1]["wall_seconds"]):
+            lines.append(
+                f"{tool}: {total['runs']} runs ({total['cached']} cached), {total['wall_seconds']:.1f} s wall, "
+                f"{total['cpu_seconds']:.1f} s CPU, peak {total['peak_rss_bytes'] / 1024 ** 2:.0f} MB, "
+                f"read {total['read_bytes'] / 1024 ** 2:.0f} MB, wrote {total['write_bytes'] / 1024 ** 2:.0f} MB, "
+                f"outputs {total['output_bytes'] / 1024 ** 2:.1f} MB"
+            )
+        saved = sum(total["saved_bytes"] for total in self.summary().values())
+        if saved:
+            lines.append(f"intermediates: {saved / 1024 ** 2:.0f} MB of disk I/O saved by piping and scratch")
+        return "\n".join(lines)
+
+    def as_dict(self):
+        with self.lock:
+            rows = [metrics.row() for metrics in self.stages]
+        return {"run": self.run, "stages": rows, "summary": self.summary()}
+
+    def write_json(self, path: str):
+        write_json(path, [self])
+
+    def write_csv(self, path: str):
+        with self.lock:
+            stages = list(self.stages)
+        write_csv(path, stages)
+
+
+def write_json(path: str, runs):
+    """writes one or more RunTelemetry as {"runs": [...]}"""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"runs": [run.as_dict() for run in runs]}, file, indent=1)
+
+
+def export_paths(log_path: str):
+    """:returns JSON and CSV telemetry paths next to a job log"""
+    stem = os.path.splitext(log_path)[0]
+    return f"{stem}.telemetry.json", f"{stem}.telemetry.csv"
+
+
+def write_csv(path: str, stages):
+    """writes StageMetrics of one or more runs, one row per stage"""
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for metrics in stages:
+            writer.writerow(metrics.row())
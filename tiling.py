@@ -0,0 +1,155 @@
+# Splitting large inputs into buffered tiles and merging the per-tile results
+
+import os
+import math
+from pathlib import Path
+
+import lasreader
+import laswriter
+import mosaic
+
+# about how many points one lasground process should get
+TARGET_TILE_POINTS = 10_000_000
+# lasground needs a few steps of context on every side of a tile
+MIN_TILE_STEPS = 20
+DEF_BUFFER_STEPS = 4
+
+
+class Tile():
+    """
+    Square tile of the input. The core is [x0, x1) x [y0, y1), the buffered box extends it by <buffer>.
+    """
+
+    def __init__(self, col: int, row: int, x0: float, y0: float, size: float, buffer: float):
+        self.col = col
+        self.row = row
+        self.x0, self.y0 = x0, y0
+        self.x1, self.y1 = x0 + size, y0 + size
+        self.size = size
+        self.buffer = buffer
+        self.point_count = 0
+        self.path = None
+        self.ground_path = None
+        self.dem_path = None
+
+    @property
+    def name(self):
+        return f"tile_{self.col:03d}_{self.row:03d}"
+
+    def set_output_paths(self, folder: str):
+        self.ground_path = os.path.join(folder, f"grd_{self.name}.las")
+        self.dem_path = os.path.join(folder, f"dem_{self.name}.bil")
+
+    def buffered_mask(self, x, y):
+        return (
+            (x >= self.x0 - self.buffer) & (x < self.x1 + self.buffer)
+            & (y >= self.y0 - self.buffer) & (y < self.y1 + self.buffer)
+        )
+
+    def core_mask(self, x, y):
+        # half-open, so a point on a shared edge lands in exactly one tile
+        return (x >= self.x0) & (x < self.x1) & (y >= self.y0) & (y < self.y1)
+
+    def dem_grid_args(self, dem_step: float):
+        """blast2dem arguments that raster exactly the core, so neighbouring tiles line up"""
+        cells = int(round(self.size / dem_step))
+        return ["-ll", repr(self.x0), repr(self.y0), "-ncols", str(cells), "-nrows", str(cells)]
+
+
+def choose_tile_size(point_count: int, mins, maxs, grd_step: float, dem_step: float):
+    """
+    :returns tile edge length giving about TARGET_TILE_POINTS per tile,
+    at least MIN_TILE_STEPS ground steps and a whole number of DEM cells
+    """
+    area = max((maxs[0] - mins[0]) * (maxs[1] - mins[1]), 1e-9)
+    density = max(point_count, 1) / area
+    size = math.sqrt(TARGET_TILE_POINTS / density)
+    size = max(size, MIN_TILE_STEPS * grd_step)
+    return math.ceil(size / dem_step) * dem_step
+
+
+def plan_tiles(mins, maxs, tile_size: float, buffer: float):
+    """:returns list of Tile covering the bounding box on a grid aligned to multiples of tile_size"""
+    origin_x = math.floor(mins[0] / tile_size) * tile_size
+    origin_y = math.floor(mins[1] / tile_size) * tile_size
+    ncols = int((maxs[0] - origin_x) // tile_size) + 1
+    nrows = int((maxs[1] - origin_y) // tile_size) + 1
+    return [
+        Tile(col, row, origin_x + col * tile_size, origin_y + row * tile_size, tile_size, buffer)
+        for row in range(nrows)
+        for col in range(ncols)
+    ]
+
+
+def plan(las_file: lasreader.LasFile, grd_step: float, dem_step: float, tile_size=None, buffer=None):
+    """
+    :param tile_size: tile edge length, None picks one from the point count and steps
+    :param buffer: buffer width, None uses DEF_BUFFER_STEPS ground steps
+    :returns list of Tile
+    """
+    header = las_file.header
+    if tile_size:
+        tile_size = math.ceil(tile_size / dem_step) * dem_step
+    else:
+        tile_size = choose_tile_size(header.point_count, header.mins, header.maxs, grd_step, dem_step)
+    buffer = DEF_BUFFER_STEPS * grd_step if buffer is None else buffer
+    return plan_tiles(header.mins, header.maxs, tile_size, buffer)
+
+
+def split(las_file: lasreader.LasFile, tiles, folder: str, chunk_size: int = lasreader.CHUNK_POINTS):
+    """
+    Writes the buffered points of every tile in one pass over the input.
+    :returns tiles that received points, with Tile.path set
+    """
+    os.makedirs(folder, exist_ok=True)
+    writers = {}
+    try:
+        for _, records in las_file.iter_chunks(chunk_size):
+            x, y, _ = las_file.scaled_xyz(records)
+            for tile in tiles:
+                # cheap reject before building the full mask
+                if x.max() < tile.x0 - tile.buffer or x.min() >= tile.x1 + tile.buffer:
+                    continue
+                mask = tile.buffered_mask(x, y)
+                if not mask.any():
+                    continue
+                if tile.name not in writers:
+                    tile.path = os.path.join(folder, f"{tile.name}.las")
+                    writers[tile.name] = laswriter.LasWriter(tile.path, las_file)
+                writers[tile.name].write(records[mask])
+                tile.point_count += int(mask.sum())
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return [tile for tile in tiles if tile.name in writers]
+
+
+def merge_ground_tiles(tiles, output_path: str, chunk_size: int = lasreader.CHUNK_POINTS):
+    """merges the classified tiles into one LAS, dropping the buffer points of each tile"""
+    writer = None
+    try:
+        for tile in tiles:
+            tile_file = lasreader.LasFile(tile.ground_path)
+            if writer is None:
+                writer = laswriter.LasWriter(output_path, tile_file)
+            for _, records in tile_file.iter_chunks(chunk_size):
+                x, y, _ = tile_file.scaled_xyz(records)
+                writer.write(records[tile.core_mask(x, y)])
+    finally:
+        if writer is not None:
+            writer.close()
+    return writer is not None
+
+
+def merge_dem_tiles(tile_paths, output_path: str):
+    """
+    Places per-tile BIL rasters that share one grid into a single float32 BIL.
+    Cells no tile covers are nodata.
+    """
+    mosaic.mosaic(tile_paths, output_path, mosaic.RULE_LAST)
+
+
+def tile_folder(output_path: str):
+    """scratch folder for the tiles of one run, next to the final output"""
+    output = Path(output_path)
+    return str(output.with_name(f"tiles_{output.stem}"))
@@ -0,0 +1,115 @@
+# Watch folders for LAS/LAZ deliveries: a file is handed on once it has stopped growing,
+# and again only if it changes after that. Polling works the same on local disks and network shares.
+
+import os
+import struct
+import threading
+import time
+
+import batch
+import journal
+
+DEF_POLL_SECONDS = 5.0
+MIN_POLL_SECONDS = 0.2
+DEF_SETTLE_SECONDS = 10.0  # a file must keep its size and mtime this long before it counts as delivered
+
+
+def las_complete(path: str):
+    """
+    :returns False if <path> is an uncompressed LAS whose header promises more points than the file holds,
+    i.e. it is still being copied, True otherwise
+    """
+    if not path.lower().endswith(".las"):
+        return True  # LAZ chunks have no fixed size
+    try:
+        with open(path, "rb") as file:
+            header = file.read(227)
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    if len(header) < 227 or header[:4] != b"LASF":
+        return False
+    offset = struct.unpack_from("<I", header, 96)[0]
+    record_length = struct.unpack_from("<H", header, 105)[0]
+    return size >= offset + batch.read_point_count(path) * record_length
+
+
+class FolderWatcher():
+    """
+    Polls the files <list_files> returns and hands every one on once its size and mtime stayed the same
+    for <settle_seconds>. Files present when watching starts count as new.
+    """
+
+    def __init__(self, list_files, on_ready, settle_seconds: float = DEF_SETTLE_SECONDS, poll_seconds: float = None,
+                 skip=None):
+        """
+        :param list_files: callable() -> paths of the candidate files, e.g. the LAS/LAZ files of the watched folders
+        :param on_ready: callable(path), called on the watcher thread for every delivered file,
+            returns False if it cannot take the file now, it is then offered again on the next poll
+        :param poll_seconds: None for DEF_POLL_SECONDS, or less when <settle_seconds> is shorter
+        :param skip: optional callable(path) -> True for a delivered file that must not be handed on,
+            e.g. one that was processed before this watcher started
+        """
+        self.list_files = list_files
+        self.on_ready = on_ready
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds or max(min(DEF_POLL_SECONDS, settle_seconds / 2), MIN_POLL_SECONDS)
+        self.skip = skip
+        self.pending = {}  # path -> (stat, monotonic time it was first seen with that stat)
+        self.handled = {}  # path -> stat it was handed on or skipped with
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def poll(self):
+        """
+        checks every candidate once
+        :returns paths handed on
+        """
+        now = time.monotonic()
+        try:
+            paths = self.list_files()
+        except OSError:
+            return []  # a drop folder on a share can be briefly unavailable
+        present = set(paths)
+        ready = []
+        for path in paths:
+            stat = journal.file_stat(path)
+            if stat[0] is None or self.handled.get(path) == stat:
+                continue
+            seen = self.pending.get(path)
+            if seen is None or seen[0] != stat:
+                self.pending[path] = (stat, now)
+                continue
+            if now - seen[1] < self.settle_seconds or not las_complete(path):
+                continue
+            if self.skip is not None and self.skip(path):
+                self.handled[path] = stat
+                del self.pending[path]
+                continue
+            if self.on_ready(path) is False:
+                continue
+            self.handled[path] = stat
+            del self.pending[path]
+            ready.append(path)
+
+        # deleted files are forgotten, a new delivery under the same name is a new file
+        for known in (self.pending, self.handled):
+            for path in [path for path in known if path not in present]:
+                del known[path]
+        return ready
+
+    def run(self):
+        """polls until stop() is called"""
+        self.poll()
+        while not self.stop_event.wait(self.poll_seconds):
+            self.poll()
+
+    def start(self):
+        """polls on a daemon thread"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="folder watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()